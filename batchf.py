@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+"""
+XiangqiMO - Batch analysis entry point
+Analyse many positions without the GUI, for example:
+
+    python batchf.py positions.fen -o results.jsonl --depth 12
+    python batchf.py positions.fen -o results.jsonl --resume
+"""
+
+import os
+import sys
+
+def main():
+    """
+    Run the batch analyser from the src directory.
+    """
+    # Get the directory where this script is located
+    root_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    # Add src directory to Python path
+    src_dir = os.path.join(root_dir, 'src')
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    
+    from batch import main as batch_main
+    return batch_main()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Attack detection cross-check and checkmate benchmark.
+
+Position.is_square_attacked works outward from the target square. This
+script first compares it with the old approach (generate every move of
+every attacker, legacy_rules.LegacyBoard) on every occupied square of
+randomized positions: random piece placements, which need not be reachable, and
+positions from random playouts. Legal move lists and checkmate results
+are compared as well. Any mismatch is printed and the script fails.
+
+It then times is_in_checkmate for the side to move on the playout
+positions with both implementations.
+
+Usage:
+    python benchmarks/bench_attacks.py [--random N] [--playouts N] [--repeat N] [--seed N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from position import Position, KING, BLACK, RED, WIDTH, SQUARES
+from legacy_rules import LegacyBoard
+from bench_movegen import random_positions
+
+ARMY = "AABBNNRRCCPPPPP"
+
+
+def random_placement(rng):
+    """
+    Build a FEN with both kings in their palaces and a random subset of
+    the other pieces on random free squares.
+
+    Args:
+        rng: random.Random instance
+
+    Returns:
+        FEN string
+    """
+    board = [["1"] * 9 for _ in range(10)]
+    board[rng.randint(7, 9)][rng.randint(3, 5)] = "K"
+    board[rng.randint(0, 2)][rng.randint(3, 5)] = "k"
+    free = [(x, y) for y in range(10) for x in range(9) if board[y][x] == "1"]
+    rng.shuffle(free)
+    pieces = [p for p in ARMY if rng.random() < 0.5] + [p.lower() for p in ARMY if rng.random() < 0.5]
+    for piece, (x, y) in zip(pieces, free):
+        board[y][x] = piece
+    rows = []
+    for cells in board:
+        row = ""
+        empty = 0
+        for char in cells:
+            if char == "1":
+                empty += 1
+            else:
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += char
+        rows.append(row + (str(empty) if empty else ""))
+    return "/".join(rows) + " " + rng.choice("wb")
+
+
+def cross_check(fen):
+    """
+    Compare new and old rules on one position.
+
+    Args:
+        fen: FEN string
+
+    Returns:
+        Description of the first difference, or None
+    """
+    position = Position(fen)
+    legacy = LegacyBoard(fen)
+    facing = position.kings_facing()
+    for sq in range(SQUARES):
+        y, x = divmod(sq, WIDTH)
+        code = position.squares[sq]
+        for side in ("w", "b"):
+            # The old test answered "can move to", which differs from
+            # "can capture on" only for empty squares (quiet cannon moves)
+            if not code or (code & BLACK) == (RED if side == "w" else BLACK):
+                continue
+            expected = legacy.is_square_attacked(x, y, side)
+            # The old attack test left the flying general to its callers
+            if facing and code == KING | (BLACK if side == "w" else RED):
+                expected = True
+            if position.is_square_attacked(sq, side) != expected:
+                return f"is_square_attacked({x}, {y}, {side!r}): expected {expected}"
+    for side in ("w", "b"):
+        old = sorted((fy * WIDTH + fx, ty * WIDTH + tx) for fx, fy, tx, ty in legacy.legal_moves(side))
+        if sorted(position.legal_moves(side)) != old:
+            return f"legal moves of {side!r} differ"
+        if not facing and position.is_in_checkmate(side) != legacy.is_in_checkmate(side):
+            return f"is_in_checkmate({side!r}) differs"
+    return None
+
+
+def measure(check, boards, repeat):
+    """Return (best seconds, mates found) over repeat passes."""
+    best = None
+    mates = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        mates = sum(1 for board in boards if check(board))
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, mates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attack detection cross-check and checkmate benchmark")
+    parser.add_argument("--random", type=int, default=300, help="random placements to cross-check")
+    parser.add_argument("--playouts", type=int, default=300, help="playout positions to cross-check and time")
+    parser.add_argument("--repeat", type=int, default=3, help="timing passes (best is kept)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    placements = [random_placement(rng) for _ in range(args.random)]
+    playouts = random_positions(args.playouts, args.seed)
+    for fen in placements + playouts:
+        problem = cross_check(fen)
+        if problem:
+            print(f"MISMATCH in {fen}: {problem}")
+            return 1
+    print(f"cross-check:    {len(placements)} random placements and {len(playouts)} playout positions agree")
+
+    # Checkmate tests only get expensive in check, so time those separately
+    pool = random_positions(args.playouts * 20, args.seed + 1)
+    checks = [fen for fen in pool if Position(fen).is_in_check(fen.split()[1])]
+    ok = True
+    for label, fens in (("all playout positions", playouts), ("positions in check", checks)):
+        positions = [Position(fen) for fen in fens]
+        legacy = [LegacyBoard(fen) for fen in fens]
+        old_time, old_mates = measure(lambda b: b.is_in_checkmate(b.current_turn), legacy, args.repeat)
+        new_time, new_mates = measure(lambda p: p.is_in_checkmate(p.turn), positions, args.repeat)
+        ok = ok and old_mates == new_mates
+        print(f"is_in_checkmate, {label} ({len(fens)}, {new_mates} mated):")
+        print(f"  move generation: {len(fens) / old_time:10,.0f} positions/s")
+        print(f"  reverse attacks: {len(fens) / new_time:10,.0f} positions/s")
+        print(f"  speedup:         {old_time / new_time:.2f}x")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Engine protocol latency benchmark.
+
+Runs StockfishEngine against the scripted fake engine and reports how long
+the handshake and each analysis take, next to the time the fake engine
+actually spends searching. The difference is pure protocol overhead.
+With --legacy the fixed sleeps of the old clock-driven protocol are put
+back in, for a before/after comparison.
+
+Usage:
+    python benchmarks/bench_engine_latency.py [--runs N] [--depth N] [--depth-ms N] [--legacy]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from engine import StockfishEngine
+
+FAKE_ENGINE = os.path.join(ROOT, "benchmarks", "fake_uci_engine.py")
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+
+
+class LegacyTimingEngine(StockfishEngine):
+    """
+    StockfishEngine with the sleeps of the old protocol re-inserted:
+    0.5 s after uci, 0.2 + 0.1 + 0.1 s between setoptions, 0.2 s after
+    position and 0.5 s after bestmove.
+    """
+    LEGACY_SLEEPS = {
+        "uci": 0.5,
+        "setoption name UCI_Variant value xiangqi": 0.2,
+        "setoption name FairyBoard value xiangqi": 0.1,
+        "setoption name MultiPV value 2": 0.1,
+    }
+
+    def _send(self, command):
+        if command.startswith("go"):
+            time.sleep(0.2)
+        super()._send(command)
+        time.sleep(self.LEGACY_SLEEPS.get(command, 0))
+
+    def _wait_for(self, token, timeout):
+        line = super()._wait_for(token, timeout)
+        if token == "uciok":
+            self._drain()
+        return line
+
+    def analyze_multi(self, fen, depth=18, multipv=2):
+        results = super().analyze_multi(fen, depth, multipv)
+        time.sleep(0.5)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UCI protocol latency benchmark")
+    parser.add_argument("--runs", type=int, default=20, help="number of analyses")
+    parser.add_argument("--depth", type=int, default=5, help="search depth per analysis")
+    parser.add_argument("--depth-ms", type=int, default=2, help="fake engine time per depth")
+    parser.add_argument("--legacy", action="store_true", help="re-insert the old fixed sleeps")
+    args = parser.parse_args()
+
+    engine_class = LegacyTimingEngine if args.legacy else StockfishEngine
+    engine = engine_class(sys.executable, [FAKE_ENGINE, "--depth-ms", str(args.depth_ms)])
+
+    t0 = time.perf_counter()
+    if not engine.start():
+        print("engine failed to start")
+        return 1
+    startup = time.perf_counter() - t0
+
+    latencies = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        results = engine.analyze_multi(START_FEN, depth=args.depth, multipv=2)
+        latencies.append(time.perf_counter() - t0)
+        if results[0][0] is None:
+            print("analysis returned no move")
+            return 1
+    engine.close()
+
+    search_time = args.depth * args.depth_ms / 1000.0
+    mean = statistics.mean(latencies)
+    print(f"protocol:        {'legacy (fixed sleeps)' if args.legacy else 'event-driven'}")
+    print(f"handshake:       {startup * 1000:8.1f} ms")
+    print(f"analysis mean:   {mean * 1000:8.1f} ms over {args.runs} runs")
+    print(f"analysis median: {statistics.median(latencies) * 1000:8.1f} ms")
+    print(f"scripted search: {search_time * 1000:8.1f} ms")
+    print(f"overhead/run:    {(mean - search_time) * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
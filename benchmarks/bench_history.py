@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Game history benchmark.
+
+Plays a long seeded random game (quiet moves preferred, so it does not
+end early) into a game_tree.GameTree, branches random variations off it,
+and times undo/redo steps, jumps to random nodes of the tree and FEN
+materialization, checking that every jump reproduces the position that
+was actually played. Finally compares the memory of the old history of
+the main line (one (fx, fy, tx, ty, captured) tuple and one FEN string
+per ply) with the tree: its node arrays plus the LRU of position
+snapshots, which the jumps have filled by then, and the root position.
+
+Usage:
+    python benchmarks/bench_history.py [--plies N] [--variations N] [--jumps N] [--seed N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from position import Position, WIDTH
+from game_tree import GameTree
+
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+
+
+def deep_size(value):
+    """Approximate memory of a container and everything it holds."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(deep_size(item) for item in value)
+    return size
+
+
+def position_size(position):
+    """Approximate memory of a Position and the containers it owns."""
+    size = sys.getsizeof(position) + sys.getsizeof(position.__dict__)
+    size += sys.getsizeof(position.squares) + sys.getsizeof(position.kings)
+    size += deep_size(position.piece_squares) + sum(sys.getsizeof(side) for side in position.piece_squares)
+    size += sys.getsizeof(position.status_cache)
+    return size
+
+
+def play_line(tree, plies, rng):
+    """
+    Play random moves from the current node of a tree, preferring quiet moves.
+
+    Args:
+        tree: GameTree
+        plies: Moves to play (fewer if the game ends)
+        rng: random.Random instance
+    """
+    position = tree.position
+    for _ in range(plies):
+        moves = position.legal_moves()
+        if not moves:
+            break
+        quiet = [move for move in moves if not position.squares[move[1]]]
+        frm, to = rng.choice(quiet or moves)
+        captured = position.make(frm, to)
+        if quiet and position.is_in_check(position.turn) and len(quiet) > 1:
+            # Checks end random games quickly; try another quiet move
+            position.unmake(frm, to, captured)
+            quiet.remove((frm, to))
+            frm, to = rng.choice(quiet)
+            captured = position.make(frm, to)
+        tree.add(frm, to, captured)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game history benchmark")
+    parser.add_argument("--plies", type=int, default=4000, help="length of the game")
+    parser.add_argument("--variations", type=int, default=200, help="random variations to branch off")
+    parser.add_argument("--jumps", type=int, default=200, help="random jumps to time")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    position = Position(START_FEN)
+    tree = GameTree(position)
+    play_line(tree, args.plies, rng)
+    main_line = tree.line()
+    plies = len(main_line)
+    for _ in range(args.variations):
+        tree.goto(rng.choice(main_line))
+        play_line(tree, rng.randint(1, 40), rng)
+    tree.goto(main_line[-1])
+
+    nodes = len(tree) - 1
+    print(f"game:           {plies} plies on the main line, {nodes} nodes with variations")
+
+    t0 = time.perf_counter()
+    while tree.undo() >= 0:
+        pass
+    while tree.redo() >= 0:
+        pass
+    step = (time.perf_counter() - t0) / max(2 * plies, 1)
+    print(f"undo/redo:      {step * 1e6:10.2f} us/step")
+
+    targets = [rng.randrange(len(tree)) for _ in range(args.jumps)]
+    t0 = time.perf_counter()
+    for node in targets:
+        tree.goto(node)
+        if position.key != tree.keys[node]:
+            print(f"MISMATCH after jumping to node {node}")
+            return 1
+    elapsed = time.perf_counter() - t0
+    print(f"random jumps:   {elapsed / args.jumps * 1e3:10.2f} ms/jump "
+          f"({len(tree.cache)} positions materialized)")
+
+    t0 = time.perf_counter()
+    for node in targets[:20]:
+        if Position(tree.fen_at(node)).key != tree.keys[node]:
+            print(f"MISMATCH in the FEN of node {node}")
+            return 1
+    elapsed = time.perf_counter() - t0
+    print(f"fen_at:         {elapsed / min(20, args.jumps) * 1e3:10.2f} ms/FEN")
+
+    # The old history of the main line, rebuilt for comparison
+    replay = Position(START_FEN)
+    old = ([], [replay.fen()])
+    for node in main_line:
+        frm, to = tree.move(node)
+        captured = replay.make(frm, to)
+        old[0].append((frm % WIDTH, frm // WIDTH, to % WIDTH, to // WIDTH, captured))
+        old[1].append(replay.fen())
+    old_bytes = deep_size(old[0]) + deep_size(old[1])
+    arrays = (tree.parents, tree.first_child, tree.next_sibling, tree.moves, tree.captures,
+              tree.keys, tree.plies, tree.checks, tree.chases, tree.notations)
+    array_bytes = sum(sys.getsizeof(column) for column in arrays)
+    cache_bytes = sys.getsizeof(tree.cache) + sum(sys.getsizeof(cached) for cached in tree.cache.values())
+    cache_bytes += position_size(tree.root)
+    print(f"tuples + FENs:  {old_bytes / 1024:10,.1f} KiB for the main line")
+    print(f"node arrays:    {array_bytes / 1024:10,.1f} KiB for all nodes")
+    print(f"position LRU:   {cache_bytes / 1024:10,.1f} KiB ({len(tree.cache)} of at most "
+          f"{tree.cache_size} snapshots, plus the root)")
+    print(f"game tree:      {(array_bytes + cache_bytes) / 1024:10,.1f} KiB in total")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
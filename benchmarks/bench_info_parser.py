@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+UCI info-line parser benchmark.
+
+Parses a corpus of engine output with the single-pass parser from
+uci_parser and with the previous approach (up to six re.search calls per
+line, first PV move only) and reports lines per second for both.
+
+The corpus is either a recorded engine log (--corpus FILE, one engine
+output line per line) or a synthetic one shaped like Fairy-Stockfish
+MultiPV output at low depth, where the reader sees the most lines.
+
+Usage:
+    python benchmarks/bench_info_parser.py [--lines N] [--corpus FILE] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from uci_parser import parse_info
+
+FILES = "abcdefghi"
+
+
+def random_move(rng):
+    """Return a random square-to-square UCI move string."""
+    return "%s%d%s%d" % (rng.choice(FILES), rng.randint(1, 10), rng.choice(FILES), rng.randint(1, 10))
+
+
+def synthetic_corpus(count, seed=1):
+    """
+    Build engine output lines resembling a MultiPV=2 search.
+
+    Args:
+        count: Number of lines
+        seed: Random seed, so runs are comparable
+
+    Returns:
+        List of strings
+    """
+    rng = random.Random(seed)
+    lines = []
+    nodes = 0
+    depth = 1
+    while len(lines) < count:
+        for slot in (1, 2):
+            nodes += rng.randint(500, 50000)
+            if rng.random() < 0.05:
+                score = "mate %d" % rng.randint(-9, 9)
+            else:
+                score = "cp %d" % rng.randint(-300, 300)
+            bound = rng.choice(["", "", "", " lowerbound", " upperbound"])
+            pv = " ".join(random_move(rng) for _ in range(rng.randint(1, depth + 2)))
+            lines.append(
+                f"info depth {depth} seldepth {depth + rng.randint(0, 8)} multipv {slot} "
+                f"score {score}{bound} nodes {nodes} nps {rng.randint(200000, 2000000)} "
+                f"hashfull {rng.randint(0, 1000)} tbhits 0 time {rng.randint(1, 9000)} pv {pv}"
+            )
+        if rng.random() < 0.05:
+            lines.append(f"info depth {depth} currmove {random_move(rng)} currmovenumber {rng.randint(1, 44)}")
+        depth = depth + 1 if depth < 20 else 1
+    return lines[:count]
+
+
+def legacy_parse(output):
+    """The per-line work the engine reader did before the dedicated parser."""
+    if "info" in output and "multipv" in output and "pv" in output:
+        mpv_match = re.search(r'multipv\s+(\d+)', output)
+        if mpv_match:
+            mpv = int(mpv_match.group(1))
+            move = None
+            pv_match = re.search(r'pv\s+([a-i][0-9][a-i][0-9])', output)
+            if pv_match:
+                move = pv_match.group(1)
+            if not move:
+                pv_match = re.search(r'pv\s+([a-i][0-9]{2}[a-i][0-9]{2})', output)
+                if pv_match:
+                    move = pv_match.group(1)
+            if not move:
+                pv_match = re.search(r'pv\s+([a-z0-9]{4,5})', output)
+                if pv_match:
+                    move = pv_match.group(1)
+            if move:
+                score = "0.00"
+                cp_match = re.search(r'score cp\s+(-?\d+)', output)
+                if cp_match:
+                    score = f"{int(cp_match.group(1))/100:.2f}"
+                else:
+                    mate_match = re.search(r'score mate\s+(-?\d+)', output)
+                    if mate_match:
+                        score = f"mate {mate_match.group(1)}"
+                return mpv, move, score
+    return None
+
+
+def reader_path(output):
+    """What the engine reader does per line: parse, then slot and first move."""
+    info = parse_info(output)
+    if info is not None and info.pv_text:
+        return info.multipv, info.move
+    return None
+
+
+def all_fields(output):
+    """Parse a line and decode every field, as the statistics display does."""
+    info = parse_info(output)
+    if info is not None:
+        return (info.depth, info.seldepth, info.multipv, info.score_cp, info.score_mate,
+                info.nodes, info.nps, info.hashfull, info.time, info.pv)
+    return None
+
+
+def measure(parse, lines, repeat):
+    """Return the best lines/second over repeat passes."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for line in lines:
+            parse(line)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UCI info-line parser benchmark")
+    parser.add_argument("--lines", type=int, default=300000, help="synthetic corpus size")
+    parser.add_argument("--corpus", help="recorded engine log to use instead")
+    parser.add_argument("--repeat", type=int, default=3, help="passes per parser (best is kept)")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8", errors="replace") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    else:
+        lines = synthetic_corpus(args.lines)
+
+    legacy = measure(legacy_parse, lines, args.repeat)
+    single = measure(reader_path, lines, args.repeat)
+    decoded = measure(all_fields, lines, args.repeat)
+    print(f"corpus:            {len(lines)} lines")
+    print(f"legacy regexes:    {legacy:12,.0f} lines/s (first move and score only)")
+    print(f"single pass:       {single:12,.0f} lines/s (reader path: slot and first move)")
+    print(f"single pass, full: {decoded:12,.0f} lines/s (every field and the full PV decoded)")
+    print(f"reader speedup:    {single / legacy:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
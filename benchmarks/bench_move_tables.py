@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+"""
+Move table benchmark.
+
+Compares Position, which walks move tables built at import, with the
+same rules computing offsets, bounds and palace limits on the fly (the
+implementation before the tables, kept below as ArithmeticPosition).
+For the opening position and busy middlegames it reports the cost per
+generated move of pseudo-legal generation for all pieces and of full
+legal move generation (which adds the attack tests).
+
+Usage:
+    python benchmarks/bench_move_tables.py [--repeat N] [--loops N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from position import (Position, colour_of, in_palace, WIDTH, ORTHOGONAL, DIAGONAL, HORSE_JUMPS,
+                      KING, ADVISOR, ELEPHANT, HORSE, ROOK, CANNON, PAWN, RED)
+
+POSITIONS = [
+    ("opening", "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"),
+    ("middlegame 1", "r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w - - 0 1"),
+    ("middlegame 2", "r2akab2/9/1cn1b1n2/p1p1p3p/6p2/2P3P2/P3P3P/1CN1B1NC1/4A4/R3KAB1R b - - 0 1"),
+    ("middlegame 3", "2bakab2/9/2n1c1n2/p3p1p1p/2p6/1rP3P2/P3P2RP/2N1C1N2/9/2BAKAB2 w - - 0 1"),
+]
+
+
+class ArithmeticPosition(Position):
+    """Position with the pre-table move generation and attack test."""
+
+    def pseudo_moves(self, sq):
+        """
+        Target squares of a piece, ignoring whether its own king is left in check.
+
+        Args:
+            sq: Square index of the piece
+
+        Returns:
+            List of target square indices
+        """
+        squares = self.squares
+        code = squares[sq]
+        if not code:
+            return []
+        colour = code & 8
+        kind = code & 7
+        y, x = divmod(sq, WIDTH)
+        moves = []
+        if kind == ROOK or kind == CANNON:
+            for dx, dy in ORTHOGONAL:
+                nx, ny = x + dx, y + dy
+                screened = False
+                while 0 <= nx <= 8 and 0 <= ny <= 9:
+                    target = ny * WIDTH + nx
+                    other = squares[target]
+                    if other:
+                        if kind == ROOK or screened:
+                            if other & 8 != colour:
+                                moves.append(target)
+                            break
+                        screened = True
+                    elif not screened:
+                        moves.append(target)
+                    nx += dx
+                    ny += dy
+        elif kind == HORSE:
+            for dx, dy, lx, ly in HORSE_JUMPS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx <= 8 and 0 <= ny <= 9 and not squares[(y + ly) * WIDTH + x + lx]:
+                    target = ny * WIDTH + nx
+                    other = squares[target]
+                    if not other or other & 8 != colour:
+                        moves.append(target)
+        elif kind == ELEPHANT:
+            for dx, dy in DIAGONAL:
+                nx, ny = x + 2 * dx, y + 2 * dy
+                if not (0 <= nx <= 8 and 0 <= ny <= 9):
+                    continue
+                # Elephants never cross the river
+                if (ny < 5) if colour == RED else (ny > 4):
+                    continue
+                if not squares[(y + dy) * WIDTH + x + dx]:
+                    target = ny * WIDTH + nx
+                    other = squares[target]
+                    if not other or other & 8 != colour:
+                        moves.append(target)
+        elif kind == ADVISOR or kind == KING:
+            for dx, dy in (DIAGONAL if kind == ADVISOR else ORTHOGONAL):
+                nx, ny = x + dx, y + dy
+                if in_palace(nx, ny, colour):
+                    target = ny * WIDTH + nx
+                    other = squares[target]
+                    if not other or other & 8 != colour:
+                        moves.append(target)
+        elif kind == PAWN:
+            if colour == RED:
+                forward, crossed = y - 1, y <= 4
+            else:
+                forward, crossed = y + 1, y >= 5
+            steps = [(x, forward)] if 0 <= forward <= 9 else []
+            if crossed:
+                steps.append((x - 1, y))
+                steps.append((x + 1, y))
+            for nx, ny in steps:
+                if 0 <= nx <= 8:
+                    target = ny * WIDTH + nx
+                    other = squares[target]
+                    if not other or other & 8 != colour:
+                        moves.append(target)
+        return moves
+
+    def is_square_attacked(self, sq, side):
+        """
+        Check whether a side could capture on a square.
+
+        Works outward from the target instead of generating the attackers'
+        moves: rook and cannon rays (counting the screen), the eight horse
+        origins with their legs, and the few pawn, advisor, elephant and
+        king squares that reach it. A king on the same file with nothing in
+        between attacks the other king (flying general). An empty square
+        counts as attacked if a piece placed there could be captured; a
+        square holding a piece of the attacking side is never attacked.
+
+        Args:
+            sq: Square index
+            side: Attacking side, 'w' or 'b'
+
+        Returns:
+            True if the square is attacked
+        """
+        squares = self.squares
+        colour = colour_of(side)
+        target = squares[sq]
+        if target and target & 8 == colour:
+            return False
+        rook = ROOK | colour
+        cannon = CANNON | colour
+        king = KING | colour
+        facing = target == KING | (colour ^ 8)
+        y, x = divmod(sq, WIDTH)
+
+        for dx, dy in ORTHOGONAL:
+            nx, ny = x + dx, y + dy
+            screened = False
+            while 0 <= nx <= 8 and 0 <= ny <= 9:
+                other = squares[ny * WIDTH + nx]
+                if other:
+                    if screened:
+                        if other == cannon:
+                            return True
+                        break
+                    if other == rook or (facing and dx == 0 and other == king):
+                        return True
+                    screened = True
+                nx += dx
+                ny += dy
+
+        horse = HORSE | colour
+        for dx, dy, lx, ly in HORSE_JUMPS:
+            hx, hy = x - dx, y - dy
+            if 0 <= hx <= 8 and 0 <= hy <= 9 and squares[hy * WIDTH + hx] == horse \
+                    and not squares[(hy + ly) * WIDTH + hx + lx]:
+                return True
+
+        pawn = PAWN | colour
+        if colour == RED:
+            if y < 9 and squares[sq + WIDTH] == pawn:
+                return True
+            crossed = y <= 4
+        else:
+            if y > 0 and squares[sq - WIDTH] == pawn:
+                return True
+            crossed = y >= 5
+        if crossed and ((x > 0 and squares[sq - 1] == pawn) or (x < 8 and squares[sq + 1] == pawn)):
+            return True
+
+        if in_palace(x, y, colour):
+            for dx, dy in ORTHOGONAL:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx <= 8 and 0 <= ny <= 9 and squares[ny * WIDTH + nx] == king:
+                    return True
+            advisor = ADVISOR | colour
+            for dx, dy in DIAGONAL:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx <= 8 and 0 <= ny <= 9 and squares[ny * WIDTH + nx] == advisor:
+                    return True
+
+        if (y >= 5) if colour == RED else (y <= 4):
+            elephant = ELEPHANT | colour
+            for dx, dy in DIAGONAL:
+                nx, ny = x + 2 * dx, y + 2 * dy
+                if 0 <= nx <= 8 and 0 <= ny <= 9 and squares[ny * WIDTH + nx] == elephant \
+                        and not squares[(y + dy) * WIDTH + x + dx]:
+                    return True
+        return False
+
+
+def all_pseudo_moves(position):
+    """Pseudo-legal moves of every piece on the board."""
+    moves = 0
+    for side in (0, 1):
+        for sq in position.piece_squares[side]:
+            moves += len(position.pseudo_moves(sq))
+    return moves
+
+
+def all_legal_moves(position):
+    """Legal moves of the side to move."""
+    return len(position.legal_moves())
+
+
+def measure(count, position, loops, repeat):
+    """Return (best nanoseconds per generated move, moves per call)."""
+    best = None
+    moves = count(position)
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            count(position)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e9 / (loops * max(moves, 1)), moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move table benchmark")
+    parser.add_argument("--loops", type=int, default=300, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="measurements per case (best is kept)")
+    args = parser.parse_args()
+
+    print(f"{'position':14} {'generator':8} {'moves':>5} {'on the fly':>12} {'tables':>12} {'speedup':>8}")
+    for name, fen in POSITIONS:
+        tables = Position(fen)
+        arithmetic = ArithmeticPosition(fen)
+        for label, count in (("pseudo", all_pseudo_moves), ("legal", all_legal_moves)):
+            old, moves = measure(count, arithmetic, args.loops, args.repeat)
+            new, new_moves = measure(count, tables, args.loops, args.repeat)
+            if moves != new_moves:
+                print(f"MISMATCH in {fen}: {moves} vs {new_moves} {label} moves")
+                return 1
+            print(f"{name:14} {label:8} {moves:5} {old:9.0f} ns {new:9.0f} ns {old / new:7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
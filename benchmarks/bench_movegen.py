@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Legal move generation benchmark.
+
+Generates every legal move of the side to move for a set of positions,
+once with the mailbox Position and once with the old dictionary rules
+(legacy_rules.LegacyBoard), checks that both agree and reports positions
+and moves per second.
+
+The positions are the start position plus positions reached by seeded
+random playouts, so runs are comparable.
+
+Usage:
+    python benchmarks/bench_movegen.py [--positions N] [--repeat N] [--seed N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from position import Position, WIDTH
+from legacy_rules import LegacyBoard
+
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+
+
+def mailbox_moves(position):
+    """All legal moves of the side to move as (fx, fy, tx, ty) tuples."""
+    side = 0 if position.turn == 'w' else 1
+    moves = []
+    for sq in tuple(position.piece_squares[side]):
+        fy, fx = divmod(sq, WIDTH)
+        for to in position.legal_moves_from(sq):
+            moves.append((fx, fy, to % WIDTH, to // WIDTH))
+    return moves
+
+
+def random_positions(count, seed):
+    """
+    Collect positions from random playouts.
+
+    Args:
+        count: Number of positions
+        seed: Random seed
+
+    Returns:
+        List of FEN strings
+    """
+    rng = random.Random(seed)
+    fens = [START_FEN]
+    while len(fens) < count:
+        position = Position(START_FEN)
+        for _ in range(rng.randint(10, 120)):
+            moves = mailbox_moves(position)
+            if not moves:
+                break
+            fx, fy, tx, ty = rng.choice(moves)
+            position.make(fy * WIDTH + fx, ty * WIDTH + tx)
+            fens.append(position.fen())
+            if len(fens) >= count:
+                break
+    return fens
+
+
+def measure(generate, boards, repeat):
+    """Return (best seconds, total moves) over repeat passes."""
+    best = None
+    total = 0
+    for _ in range(repeat):
+        total = 0
+        t0 = time.perf_counter()
+        for board in boards:
+            total += len(generate(board))
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Legal move generation benchmark")
+    parser.add_argument("--positions", type=int, default=300, help="number of test positions")
+    parser.add_argument("--repeat", type=int, default=3, help="passes per implementation (best is kept)")
+    parser.add_argument("--seed", type=int, default=1, help="random playout seed")
+    args = parser.parse_args()
+
+    fens = random_positions(args.positions, args.seed)
+    positions = [Position(fen) for fen in fens]
+    legacy = [LegacyBoard(fen) for fen in fens]
+
+    for fen, position, board in zip(fens, positions, legacy):
+        if sorted(mailbox_moves(position)) != sorted(board.legal_moves(board.current_turn)):
+            print(f"MISMATCH in {fen}")
+            return 1
+
+    old_time, old_moves = measure(lambda b: b.legal_moves(b.current_turn), legacy, args.repeat)
+    new_time, new_moves = measure(mailbox_moves, positions, args.repeat)
+    print(f"positions:      {len(fens)} ({new_moves} legal moves, both implementations agree)")
+    print(f"dict pieces:    {len(fens) / old_time:10,.0f} positions/s {old_moves / old_time:12,.0f} moves/s")
+    print(f"mailbox:        {len(fens) / new_time:10,.0f} positions/s {new_moves / new_time:12,.0f} moves/s")
+    print(f"speedup:        {old_time / new_time:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
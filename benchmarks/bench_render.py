@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Board rendering benchmark (needs a display).
+
+Plays a seeded random game on a real Tk canvas twice: once redrawing the
+way the board used to (delete every piece item, create an oval and a
+text item for every piece and redraw the start dots after each move) and
+once with the retained renderer (XiangqiBoard.render_move moves the
+existing items and deletes a captured piece). Both runs flush the canvas
+after every move. Also times a board flip with the retained items.
+
+The per-operation times come from the board's on_render timing hook.
+
+Usage:
+    python benchmarks/bench_render.py [--plies N] [--seed N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tkinter as tk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from board import XiangqiBoard
+
+
+def legacy_draw(board):
+    """Redraw every piece and start dot from scratch, as draw_pieces used to."""
+    canvas = board.canvas
+    canvas.delete("legacy")
+    for (x, y), piece in board.pieces.items():
+        draw_x, draw_y = (8 - x, 9 - y) if board.flipped else (x, y)
+        cx = board.x + draw_x * board.cell
+        cy = board.y + draw_y * board.cell
+        canvas.create_oval(cx - 23, cy - 23, cx + 23, cy + 23, fill='#FDF5E6',
+                           outline=board.colors['lines'], width=2, tags=("legacy", f"piece_{x}_{y}"))
+        canvas.create_text(cx, cy, text=board.piece_symbols.get(piece, piece), font=('SimSun', 22, 'bold'),
+                           fill=board.colors['red'] if piece.isupper() else board.colors['black'],
+                           tags=("legacy", f"piece_{x}_{y}"))
+    for (x, y) in board.start_dots:
+        if (x, y) not in board.pieces:
+            draw_x, draw_y = (8 - x, 9 - y) if board.flipped else (x, y)
+            cx = board.x + draw_x * board.cell
+            cy = board.y + draw_y * board.cell
+            canvas.create_oval(cx - 4, cy - 4, cx + 4, cy + 4, fill=board.colors['start_dot'],
+                               outline='', width=0, tags=("legacy", f"dot_{x}_{y}"))
+
+
+def random_game(board, plies, seed):
+    """Moves of a seeded random game from the board's position, which is restored."""
+    rng = random.Random(seed)
+    position = board.position
+    played = []
+    for _ in range(plies):
+        moves = position.legal_moves()
+        if not moves:
+            break
+        frm, to = rng.choice(moves)
+        played.append((frm, to, position.make(frm, to)))
+    for frm, to, captured in reversed(played):
+        position.unmake(frm, to, captured)
+    return [(frm, to) for frm, to, _ in played]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Board rendering benchmark (needs a display)")
+    parser.add_argument("--plies", type=int, default=200, help="moves to play")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"needs a display: {e}")
+        return 1
+    canvas = tk.Canvas(root, width=640, height=720, bg='#2D2D2D', highlightthickness=0)
+    canvas.pack()
+    board = XiangqiBoard(canvas, x=50, y=60, cell=60)
+    root.update()
+    moves = random_game(board, args.plies, args.seed)
+    start_fen = board.fen()
+
+    # Old: full redraw after every move (the retained items are hidden meanwhile)
+    canvas.itemconfigure("pieces", state=tk.HIDDEN)
+    canvas.itemconfigure("start_dots", state=tk.HIDDEN)
+    t0 = time.perf_counter()
+    for frm, to in moves:
+        board.position.make(frm, to)
+        legacy_draw(board)
+        root.update_idletasks()
+    old_time = time.perf_counter() - t0
+    canvas.delete("legacy")
+    canvas.itemconfigure("pieces", state=tk.NORMAL)
+    canvas.itemconfigure("start_dots", state=tk.NORMAL)
+    board.set_position(start_fen)
+    root.update()
+
+    # New: retained items, timed by the board's hook as well
+    timings = []
+    board.on_render = lambda operation, seconds, changed: timings.append((operation, seconds))
+    t0 = time.perf_counter()
+    for frm, to in moves:
+        board.position.make(frm, to)
+        board.render_move(frm, to)
+        root.update_idletasks()
+    new_time = time.perf_counter() - t0
+    hook_time = sum(seconds for operation, seconds in timings if operation == "render_move")
+    timings.clear()
+    board.flip()
+    root.update_idletasks()
+    flip_time = sum(seconds for _, seconds in timings)
+    root.destroy()
+
+    count = max(len(moves), 1)
+    print(f"moves:            {len(moves)}")
+    print(f"full redraw:      {old_time / count * 1e3:8.3f} ms/move (including canvas flush)")
+    print(f"retained items:   {new_time / count * 1e3:8.3f} ms/move (including canvas flush)")
+    print(f"  render_move:    {hook_time / count * 1e3:8.3f} ms/move (timing hook)")
+    print(f"flip in place:    {flip_time * 1e3:8.3f} ms")
+    print(f"speedup:          {old_time / new_time:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Scripted stand-in for Fairy-Stockfish that speaks just enough UCI for
+XiangqiMO: uci/isready/setoption/ucinewgame/position/go/stop/quit.
+
+It never looks at the position. Every search prints one info line per
+depth and MultiPV slot from a fixed move list, sleeping a configurable
+time per depth, so benchmarks and batch runs can be timed without the
+real engine binary.
+
+Usage:
+    python fake_uci_engine.py [--startup-ms N] [--depth-ms N] [--crash-after N]
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+MOVES = ["h3e3", "b3e3", "h1g3", "b1c3", "g4g5", "c4c5", "i1h1", "a1b1"]
+
+
+class FakeEngine:
+    """
+    Minimal UCI engine emulation driven by stdin commands.
+    """
+    def __init__(self, startup_ms=0, depth_ms=2, crash_after=0):
+        """
+        Initialize the fake engine.
+
+        Args:
+            startup_ms: Delay before answering 'uci', emulating NNUE load
+            depth_ms: Time spent on every search iteration
+            crash_after: Exit without a word after this many searches (0 = never)
+        """
+        self.startup_ms = startup_ms
+        self.depth_ms = depth_ms
+        self.crash_after = crash_after
+        self.multipv = 1
+        self.searches = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.search_thread = None
+
+    def send(self, line):
+        """Write one line to stdout."""
+        with self.lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def search(self, max_depth, movetime):
+        """
+        Run one scripted search and finish it with bestmove.
+
+        Args:
+            max_depth: Last depth to report, None for no depth limit
+            movetime: Time limit in milliseconds, None for no time limit
+        """
+        start = time.monotonic()
+        nodes = 0
+        depth = 0
+        best = MOVES[0]
+        while not self.stop_event.is_set():
+            if max_depth is not None and depth >= max_depth:
+                break
+            elapsed = (time.monotonic() - start) * 1000
+            if movetime is not None and elapsed >= movetime:
+                break
+            depth += 1
+            self.stop_event.wait(self.depth_ms / 1000.0)
+            nodes += 1000 * depth
+            elapsed = max(1, int((time.monotonic() - start) * 1000))
+            for slot in range(1, self.multipv + 1):
+                first = MOVES[(slot - 1) % len(MOVES)]
+                reply = MOVES[(slot + depth) % len(MOVES)]
+                self.send(
+                    f"info depth {depth} seldepth {depth + 3} multipv {slot} "
+                    f"score cp {40 - 15 * slot + depth % 3} nodes {nodes} "
+                    f"nps {nodes * 1000 // elapsed} hashfull {min(1000, depth * 7)} "
+                    f"tbhits 0 time {elapsed} pv {first} {reply} {MOVES[depth % len(MOVES)]}"
+                )
+            best = MOVES[0]
+        self.send(f"bestmove {best} ponder {MOVES[1]}")
+
+    def go(self, args):
+        """
+        Start a search for a 'go' command.
+
+        Args:
+            args: Tokens after 'go'
+        """
+        self.searches += 1
+        if self.crash_after and self.searches > self.crash_after:
+            sys.exit(1)
+        max_depth = None
+        movetime = None
+        if "depth" in args:
+            max_depth = int(args[args.index("depth") + 1])
+        if "movetime" in args:
+            movetime = int(args[args.index("movetime") + 1])
+        if "infinite" not in args and max_depth is None and movetime is None:
+            max_depth = 10
+        self.stop_event.clear()
+        self.search_thread = threading.Thread(target=self.search, args=(max_depth, movetime), daemon=True)
+        self.search_thread.start()
+
+    def wait_search(self):
+        """Block until the running search has printed its bestmove."""
+        if self.search_thread:
+            self.search_thread.join()
+            self.search_thread = None
+
+    def run(self):
+        """Process stdin commands until 'quit' or end of input."""
+        for line in sys.stdin:
+            parts = line.split()
+            if not parts:
+                continue
+            cmd = parts[0]
+            if cmd == "uci":
+                time.sleep(self.startup_ms / 1000.0)
+                self.send("id name FakeFish")
+                self.send("id author XiangqiMO")
+                self.send("option name MultiPV type spin default 1 min 1 max 500")
+                self.send("uciok")
+            elif cmd == "isready":
+                self.send("readyok")
+            elif cmd == "setoption" and len(parts) >= 5 and parts[2] == "MultiPV":
+                self.multipv = max(1, int(parts[4]))
+            elif cmd == "go":
+                self.wait_search()
+                self.go(parts[1:])
+            elif cmd == "stop":
+                self.stop_event.set()
+                self.wait_search()
+            elif cmd == "quit":
+                break
+        self.stop_event.set()
+        self.wait_search()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scripted fake UCI engine")
+    parser.add_argument("--startup-ms", type=int, default=0)
+    parser.add_argument("--depth-ms", type=int, default=2)
+    parser.add_argument("--crash-after", type=int, default=0)
+    args = parser.parse_args()
+    FakeEngine(args.startup_ms, args.depth_ms, args.crash_after).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+The dictionary-based move rules of XiangqiBoard as they were before the
+mailbox Position, kept verbatim (minus the canvas) so benchmarks can
+compare against them and cross-check the new rules code.
+"""
+
+
+class LegacyBoard:
+    """
+    Rules-only copy of the old XiangqiBoard: pieces is a dict
+    (x, y) -> piece character.
+    """
+    def __init__(self, fen):
+        """
+        Load a position.
+
+        Args:
+            fen: FEN string
+        """
+        self.pieces = {}
+        for y, row in enumerate(fen.split()[0].split('/')):
+            x = 0
+            for char in row:
+                if char.isdigit():
+                    x += int(char)
+                else:
+                    self.pieces[(x, y)] = char
+                    x += 1
+        self.current_turn = fen.split()[1] if len(fen.split()) > 1 else 'w'
+
+    def is_square_attacked(self, x, y, attacking_color):
+        """
+        Check if a square is attacked by pieces of given color.
+        
+        Args:
+            x: Board x-coordinate
+            y: Board y-coordinate
+            attacking_color: 'w' for red, 'b' for black
+            
+        Returns:
+            True if square is attacked, False otherwise
+        """
+        for (fx, fy), piece in self.pieces.items():
+            if (piece.isupper() and attacking_color == 'w') or (not piece.isupper() and attacking_color == 'b'):
+                moves = self.generate_pseudo_legal_moves_for_piece(fx, fy, check_open_king=False)
+                if (x, y) in moves:
+                    return True
+        return False
+
+    def generate_pseudo_legal_moves_for_piece(self, x, y, check_open_king=True):
+        """
+        Generate pseudo-legal moves for a piece (without checking if they expose the king).
+        
+        Args:
+            x: Board x-coordinate
+            y: Board y-coordinate
+            check_open_king: Whether to filter out moves that expose the king
+            
+        Returns:
+            List of (x, y) tuples representing possible moves
+        """
+        piece = self.pieces.get((x, y))
+        if not piece:
+            return []
+        piece_type = piece.lower()
+        is_red = piece.isupper()
+        moves = []
+        if piece_type == 'r':
+            directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+            for dx, dy in directions:
+                nx, ny = x + dx, y + dy
+                while 0 <= nx <= 8 and 0 <= ny <= 9:
+                    if (nx, ny) in self.pieces:
+                        if self.pieces[(nx, ny)].isupper() != is_red:
+                            moves.append((nx, ny))
+                        break
+                    moves.append((nx, ny))
+                    nx += dx
+                    ny += dy
+        if piece_type == 'n':
+            horse_moves = [
+                (1, 2), (1, -2), (-1, 2), (-1, -2),
+                (2, 1), (2, -1), (-2, 1), (-2, -1)
+            ]
+            block_dirs = {
+                (1, 2): (0, 1), (1, -2): (0, -1),
+                (-1, 2): (0, 1), (-1, -2): (0, -1),
+                (2, 1): (1, 0), (2, -1): (1, 0),
+                (-2, 1): (-1, 0), (-2, -1): (-1, 0)
+            }
+            for dx, dy in horse_moves:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx <= 8 and 0 <= ny <= 9:
+                    bx, by = x + block_dirs[(dx, dy)][0], y + block_dirs[(dx, dy)][1]
+                    if (bx, by) not in self.pieces:
+                        if (nx, ny) not in self.pieces:
+                            moves.append((nx, ny))
+                        elif self.pieces[(nx, ny)].isupper() != is_red:
+                            moves.append((nx, ny))
+        if piece_type == 'b':
+            elephant_moves = [(2, 2), (2, -2), (-2, 2), (-2, -2)]
+            for dx, dy in elephant_moves:
+                nx, ny = x + dx, y + dy
+                if nx < 0 or nx > 8 or ny < 0 or ny > 9:
+                    continue
+                if is_red:
+                    if ny < 5: continue
+                else:
+                    if ny > 4: continue
+                mx, my = x + dx//2, y + dy//2
+                if (mx, my) not in self.pieces:
+                    if (nx, ny) not in self.pieces:
+                        moves.append((nx, ny))
+                    elif self.pieces[(nx, ny)].isupper() != is_red:
+                        moves.append((nx, ny))
+        if piece_type == 'a':
+            advisor_moves = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+            for dx, dy in advisor_moves:
+                nx, ny = x + dx, y + dy
+                if nx < 0 or nx > 8 or ny < 0 or ny > 9:
+                    continue
+                if is_red:
+                    if 3 <= nx <= 5 and 7 <= ny <= 9:
+                        if (nx, ny) not in self.pieces:
+                            moves.append((nx, ny))
+                        elif self.pieces[(nx, ny)].isupper() != is_red:
+                            moves.append((nx, ny))
+                else:
+                    if 3 <= nx <= 5 and 0 <= ny <= 2:
+                        if (nx, ny) not in self.pieces:
+                            moves.append((nx, ny))
+                        elif self.pieces[(nx, ny)].isupper() != is_red:
+                            moves.append((nx, ny))
+        if piece_type == 'k':
+            king_moves = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+            for dx, dy in king_moves:
+                nx, ny = x + dx, y + dy
+                if nx < 0 or nx > 8 or ny < 0 or ny > 9:
+                    continue
+                if is_red:
+                    if 3 <= nx <= 5 and 7 <= ny <= 9:
+                        if (nx, ny) not in self.pieces:
+                            moves.append((nx, ny))
+                        elif self.pieces[(nx, ny)].isupper() != is_red:
+                            moves.append((nx, ny))
+                else:
+                    if 3 <= nx <= 5 and 0 <= ny <= 2:
+                        if (nx, ny) not in self.pieces:
+                            moves.append((nx, ny))
+                        elif self.pieces[(nx, ny)].isupper() != is_red:
+                            moves.append((nx, ny))
+        if piece_type == 'c':
+            directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+            for dx, dy in directions:
+                nx, ny = x + dx, y + dy
+                jumped = False
+                while 0 <= nx <= 8 and 0 <= ny <= 9:
+                    if (nx, ny) in self.pieces:
+                        if not jumped:
+                            jumped = True
+                        else:
+                            if self.pieces[(nx, ny)].isupper() != is_red:
+                                moves.append((nx, ny))
+                            break
+                    else:
+                        if not jumped:
+                            moves.append((nx, ny))
+                    nx += dx
+                    ny += dy
+        if piece_type == 'p':
+            if is_red:
+                if y > 0:
+                    nx, ny = x, y - 1
+                    if (nx, ny) not in self.pieces:
+                        moves.append((nx, ny))
+                    elif self.pieces[(nx, ny)].isupper() != is_red:
+                        moves.append((nx, ny))
+                if y <= 4:
+                    for nx in [x - 1, x + 1]:
+                        if 0 <= nx <= 8:
+                            ny = y
+                            if (nx, ny) not in self.pieces:
+                                moves.append((nx, ny))
+                            elif self.pieces[(nx, ny)].isupper() != is_red:
+                                moves.append((nx, ny))
+            else:
+                if y < 9:
+                    nx, ny = x, y + 1
+                    if (nx, ny) not in self.pieces:
+                        moves.append((nx, ny))
+                    elif self.pieces[(nx, ny)].isupper() != is_red:
+                        moves.append((nx, ny))
+                if y >= 5:
+                    for nx in [x - 1, x + 1]:
+                        if 0 <= nx <= 8:
+                            ny = y
+                            if (nx, ny) not in self.pieces:
+                                moves.append((nx, ny))
+                            elif self.pieces[(nx, ny)].isupper() != is_red:
+                                moves.append((nx, ny))
+        if check_open_king:
+            filtered = []
+            for tx, ty in moves:
+                if not self.would_expose_king(x, y, tx, ty, is_red):
+                    filtered.append((tx, ty))
+            return filtered
+        return moves
+
+    def would_expose_king(self, fx, fy, tx, ty, is_red):
+        """
+        Check if moving a piece would expose the king to check.
+        
+        Args:
+            fx: From x-coordinate
+            fy: From y-coordinate
+            tx: To x-coordinate
+            ty: To y-coordinate
+            is_red: True if moving piece is red
+            
+        Returns:
+            True if move would expose king, False otherwise
+        """
+        captured = self.pieces.pop((tx, ty), None)
+        moved_piece = self.pieces.pop((fx, fy))
+        self.pieces[(tx, ty)] = moved_piece
+        king_pos_red = None
+        king_pos_black = None
+        for (kx, ky), p in self.pieces.items():
+            if p == 'K':
+                king_pos_red = (kx, ky)
+            elif p == 'k':
+                king_pos_black = (kx, ky)
+        illegal = False
+        if king_pos_red and king_pos_black:
+            rx, ry = king_pos_red
+            bx, by = king_pos_black
+            if rx == bx:
+                y_min, y_max = min(ry, by), max(ry, by)
+                block = False
+                for yy in range(y_min + 1, y_max):
+                    if (rx, yy) in self.pieces:
+                        block = True
+                        break
+                if not block:
+                    illegal = True
+        if not illegal:
+            if is_red:
+                if king_pos_red and self.is_square_attacked(king_pos_red[0], king_pos_red[1], 'b'):
+                    illegal = True
+            else:
+                if king_pos_black and self.is_square_attacked(king_pos_black[0], king_pos_black[1], 'w'):
+                    illegal = True
+        del self.pieces[(tx, ty)]
+        self.pieces[(fx, fy)] = moved_piece
+        if captured:
+            self.pieces[(tx, ty)] = captured
+        return illegal
+
+    def is_in_check(self, color):
+        """
+        Check if the king of given color is in check.
+        
+        Args:
+            color: 'w' for red, 'b' for black
+            
+        Returns:
+            True if king is in check, False otherwise
+        """
+        king_pos = None
+        for (x, y), piece in self.pieces.items():
+            if (color == 'w' and piece == 'K') or (color == 'b' and piece == 'k'):
+                king_pos = (x, y)
+                break
+        if not king_pos:
+            return False
+        attacking_color = 'b' if color == 'w' else 'w'
+        return self.is_square_attacked(king_pos[0], king_pos[1], attacking_color)
+
+    def is_in_checkmate(self, color):
+        """
+        Check if the king of given color is in checkmate.
+        
+        Args:
+            color: 'w' for red, 'b' for black
+            
+        Returns:
+            True if king is in checkmate, False otherwise
+        """
+        if not self.is_in_check(color):
+            return False
+        
+        # Collect all pieces of the given color first to avoid dictionary changes during iteration
+        pieces_of_color = []
+        for (x, y), piece in list(self.pieces.items()):
+            if (color == 'w' and piece.isupper()) or (color == 'b' and not piece.isupper()):
+                pieces_of_color.append((x, y, piece))
+        
+        # Check each piece
+        for x, y, piece in pieces_of_color:
+            moves = self.generate_pseudo_legal_moves_for_piece(x, y, check_open_king=True)
+            if moves:
+                return False
+        return True
+
+    def legal_moves(self, color):
+        """
+        All legal moves of a side, the way the GUI produced them: piece by piece.
+
+        Args:
+            color: 'w' for red, 'b' for black
+
+        Returns:
+            List of (fx, fy, tx, ty) tuples
+        """
+        moves = []
+        for (x, y), piece in list(self.pieces.items()):
+            if piece.isupper() == (color == 'w'):
+                for tx, ty in self.generate_pseudo_legal_moves_for_piece(x, y, check_open_king=True):
+                    moves.append((x, y, tx, ty))
+        return moves
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Perft: count the leaf nodes of the legal move tree to a fixed depth.
+
+Runs the headless rules (position.Position) over a set of standard
+Xiangqi test positions whose node counts are known, reports nodes per
+second and exits with status 1 if any count is wrong. This is the
+regression gate for rules changes and their performance scoreboard.
+
+--divide prints the count below every root move (compare with another
+engine's 'go perft' to find the move that differs). --jobs N splits the
+root moves over N worker processes for deeper runs.
+
+Usage:
+    python benchmarks/perft.py [--depth N] [--jobs N]
+    python benchmarks/perft.py --fen FEN --depth N [--divide] [--jobs N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from position import Position, uci_move
+
+# (name, FEN, node counts for depth 1, 2, ...)
+POSITIONS = [
+    ("start", "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1",
+     [44, 1920, 79666, 3290240, 133312995]),
+    ("middlegame", "r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w - - 0 1",
+     [38, 1128, 43929, 1339047]),
+    ("few replies", "1cbak4/9/n2a5/2p1p3p/5cp2/2n2N3/6PCP/3AB4/2C6/3A1K1N1 w - - 0 1",
+     [7, 281, 8620, 326201]),
+    ("rook ending", "5a3/3k5/3aR4/9/5r3/5n3/9/3A1A3/5K3/2BC2B2 w - - 0 1",
+     [25, 424, 9850, 202884]),
+    ("attack 1", "CRN1k1b2/3ca4/4ba3/9/2nr5/9/9/4B4/4A4/4KA3 w - - 0 1",
+     [28, 516, 14808, 395483]),
+    ("attack 2", "R1N1k1b2/9/3aba3/9/2nr5/2B6/9/4B4/4A4/4KA3 w - - 0 1",
+     [21, 364, 7626, 162837]),
+    ("advanced pawns", "C1nNk4/9/9/9/9/9/n1pp5/B3C4/9/3A1K3 w - - 0 1",
+     [28, 222, 6241, 64971]),
+]
+
+
+def perft(position, depth):
+    """
+    Count leaf nodes of the legal move tree.
+
+    Args:
+        position: Position (restored before returning)
+        depth: Plies to search, at least 1
+
+    Returns:
+        Number of leaf nodes
+    """
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for frm, to in moves:
+        captured = position.make(frm, to)
+        nodes += perft(position, depth - 1)
+        position.unmake(frm, to, captured)
+    return nodes
+
+
+def _subtree(task):
+    """Pool worker: perft below one root move."""
+    position, frm, to, depth = task
+    position.make(frm, to)
+    return perft(position, depth - 1) if depth > 1 else 1
+
+
+def divide(position, depth, pool=None):
+    """
+    Count leaf nodes below every root move.
+
+    Args:
+        position: Position
+        depth: Plies to search, at least 1
+        pool: ProcessPoolExecutor to spread the root moves over (optional)
+
+    Returns:
+        List of (uci_move, nodes) in generation order
+    """
+    moves = position.legal_moves()
+    tasks = [(position, frm, to, depth) for frm, to in moves]
+    if pool is not None:
+        counts = list(pool.map(_subtree, tasks))
+    else:
+        counts = [_subtree((position.copy(), frm, to, d)) for _, frm, to, d in tasks]
+    return [(uci_move(frm, to), count) for (frm, to), count in zip(moves, counts)]
+
+
+def run(position, depth, pool):
+    """Total node count, through the pool if there is one."""
+    if pool is None:
+        return perft(position, depth)
+    return sum(count for _, count in divide(position, depth, pool))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Xiangqi perft over the headless rules")
+    parser.add_argument("--depth", type=int, default=3, help="search depth (default 3)")
+    parser.add_argument("--fen", help="count this position instead of the standard set")
+    parser.add_argument("--divide", action="store_true", help="print the count below every root move")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes for the root moves")
+    args = parser.parse_args()
+
+    pool = ProcessPoolExecutor(args.jobs) if args.jobs > 1 else None
+    try:
+        if args.fen:
+            position = Position(args.fen)
+            start = time.perf_counter()
+            if args.divide:
+                results = divide(position, args.depth, pool)
+                for move, count in results:
+                    print(f"{move}: {count}")
+                nodes = sum(count for _, count in results)
+                print(f"moves: {len(results)}")
+            else:
+                nodes = run(position, args.depth, pool)
+            elapsed = time.perf_counter() - start
+            print(f"nodes: {nodes}  ({elapsed:.2f} s, {nodes / max(elapsed, 1e-9):,.0f} nodes/s)")
+            return 0
+
+        failures = 0
+        total_nodes = 0
+        total_time = 0.0
+        for name, fen, counts in POSITIONS:
+            if args.depth > len(counts):
+                print(f"{name:15} no known count at depth {args.depth}, skipped")
+                continue
+            expected = counts[args.depth - 1]
+            position = Position(fen)
+            start = time.perf_counter()
+            nodes = run(position, args.depth, pool)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+            if nodes != expected:
+                failures += 1
+            print(f"{name:15} depth {args.depth}: {nodes:>11,} nodes  {elapsed:7.2f} s "
+                  f"{nodes / max(elapsed, 1e-9):>10,.0f} nodes/s  {status}")
+        if total_time > 0:
+            print(f"{'total':15} depth {args.depth}: {total_nodes:>11,} nodes  {total_time:7.2f} s "
+                  f"{total_nodes / total_time:>10,.0f} nodes/s")
+        if failures:
+            print(f"{failures} position(s) with wrong node counts")
+            return 1
+        return 0
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
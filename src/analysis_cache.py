@@ -0,0 +1,274 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+# Transform flags for canonical positions; both are involutions and
+# commute, so applying the same flags again maps a result back.
+MIRROR = 1        # left-right mirror (file a <-> i)
+COLOUR_FLIP = 2   # swap colours and rotate the board 180 degrees
+
+_MOVE_RE = re.compile(r"^([a-i])(\d{1,2})([a-i])(\d{1,2})$")
+
+
+def normalize_fen(fen):
+    """
+    Reduce a FEN to the parts that define the position for analysis.
+
+    Args:
+        fen: FEN string
+
+    Returns:
+        Tuple (placement, side) with side 'w' or 'b'
+    """
+    parts = fen.split()
+    side = parts[1] if len(parts) > 1 and parts[1] in ("w", "b") else "w"
+    return parts[0], side
+
+
+def expand_rows(placement):
+    """Split a FEN placement into rows of single characters ('1' per empty square)."""
+    rows = []
+    for row in placement.split("/"):
+        cells = []
+        for char in row:
+            if char.isdigit():
+                cells.extend("1" * int(char))
+            else:
+                cells.append(char)
+        rows.append(cells)
+    return rows
+
+
+def compress_rows(rows):
+    """Inverse of expand_rows."""
+    out = []
+    for cells in rows:
+        text = ""
+        empty = 0
+        for char in cells:
+            if char == "1":
+                empty += 1
+            else:
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += char
+        if empty:
+            text += str(empty)
+        out.append(text)
+    return "/".join(out)
+
+
+def transform_position(placement, side, flags):
+    """
+    Apply mirror and/or colour flip to a position.
+
+    Args:
+        placement: FEN placement field
+        side: Side to move, 'w' or 'b'
+        flags: Combination of MIRROR and COLOUR_FLIP
+
+    Returns:
+        Tuple (placement, side) of the transformed position
+    """
+    rows = expand_rows(placement)
+    if flags & MIRROR:
+        rows = [cells[::-1] for cells in rows]
+    if flags & COLOUR_FLIP:
+        rows = [[c.swapcase() for c in cells[::-1]] for cells in rows[::-1]]
+        side = "b" if side == "w" else "w"
+    return compress_rows(rows), side
+
+
+def transform_move(move, flags):
+    """
+    Map a UCI move through the same transform as its position.
+
+    Args:
+        move: UCI move string (ranks 1-10)
+        flags: Combination of MIRROR and COLOUR_FLIP
+
+    Returns:
+        Transformed move, or the move unchanged if it cannot be parsed
+    """
+    m = _MOVE_RE.match(move)
+    if not m or not flags:
+        return move
+    f1, r1, f2, r2 = m.group(1), int(m.group(2)), m.group(3), int(m.group(4))
+    if flags & MIRROR:
+        f1 = chr(ord("a") + ord("i") - ord(f1))
+        f2 = chr(ord("a") + ord("i") - ord(f2))
+    if flags & COLOUR_FLIP:
+        f1 = chr(ord("a") + ord("i") - ord(f1))
+        f2 = chr(ord("a") + ord("i") - ord(f2))
+        r1 = 11 - r1
+        r2 = 11 - r2
+    return f"{f1}{r1}{f2}{r2}"
+
+
+def canonical_position(fen):
+    """
+    Pick the representative of a position among its mirror/colour-flip
+    images, so that symmetric positions share cache entries.
+
+    Args:
+        fen: FEN string
+
+    Returns:
+        Tuple (placement, side, flags) where flags map the original
+        position to the representative (and back)
+    """
+    placement, side = normalize_fen(fen)
+    best = None
+    for flags in (0, MIRROR, COLOUR_FLIP, MIRROR | COLOUR_FLIP):
+        p, s = transform_position(placement, side, flags)
+        if best is None or (p, s) < best[:2]:
+            best = (p, s, flags)
+    return best
+
+
+class AnalysisCache:
+    """
+    Persistent store of finished engine analyses in SQLite (WAL mode).
+
+    Entries are keyed by canonical position, engine identity and MultiPV
+    count and keep only the deepest result. A request is answered when an
+    entry with at least the requested depth and MultiPV exists. The
+    least recently used entries are evicted above max_entries.
+    """
+    def __init__(self, path, max_entries=100000):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite file; its directory is created if needed
+            max_entries: Number of entries kept before LRU eviction
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS analysis ("
+            " position TEXT NOT NULL,"
+            " side TEXT NOT NULL,"
+            " engine TEXT NOT NULL,"
+            " multipv INTEGER NOT NULL,"
+            " depth INTEGER NOT NULL,"
+            " lines TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (position, side, engine, multipv))"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS analysis_lru ON analysis (last_used)")
+        self.db.commit()
+        self.count = self.db.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+
+    def get(self, fen, engine_id, depth, multipv):
+        """
+        Look up an analysis of at least the given depth and MultiPV.
+
+        Args:
+            fen: FEN of the position
+            engine_id: Engine identity string (name and options)
+            depth: Requested search depth
+            multipv: Requested number of lines
+
+        Returns:
+            List of (raw, pv_text) pairs, one per MultiPV slot, with moves
+            mapped back to the requested orientation; None on a miss
+        """
+        placement, side, flags = canonical_position(fen)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT rowid, lines FROM analysis"
+                " WHERE position = ? AND side = ? AND engine = ? AND multipv >= ? AND depth >= ?"
+                " ORDER BY depth DESC LIMIT 1",
+                (placement, side, engine_id, multipv, depth)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.db.execute("UPDATE analysis SET last_used = ? WHERE rowid = ?", (time.time(), row[0]))
+            self.db.commit()
+        lines = []
+        for raw, pv_text in json.loads(row[1])[:multipv]:
+            if pv_text and flags:
+                pv_text = " ".join(transform_move(m, flags) for m in pv_text.split())
+            lines.append((tuple(raw), pv_text))
+        return lines
+
+    def put(self, fen, engine_id, depth, lines):
+        """
+        Store a finished analysis, unless a deeper one is already cached.
+
+        Args:
+            fen: FEN of the position
+            engine_id: Engine identity string
+            depth: Depth the search completed
+            lines: List of (raw, pv_text) pairs in MultiPV order
+        """
+        placement, side, flags = canonical_position(fen)
+        stored = []
+        for raw, pv_text in lines:
+            if pv_text and flags:
+                pv_text = " ".join(transform_move(m, flags) for m in pv_text.split())
+            stored.append([list(raw), pv_text])
+        with self.lock:
+            existing = self.db.execute(
+                "SELECT depth FROM analysis WHERE position = ? AND side = ? AND engine = ? AND multipv = ?",
+                (placement, side, engine_id, len(lines))
+            ).fetchone()
+            if existing is not None and existing[0] > depth:
+                return
+            self.db.execute(
+                "INSERT OR REPLACE INTO analysis (position, side, engine, multipv, depth, lines, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (placement, side, engine_id, len(lines), depth, json.dumps(stored), time.time())
+            )
+            if existing is None:
+                self.count += 1
+            self.stores += 1
+            if self.count > self.max_entries:
+                excess = self.count - self.max_entries
+                self.db.execute(
+                    "DELETE FROM analysis WHERE rowid IN"
+                    " (SELECT rowid FROM analysis ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                self.count -= excess
+                self.evictions += excess
+            self.db.commit()
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            Dictionary with hits, misses, stores, evictions and entries
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": self.count,
+        }
+
+    def close(self):
+        """Close the database."""
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from engine import StockfishEngine
+from analysis_cache import AnalysisCache
+
+
+def read_fens(stream):
+    """
+    Read FEN strings, one per line. Blank lines and lines starting
+    with '#' are skipped.
+
+    Args:
+        stream: Text stream to read from
+
+    Returns:
+        List of FEN strings in input order
+    """
+    fens = []
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            fens.append(line)
+    return fens
+
+
+def load_checkpoint(path):
+    """
+    Collect the positions that already have a result in an output file.
+    They are keyed by input position number as well as FEN, so repeated
+    FENs in the input each keep their own result.
+
+    Args:
+        path: JSON-lines output file of an earlier run
+
+    Returns:
+        Set of finished (index, fen) tuples (empty if the file does not exist)
+    """
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Last line of an interrupted run may be cut off
+                continue
+            if "index" in record and "fen" in record and "error" not in record:
+                done.add((record["index"], record["fen"]))
+    return done
+
+
+def default_workers(threads_per_engine):
+    """
+    Size the pool so that all engines together use every core once.
+
+    Args:
+        threads_per_engine: Search threads given to each engine
+
+    Returns:
+        Number of engine processes to start
+    """
+    cores = os.cpu_count() or 1
+    return max(1, cores // max(1, threads_per_engine))
+
+
+def make_record(index, fen, engine, results):
+    """
+    Build the JSON result for one analysed position.
+
+    Args:
+        index: Position number in the input
+        fen: Analysed FEN
+        engine: Engine that ran the search (its last_info is read)
+        results: Return value of analyze_multi
+
+    Returns:
+        Dictionary ready for json.dumps
+    """
+    lines = []
+    for slot in sorted(engine.last_info):
+        info = engine.last_info[slot]
+        lines.append({
+            "multipv": slot,
+            "score_cp": info.score_cp,
+            "score_mate": info.score_mate,
+            "depth": info.depth,
+            "nodes": info.nodes,
+            "pv": info.pv,
+        })
+    best = lines[0] if lines else {}
+    return {
+        "index": index,
+        "fen": fen,
+        "bestmove": results[0][0] if results else None,
+        "score_cp": best.get("score_cp"),
+        "score_mate": best.get("score_mate"),
+        "depth": best.get("depth"),
+        "nodes": best.get("nodes"),
+        "pv": best.get("pv"),
+        "lines": lines,
+        "cached": engine.last_from_cache,
+    }
+
+
+class EnginePool:
+    """
+    Pool of engine processes analysing FENs in parallel.
+    Each worker thread owns one StockfishEngine; results are handed to the
+    caller as they complete, not in input order.
+    """
+    def __init__(self, workers, engine_path="fairy-stockfish.exe", engine_args=None,
+                 threads=1, hash_mb=64, depth=15, multipv=1, timeout=None, cache=None, movetime=None):
+        """
+        Initialize the pool.
+
+        Args:
+            workers: Number of engine processes
+            engine_path: Engine executable
+            engine_args: Extra command line arguments for the engine
+            threads: Threads option for every engine
+            hash_mb: Hash option (MB) for every engine
+            depth: Search depth per position (None: limited by movetime only)
+            multipv: Lines per position
+            timeout: Seconds allowed per search (engine default if None)
+            cache: AnalysisCache shared by all engines (optional)
+            movetime: Milliseconds allowed per position (optional)
+        """
+        self.workers = workers
+        self.engine_path = engine_path
+        self.engine_args = engine_args
+        self.options = {"Threads": threads, "Hash": hash_mb}
+        self.depth = depth
+        self.multipv = multipv
+        self.timeout = timeout
+        self.cache = cache
+        self.movetime = movetime
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+
+    def _worker(self):
+        """Worker thread: analyse positions until the task queue runs dry."""
+        engine = StockfishEngine(self.engine_path, self.engine_args, self.options)
+        engine.cache = self.cache
+        if self.timeout:
+            engine.SEARCH_TIMEOUT = self.timeout
+        try:
+            while True:
+                try:
+                    index, fen = self.tasks.get_nowait()
+                except queue.Empty:
+                    break
+                record = None
+                # One retry: a crashed engine is restarted by ensure_started
+                for attempt in range(2):
+                    if not engine.ensure_started():
+                        continue
+                    results = engine.analyze_multi(fen, depth=self.depth, multipv=self.multipv,
+                                                   movetime=self.movetime)
+                    if results and results[0][0]:
+                        record = make_record(index, fen, engine, results)
+                        break
+                    if engine.is_alive() and engine.ready:
+                        # Engine is fine, the position simply has no move
+                        record = make_record(index, fen, engine, results)
+                        break
+                if record is None:
+                    record = {"index": index, "fen": fen, "error": "engine"}
+                self.results.put(record)
+        finally:
+            engine.close()
+            self.results.put(None)
+
+    def cancel(self):
+        """Drop the positions no worker has taken yet; running searches still finish."""
+        while True:
+            try:
+                self.tasks.get_nowait()
+            except queue.Empty:
+                return
+
+    def run(self, fens):
+        """
+        Analyse positions and yield their records as they complete.
+
+        Args:
+            fens: List of (index, fen) tuples
+
+        Yields:
+            Result dictionaries
+        """
+        for item in fens:
+            self.tasks.put(item)
+        count = min(self.workers, len(fens))
+        for _ in range(count):
+            threading.Thread(target=self._worker, daemon=True).start()
+        finished = 0
+        while finished < count:
+            record = self.results.get()
+            if record is None:
+                finished += 1
+            else:
+                yield record
+
+
+def main(argv=None):
+    """
+    Command line entry point for batch analysis.
+
+    Args:
+        argv: Argument list (sys.argv[1:] if None)
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Analyse many Xiangqi positions with a pool of engines.")
+    parser.add_argument("input", nargs="?", default="-", help="file with one FEN per line, '-' for stdin")
+    parser.add_argument("-o", "--output", help="JSON-lines output file (stdout if omitted)")
+    parser.add_argument("--resume", action="store_true", help="skip positions already present in the output file")
+    parser.add_argument("-j", "--workers", type=int, help="engine processes (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="search threads per engine")
+    parser.add_argument("--hash", type=int, default=64, help="hash size per engine in MB")
+    parser.add_argument("--depth", type=int, help="search depth (default: 15, or none with --movetime)")
+    parser.add_argument("--movetime", type=int, help="milliseconds per position")
+    parser.add_argument("--multipv", type=int, default=1, help="lines per position")
+    parser.add_argument("--timeout", type=float, help="seconds allowed per search")
+    parser.add_argument("--cache", help="SQLite analysis cache to read and fill")
+    parser.add_argument("--engine", default="fairy-stockfish.exe", help="engine executable")
+    parser.add_argument("--engine-arg", action="append", default=[], help="extra engine argument (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        fens = read_fens(sys.stdin)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            fens = read_fens(f)
+
+    # Accept a bare command name (e.g. 'python') as well as a file path
+    engine_path = args.engine
+    if os.path.exists(engine_path):
+        engine_path = os.path.abspath(engine_path)
+    elif shutil.which(engine_path):
+        engine_path = shutil.which(engine_path)
+
+    done = load_checkpoint(args.output) if args.resume else set()
+    todo = [(i, fen) for i, fen in enumerate(fens) if (i, fen) not in done]
+    workers = args.workers or default_workers(args.threads)
+    depth = args.depth if args.depth is not None or args.movetime else 15
+    print(f"{len(fens)} positions, {len(fens) - len(todo)} already done, "
+          f"{workers} engines x {args.threads} threads", file=sys.stderr)
+
+    if args.output:
+        out = open(args.output, "a" if args.resume else "w", encoding="utf-8")
+        if args.resume and out.tell() > 0:
+            with open(args.output, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a line cut off by an interrupted run
+                    out.write("\n")
+    else:
+        out = sys.stdout
+    cache = AnalysisCache(args.cache) if args.cache else None
+    pool = EnginePool(workers, engine_path, args.engine_arg, args.threads, args.hash,
+                      depth, args.multipv, args.timeout, cache, args.movetime)
+    start = time.monotonic()
+    last_report = start
+    completed = 0
+    errors = 0
+    try:
+        for record in pool.run(todo):
+            out.write(json.dumps(record) + "\n")
+            # Every finished line is a checkpoint for --resume
+            out.flush()
+            completed += 1
+            if "error" in record:
+                errors += 1
+            now = time.monotonic()
+            if now - last_report >= 5:
+                last_report = now
+                print(f"{completed}/{len(todo)} done, {completed / (now - start):.1f} pos/s", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if cache:
+            stats = cache.stats()
+            print(f"cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries",
+                  file=sys.stderr)
+            cache.close()
+    elapsed = time.monotonic() - start
+    rate = completed / elapsed if elapsed > 0 else 0.0
+    print(f"finished {completed} positions in {elapsed:.1f} s ({rate:.1f} pos/s), {errors} errors",
+          file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
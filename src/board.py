@@ -1,10 +1,110 @@
+import sys
+import threading
+import time
 import tkinter as tk
+from collections.abc import MutableMapping
 from translator import tr
+from game_tree import GameTree
+from piece_images import PieceImageCache
+from repetition import RepetitionTable, move_threats
+from position import Position, square, parse_uci_move, uci_move, CHECKMATE, STALEMATE, EMPTY, PIECE_CHARS, PIECE_CODES, WIDTH, HEIGHT, SQUARES
+
+
+# Marks a square in XiangqiBoard.drawn whose items must be rebuilt
+UNDRAWN = 0xFF
+
+# Cell size in pixels that all the drawing sizes below are given for
+BASE_CELL = 60
+
+
+def position_rules(position):
+    """
+    Legal moves and game status of a position, as worked out by the rules
+    worker thread.
+
+    Args:
+        position: Position not used by any other thread
+
+    Returns:
+        Tuple (targets, status): from square -> list of legal target
+        squares for the side to move, and the game status
+    """
+    targets = {}
+    for frm, to in position.legal_moves():
+        targets.setdefault(frm, []).append(to)
+    return targets, position.game_status()
+
+
+class PieceMap(MutableMapping):
+    """
+    Dictionary view of a Position: (x, y) -> piece character.
+
+    Reads and writes go straight to the position, so code written against
+    the old pieces dictionary keeps working on the mailbox.
+    """
+    def __init__(self, position):
+        """
+        Wrap a position.
+
+        Args:
+            position: Position to expose
+        """
+        self.position = position
+
+    @staticmethod
+    def _square(key):
+        """Square index of an (x, y) key, or -1 if it is off the board."""
+        try:
+            x, y = key
+        except (TypeError, ValueError):
+            return -1
+        if 0 <= x < WIDTH and 0 <= y < HEIGHT:
+            return y * WIDTH + x
+        return -1
+
+    def __getitem__(self, key):
+        sq = self._square(key)
+        code = self.position.squares[sq] if sq >= 0 else EMPTY
+        if not code:
+            raise KeyError(key)
+        return PIECE_CHARS[code]
+
+    def get(self, key, default=None):
+        sq = self._square(key)
+        code = self.position.squares[sq] if sq >= 0 else EMPTY
+        return PIECE_CHARS[code] if code else default
+
+    def __contains__(self, key):
+        sq = self._square(key)
+        return sq >= 0 and self.position.squares[sq] != EMPTY
+
+    def __setitem__(self, key, piece):
+        sq = self._square(key)
+        if sq < 0 or piece not in PIECE_CODES:
+            raise KeyError(key)
+        self.position.put(sq, PIECE_CODES[piece])
+
+    def __delitem__(self, key):
+        sq = self._square(key)
+        if sq < 0 or not self.position.remove(sq):
+            raise KeyError(key)
+
+    def __iter__(self):
+        squares = self.position.squares
+        return iter([(sq % WIDTH, sq // WIDTH) for sq in range(SQUARES) if squares[sq]])
+
+    def __len__(self):
+        return len(self.position.piece_squares[0]) + len(self.position.piece_squares[1])
+
+    def clear(self):
+        self.position.clear()
+
 
 class XiangqiBoard:
     """
     Main class representing the Xiangqi board.
-    Handles board drawing, piece movement, move validation, and position setup.
+    Handles board drawing, piece selection and position setup; the rules
+    themselves live in the headless Position it displays.
     """
     def __init__(self, canvas, x=50, y=20, cell=60):
         """
@@ -24,11 +124,26 @@ class XiangqiBoard:
         self.flipped = False
         self.selected_piece = None
         self.legal_moves = []
-        self.pieces = {}
+        self.position = Position()
+        # (key, targets, status) of the position on the board once the
+        # rules worker is done with it, see refresh_rules
+        self.rules = None
+        # Called as on_rules_ready(status) when the worker is done
+        self.on_rules_ready = None
+        # Latest position handed to the rules worker and not taken yet;
+        # the worker thread is started on the first refresh_rules
+        self.rules_condition = threading.Condition()
+        self.rules_pending = None
+        self.rules_thread = None
+        self.pieces = PieceMap(self.position)
+        # Retained canvas items: square -> (oval, text) and square -> dot,
+        # plus the piece code currently drawn on every square
+        self.piece_items = {}
+        self.dot_items = {}
+        self.drawn = bytearray(SQUARES)
+        # Timing hook: called as on_render(operation, seconds, squares changed)
+        self.on_render = None
         self.current_turn = 'w'
-        self.move_history = []
-        self.position_history = []
-        self.move_from_to_history = []
         self.piece_symbols = {
             'r': '车', 'R': '车',
             'n': '马', 'N': '马',
@@ -38,15 +153,6 @@ class XiangqiBoard:
             'c': '炮', 'C': '炮',
             'p': '卒', 'P': '兵'
         }
-        self.piece_names_en = {
-            'r': 'R', 'R': 'R',
-            'n': 'N', 'N': 'N',
-            'b': 'B', 'B': 'B',
-            'a': 'A', 'A': 'A',
-            'k': 'K', 'K': 'K',
-            'c': 'C', 'C': 'C',
-            'p': 'P', 'P': 'P'
-        }
         self.max_pieces = {
             'K': 1, 'k': 1,
             'A': 2, 'a': 2,
@@ -71,6 +177,8 @@ class XiangqiBoard:
             'checkmate': '#DC143C',
             'start_dot': '#8B4513'
         }
+        self.images = PieceImageCache(self.piece_symbols, self.colors)
+        self.arrow_move = None
         self.start_dots = {
             (0, 6): 'P', (2, 6): 'P', (4, 6): 'P', (6, 6): 'P', (8, 6): 'P',
             (0, 3): 'p', (2, 3): 'p', (4, 3): 'p', (6, 3): 'p', (8, 3): 'p',
@@ -79,27 +187,72 @@ class XiangqiBoard:
         }
         self.draw_board()
         self.set_position(self.start_fen)
+        # The game starts from the position just set
+        self.tree = GameTree(self.position)
+        self.repetitions = RepetitionTable()
+        self.reset_history()
         self.bind_events()
 
+    @property
+    def current_turn(self):
+        """Side to move, 'w' or 'b' (stored in the position)."""
+        return self.position.turn
+
+    @current_turn.setter
+    def current_turn(self, side):
+        self.position.turn = side
+
+    def px(self, size):
+        """Scale a size given for a 60 px cell to the current cell size."""
+        return max(1, round(size * self.cell / BASE_CELL))
+
+    def resize(self, x, y, cell):
+        """
+        Lay the board out again at another size and redraw everything.
+        Piece images for the new size are made (or reused) as needed.
+        
+        Args:
+            x: X-coordinate of board top-left corner
+            y: Y-coordinate of board top-left corner
+            cell: Size of each board cell in pixels
+        """
+        if (x, y, cell) == (self.x, self.y, self.cell):
+            return
+        arrow = self.arrow_move if self.canvas.find_withtag("arrow") else None
+        self.x = x
+        self.y = y
+        self.cell = cell
+        self.selected_piece = None
+        self.legal_moves.clear()
+        self.draw_board()
+        self.draw_pieces()
+        self.highlight_check_and_mate()
+        if arrow:
+            self.draw_arrow(arrow)
+
     def draw_board(self):
         """Draw the Xiangqi board with all visual elements."""
+        px = self.px
         self.canvas.delete("all")
+        self.piece_items.clear()
+        self.dot_items.clear()
+        self.drawn[:] = bytes(SQUARES)
         self.canvas.create_rectangle(
-            self.x - 30, self.y - 30,
-            self.x + 8 * self.cell + 30, self.y + 9 * self.cell + 35,
-            fill=self.colors['board'], outline=self.colors['lines'], width=4
+            self.x - px(30), self.y - px(30),
+            self.x + 8 * self.cell + px(30), self.y + 9 * self.cell + px(35),
+            fill=self.colors['board'], outline=self.colors['lines'], width=px(4)
         )
         for i in range(9):
             x = self.x + i * self.cell
             self.canvas.create_line(
                 x, self.y, x, self.y + 9 * self.cell,
-                fill=self.colors['lines'], width=2
+                fill=self.colors['lines'], width=px(2)
             )
         for i in range(10):
             y = self.y + i * self.cell
             self.canvas.create_line(
                 self.x, y, self.x + 8 * self.cell, y,
-                fill=self.colors['lines'], width=2
+                fill=self.colors['lines'], width=px(2)
             )
         river_y = self.y + 4.5 * self.cell
         self.canvas.create_rectangle(
@@ -110,67 +263,73 @@ class XiangqiBoard:
         self.canvas.create_text(
             self.x + 4 * self.cell, river_y,
             text="楚  河\n汉  界",
-            font=('Microsoft YaHei', 16, 'bold'),
+            font=('Microsoft YaHei', px(16), 'bold'),
             fill='white', justify='center'
         )
         self.canvas.create_line(
             self.x + 3 * self.cell, self.y,
             self.x + 5 * self.cell, self.y + 2 * self.cell,
-            fill=self.colors['lines'], width=2
+            fill=self.colors['lines'], width=px(2)
         )
         self.canvas.create_line(
             self.x + 5 * self.cell, self.y,
             self.x + 3 * self.cell, self.y + 2 * self.cell,
-            fill=self.colors['lines'], width=2
+            fill=self.colors['lines'], width=px(2)
         )
         self.canvas.create_line(
             self.x + 3 * self.cell, self.y + 7 * self.cell,
             self.x + 5 * self.cell, self.y + 9 * self.cell,
-            fill=self.colors['lines'], width=2
+            fill=self.colors['lines'], width=px(2)
         )
         self.canvas.create_line(
             self.x + 5 * self.cell, self.y + 7 * self.cell,
             self.x + 3 * self.cell, self.y + 9 * self.cell,
-            fill=self.colors['lines'], width=2
+            fill=self.colors['lines'], width=px(2)
         )
         self.draw_start_dots()
         black_numbers = ['1', '2', '3', '4', '5', '6', '7', '8', '9']
         for i, num in enumerate(black_numbers):
             x = self.x + i * self.cell
-            y = self.y - 25
+            y = self.y - px(25)
             self.canvas.create_text(
                 x, y, text=num,
-                font=('Arial', 16, 'bold'),
+                font=('Arial', px(16), 'bold'),
                 fill=self.colors['notation'], anchor='s'
             )
         red_numbers = ['9', '8', '7', '6', '5', '4', '3', '2', '1']
         for i, num in enumerate(red_numbers):
             x = self.x + i * self.cell
-            y = self.y + 9 * self.cell + 29
+            y = self.y + 9 * self.cell + px(29)
             self.canvas.create_text(
                 x, y, text=num,
-                font=('Arial', 16, 'bold'),
+                font=('Arial', px(16), 'bold'),
                 fill=self.colors['notation'], anchor='n'
             )
 
     def draw_start_dots(self):
         """Draw dots at starting positions for pawns and cannons."""
-        self.canvas.delete("start_dots")
-        for (x, y), piece_type in self.start_dots.items():
-            if self.flipped:
-                draw_x = 8 - x
-                draw_y = 9 - y
-            else:
-                draw_x = x
-                draw_y = y
-            cx = self.x + draw_x * self.cell
-            cy = self.y + draw_y * self.cell
-            if (x, y) not in self.pieces:
-                self.canvas.create_oval(
-                    cx - 4, cy - 4, cx + 4, cy + 4,
-                    fill=self.colors['start_dot'], outline='', width=0,
-                    tags=("start_dots", f"dot_{x}_{y}")
-                )
+        for (x, y) in self.start_dots:
+            sq = square(x, y)
+            if sq not in self.dot_items and not self.position.squares[sq]:
+                self._create_dot(sq)
+
+    def _center(self, sq):
+        """Canvas point of the centre of a square, honouring the flip."""
+        y, x = divmod(sq, WIDTH)
+        if self.flipped:
+            x = 8 - x
+            y = 9 - y
+        return self.x + x * self.cell, self.y + y * self.cell
+
+    def _create_dot(self, sq):
+        """Create the start dot item of an empty square."""
+        cx, cy = self._center(sq)
+        r = self.px(4)
+        self.dot_items[sq] = self.canvas.create_oval(
+            cx - r, cy - r, cx + r, cy + r,
+            fill=self.colors['start_dot'], outline='', width=0,
+            tags="start_dots"
+        )
 
     def set_position(self, fen):
         """
@@ -179,46 +338,125 @@ class XiangqiBoard:
         Args:
             fen: FEN string representing the position
         """
-        self.pieces.clear()
-        board_part = fen.split()[0]
-        rows = board_part.split('/')
-        for y, row in enumerate(rows):
-            x = 0
-            for char in row:
-                if char.isdigit():
-                    x += int(char)
-                else:
-                    self.pieces[(x, y)] = char
-                    x += 1
-        self.current_turn = fen.split()[1] if len(fen.split()) > 1 else 'w'
+        self.position.set_fen(fen)
         self.draw_pieces()
-        self.highlight_check_and_mate()
+        self.refresh_rules()
 
     def draw_pieces(self):
-        """Draw all pieces on the board at their current positions."""
-        self.canvas.delete("pieces")
-        for (x, y), piece in self.pieces.items():
-            if self.flipped:
-                draw_x = 8 - x
-                draw_y = 9 - y
+        """
+        Bring the canvas in line with the position. Only squares whose
+        piece changed since the last drawing are touched.
+        """
+        start = time.perf_counter()
+        squares = self.position.squares
+        drawn = self.drawn
+        changed = [sq for sq in range(SQUARES) if drawn[sq] != squares[sq]]
+        self._draw_squares(changed)
+        self._rendered("draw_pieces", start, len(changed))
+
+    def _create_piece(self, sq, piece):
+        """
+        Create the canvas items of a piece: one image item from the image
+        cache, or an oval and a text item when images are not available.
+        """
+        cx, cy = self._center(sq)
+        image = self.images.get(piece, self.px(48))
+        if image is not None:
+            self.piece_items[sq] = (self.canvas.create_image(cx, cy, image=image, tags="pieces"),)
+            return
+        r = self.px(23)
+        oval = self.canvas.create_oval(
+            cx - r, cy - r, cx + r, cy + r,
+            fill='#FDF5E6', outline=self.colors['lines'], width=self.px(2),
+            tags="pieces"
+        )
+        text = self.canvas.create_text(
+            cx, cy, text=self.piece_symbols.get(piece, piece),
+            font=('SimSun', self.px(22), 'bold'),
+            fill=self.colors['red'] if piece.isupper() else self.colors['black'],
+            tags="pieces"
+        )
+        self.piece_items[sq] = (oval, text)
+
+    def _place(self, sq, items):
+        """Move the items of a piece onto a square."""
+        cx, cy = self._center(sq)
+        if len(items) == 1:
+            self.canvas.coords(items[0], cx, cy)
+            return
+        oval, text = items
+        r = self.px(23)
+        self.canvas.coords(oval, cx - r, cy - r, cx + r, cy + r)
+        self.canvas.coords(text, cx, cy)
+
+    def draw_squares(self, squares):
+        """
+        Redraw only some squares: their piece, or their start dot if empty.
+        
+        Args:
+            squares: Square indices (y * 9 + x) to redraw
+        """
+        start = time.perf_counter()
+        self._draw_squares(squares)
+        self._rendered("draw_squares", start, len(squares))
+
+    def _draw_squares(self, squares):
+        """Update the items of some squares to the pieces now on them."""
+        canvas = self.canvas
+        codes = self.position.squares
+        for sq in squares:
+            code = codes[sq]
+            if self.drawn[sq] == code:
+                continue
+            self.drawn[sq] = code
+            items = self.piece_items.get(sq)
+            if code:
+                if items:
+                    # Same square, other piece (setup)
+                    canvas.delete(*items)
+                self._create_piece(sq, PIECE_CHARS[code])
+                dot = self.dot_items.pop(sq, None)
+                if dot is not None:
+                    canvas.delete(dot)
             else:
-                draw_x = x
-                draw_y = y
-            cx = self.x + draw_x * self.cell
-            cy = self.y + draw_y * self.cell
-            self.canvas.create_oval(
-                cx - 23, cy - 23, cx + 23, cy + 23,
-                fill='#FDF5E6', outline=self.colors['lines'], width=2,
-                tags=("pieces", f"piece_{x}_{y}")
-            )
-            symbol = self.piece_symbols.get(piece, piece)
-            color = self.colors['red'] if piece.isupper() else self.colors['black']
-            self.canvas.create_text(
-                cx, cy, text=symbol,
-                font=('SimSun', 22, 'bold'),
-                fill=color, tags=("pieces", f"piece_{x}_{y}")
-            )
-        self.draw_start_dots()
+                if items:
+                    canvas.delete(*self.piece_items.pop(sq))
+                y, x = divmod(sq, WIDTH)
+                if (x, y) in self.start_dots and sq not in self.dot_items:
+                    self._create_dot(sq)
+
+    def render_move(self, frm, to):
+        """
+        Show a move already made on the position: the moving piece's items
+        get new coordinates and a captured piece's items are deleted.
+        
+        Args:
+            frm: From square
+            to: To square
+        """
+        start = time.perf_counter()
+        canvas = self.canvas
+        captured = self.piece_items.pop(to, None)
+        if captured:
+            canvas.delete(*captured)
+        items = self.piece_items.pop(frm, None)
+        if items:
+            self._place(to, items)
+            self.piece_items[to] = items
+        self.drawn[to] = self.drawn[frm]
+        dot = self.dot_items.pop(to, None)
+        if dot is not None:
+            canvas.delete(dot)
+        # The from square gets its start dot back, or the piece an undo
+        # put back there, the ordinary way
+        self.drawn[frm] = UNDRAWN
+        self._draw_squares((frm,))
+        self._rendered("render_move", start, 2)
+
+    def _rendered(self, operation, start, changed):
+        """Report a drawing operation to the timing hook, if one is set."""
+        if self.on_render:
+            self.on_render(operation, time.perf_counter() - start, changed)
 
     def bind_events(self):
         """Bind mouse events to the canvas."""
@@ -274,11 +512,7 @@ class XiangqiBoard:
         if (x, y) in self.pieces:
             piece = self.pieces[(x, y)]
             is_red = piece.isupper()
-            if self.current_turn == 'w' and is_red:
-                self.selected_piece = (x, y)
-                self.highlight_square(x, y, self.colors['highlight'])
-                self.generate_legal_moves(x, y)
-            elif self.current_turn == 'b' and not is_red:
+            if (self.current_turn == 'w') == is_red:
                 self.selected_piece = (x, y)
                 self.highlight_square(x, y, self.colors['highlight'])
                 self.generate_legal_moves(x, y)
@@ -296,43 +530,13 @@ class XiangqiBoard:
         Returns:
             String with move notation
         """
-        piece = self.pieces.get((fx, fy))
-        if not piece:
-            return "???"
-        piece_char = self.piece_names_en.get(piece, '?')
-        is_red = piece.isupper()
-        if is_red:
-            from_file = 9 - fx
-            to_file = 9 - tx
-            if ty < fy:
-                direction = '+'
-                steps = fy - ty
-            elif ty > fy:
-                direction = '-'
-                steps = ty - fy
-            else:
-                direction = '='
-                steps = abs(tx - fx)
-            if direction == '=':
-                return f"{piece_char}{from_file}{direction}{to_file}"
-            else:
-                return f"{piece_char}{from_file}{direction}{steps}"
-        else:
-            from_file = fx + 1
-            to_file = tx + 1
-            if ty > fy:
-                direction = '+'
-                steps = ty - fy
-            elif ty < fy:
-                direction = '-'
-                steps = fy - ty
-            else:
-                direction = '='
-                steps = abs(tx - fx)
-            if direction == '=':
-                return f"{piece_char}{from_file}{direction}{to_file}"
-            else:
-                return f"{piece_char}{from_file}{direction}{steps}"
+        return self.position.move_notation(square(fx, fy), square(tx, ty))
+
+    @property
+    def move_history(self):
+        """Notation of the moves played from the start to the current node."""
+        notations = self.tree.notations
+        return [notations[node] for node in self.tree.path(self.tree.current)]
 
     def undo_move(self):
         """
@@ -341,28 +545,108 @@ class XiangqiBoard:
         Returns:
             True if undo was successful, False otherwise
         """
-        if len(self.move_from_to_history) == 0:
+        return self.goto_node(self.tree.parents[self.tree.current])
+
+    def redo_move(self):
+        """
+        Play the main continuation of the current node again.
+        
+        Returns:
+            True if redo was successful, False otherwise
+        """
+        return self.goto_node(self.tree.first_child[self.tree.current])
+
+    def goto_ply(self, ply):
+        """
+        Jump to a ply of the current line.
+        
+        Args:
+            ply: Number of moves to have played (0 is the starting position)
+            
+        Returns:
+            True if the position changed, False otherwise
+        """
+        line = self.tree.line()
+        ply = max(0, min(ply, len(line)))
+        return self.goto_node(line[ply - 1] if ply else 0)
+
+    def goto_node(self, node):
+        """
+        Jump to any node of the game tree and redraw the squares that changed.
+        
+        Args:
+            node: Game tree node (0 is the starting position, -1 is ignored)
+            
+        Returns:
+            True if the position changed, False otherwise
+        """
+        tree = self.tree
+        previous = tree.current
+        if node < 0 or node == previous:
             return False
-        from_x, from_y, to_x, to_y, captured_piece = self.move_from_to_history.pop()
-        piece = self.pieces.pop((to_x, to_y))
-        self.pieces[(from_x, from_y)] = piece
-        if captured_piece:
-            self.pieces[(to_x, to_y)] = captured_piece
-        if self.move_history:
-            self.move_history.pop()
-        if len(self.position_history) > 1:
-            self.position_history.pop()
-        if self.current_turn == 'w':
-            self.current_turn = 'b'
-        else:
-            self.current_turn = 'w'
+        before = bytes(self.position.squares)
+        tree.goto(node)
         self.selected_piece = None
         self.legal_moves.clear()
         self.canvas.delete("highlight", "legal", "arrow")
-        self.draw_pieces()
-        self.highlight_check_and_mate()
+        if tree.parents[node] == previous:
+            self.repetitions.push(tree.keys[node], tree.move(node), tree.checks[node], tree.chases[node])
+            self.render_move(*tree.move(node))
+        elif tree.parents[previous] == node:
+            self.repetitions.pop()
+            frm, to = tree.move(previous)
+            self.render_move(to, frm)
+        else:
+            self.repetitions.reset(tree.keys[0], tree.root.turn)
+            for step in tree.path(node):
+                self.repetitions.push(tree.keys[step], tree.move(step), tree.checks[step], tree.chases[step])
+            after = self.position.squares
+            self.draw_squares([sq for sq in range(SQUARES) if before[sq] != after[sq]])
+        self.refresh_rules()
         return True
 
+    def uci_history(self):
+        """
+        The game up to the current node for the engine. The move list is
+        kept between calls; after a single move forward or back only its
+        end changes, and it is rebuilt from the tree after a jump.
+        
+        Returns:
+            Tuple (root_fen, moves): FEN of the start of the game and a
+            copy of the UCI moves from there to the current node (the
+            position itself and no moves if it was edited since)
+        """
+        tree = self.tree
+        node = tree.current
+        if tree.keys[node] != self.position.key:
+            # Edited in setup mode: the tree does not lead here
+            return self.position.fen(), []
+        last = self.history_node
+        moves = self.history_moves
+        if node != last:
+            if node > 0 and tree.parents[node] == last:
+                moves.append(uci_move(*tree.move(node)))
+            elif last > 0 and tree.parents[last] == node:
+                moves.pop()
+            else:
+                moves[:] = [uci_move(*tree.move(step)) for step in tree.path(node)]
+            self.history_node = node
+        return tree.root.fen(), list(moves)
+
+    def fen_at(self, ply):
+        """
+        FEN of the current line at a ply without changing the board.
+        
+        Args:
+            ply: Number of moves played
+            
+        Returns:
+            FEN string
+        """
+        line = self.tree.line()
+        ply = max(0, min(ply, len(line)))
+        return self.tree.fen_at(line[ply - 1] if ply else 0)
+
     def is_square_attacked(self, x, y, attacking_color):
         """
         Check if a square is attacked by pieces of given color.
@@ -375,12 +659,7 @@ class XiangqiBoard:
         Returns:
             True if square is attacked, False otherwise
         """
-        for (fx, fy), piece in self.pieces.items():
-            if (piece.isupper() and attacking_color == 'w') or (not piece.isupper() and attacking_color == 'b'):
-                moves = self.generate_pseudo_legal_moves_for_piece(fx, fy, check_open_king=False)
-                if (x, y) in moves:
-                    return True
-        return False
+        return self.position.is_square_attacked(square(x, y), attacking_color)
 
     def generate_pseudo_legal_moves_for_piece(self, x, y, check_open_king=True):
         """
@@ -394,152 +673,12 @@ class XiangqiBoard:
         Returns:
             List of (x, y) tuples representing possible moves
         """
-        piece = self.pieces.get((x, y))
-        if not piece:
-            return []
-        piece_type = piece.lower()
-        is_red = piece.isupper()
-        moves = []
-        if piece_type == 'r':
-            directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-                while 0 <= nx <= 8 and 0 <= ny <= 9:
-                    if (nx, ny) in self.pieces:
-                        if self.pieces[(nx, ny)].isupper() != is_red:
-                            moves.append((nx, ny))
-                        break
-                    moves.append((nx, ny))
-                    nx += dx
-                    ny += dy
-        if piece_type == 'n':
-            horse_moves = [
-                (1, 2), (1, -2), (-1, 2), (-1, -2),
-                (2, 1), (2, -1), (-2, 1), (-2, -1)
-            ]
-            block_dirs = {
-                (1, 2): (0, 1), (1, -2): (0, -1),
-                (-1, 2): (0, 1), (-1, -2): (0, -1),
-                (2, 1): (1, 0), (2, -1): (1, 0),
-                (-2, 1): (-1, 0), (-2, -1): (-1, 0)
-            }
-            for dx, dy in horse_moves:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx <= 8 and 0 <= ny <= 9:
-                    bx, by = x + block_dirs[(dx, dy)][0], y + block_dirs[(dx, dy)][1]
-                    if (bx, by) not in self.pieces:
-                        if (nx, ny) not in self.pieces:
-                            moves.append((nx, ny))
-                        elif self.pieces[(nx, ny)].isupper() != is_red:
-                            moves.append((nx, ny))
-        if piece_type == 'b':
-            elephant_moves = [(2, 2), (2, -2), (-2, 2), (-2, -2)]
-            for dx, dy in elephant_moves:
-                nx, ny = x + dx, y + dy
-                if nx < 0 or nx > 8 or ny < 0 or ny > 9:
-                    continue
-                if is_red:
-                    if ny < 5: continue
-                else:
-                    if ny > 4: continue
-                mx, my = x + dx//2, y + dy//2
-                if (mx, my) not in self.pieces:
-                    if (nx, ny) not in self.pieces:
-                        moves.append((nx, ny))
-                    elif self.pieces[(nx, ny)].isupper() != is_red:
-                        moves.append((nx, ny))
-        if piece_type == 'a':
-            advisor_moves = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-            for dx, dy in advisor_moves:
-                nx, ny = x + dx, y + dy
-                if nx < 0 or nx > 8 or ny < 0 or ny > 9:
-                    continue
-                if is_red:
-                    if 3 <= nx <= 5 and 7 <= ny <= 9:
-                        if (nx, ny) not in self.pieces:
-                            moves.append((nx, ny))
-                        elif self.pieces[(nx, ny)].isupper() != is_red:
-                            moves.append((nx, ny))
-                else:
-                    if 3 <= nx <= 5 and 0 <= ny <= 2:
-                        if (nx, ny) not in self.pieces:
-                            moves.append((nx, ny))
-                        elif self.pieces[(nx, ny)].isupper() != is_red:
-                            moves.append((nx, ny))
-        if piece_type == 'k':
-            king_moves = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-            for dx, dy in king_moves:
-                nx, ny = x + dx, y + dy
-                if nx < 0 or nx > 8 or ny < 0 or ny > 9:
-                    continue
-                if is_red:
-                    if 3 <= nx <= 5 and 7 <= ny <= 9:
-                        if (nx, ny) not in self.pieces:
-                            moves.append((nx, ny))
-                        elif self.pieces[(nx, ny)].isupper() != is_red:
-                            moves.append((nx, ny))
-                else:
-                    if 3 <= nx <= 5 and 0 <= ny <= 2:
-                        if (nx, ny) not in self.pieces:
-                            moves.append((nx, ny))
-                        elif self.pieces[(nx, ny)].isupper() != is_red:
-                            moves.append((nx, ny))
-        if piece_type == 'c':
-            directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-                jumped = False
-                while 0 <= nx <= 8 and 0 <= ny <= 9:
-                    if (nx, ny) in self.pieces:
-                        if not jumped:
-                            jumped = True
-                        else:
-                            if self.pieces[(nx, ny)].isupper() != is_red:
-                                moves.append((nx, ny))
-                            break
-                    else:
-                        if not jumped:
-                            moves.append((nx, ny))
-                    nx += dx
-                    ny += dy
-        if piece_type == 'p':
-            if is_red:
-                if y > 0:
-                    nx, ny = x, y - 1
-                    if (nx, ny) not in self.pieces:
-                        moves.append((nx, ny))
-                    elif self.pieces[(nx, ny)].isupper() != is_red:
-                        moves.append((nx, ny))
-                if y <= 4:
-                    for nx in [x - 1, x + 1]:
-                        if 0 <= nx <= 8:
-                            ny = y
-                            if (nx, ny) not in self.pieces:
-                                moves.append((nx, ny))
-                            elif self.pieces[(nx, ny)].isupper() != is_red:
-                                moves.append((nx, ny))
-            else:
-                if y < 9:
-                    nx, ny = x, y + 1
-                    if (nx, ny) not in self.pieces:
-                        moves.append((nx, ny))
-                    elif self.pieces[(nx, ny)].isupper() != is_red:
-                        moves.append((nx, ny))
-                if y >= 5:
-                    for nx in [x - 1, x + 1]:
-                        if 0 <= nx <= 8:
-                            ny = y
-                            if (nx, ny) not in self.pieces:
-                                moves.append((nx, ny))
-                            elif self.pieces[(nx, ny)].isupper() != is_red:
-                                moves.append((nx, ny))
+        sq = square(x, y)
         if check_open_king:
-            filtered = []
-            for tx, ty in moves:
-                if not self.would_expose_king(x, y, tx, ty, is_red):
-                    filtered.append((tx, ty))
-            return filtered
-        return moves
+            targets = self.position.legal_moves_from(sq)
+        else:
+            targets = self.position.pseudo_moves(sq)
+        return [(to % WIDTH, to // WIDTH) for to in targets]
 
     def would_expose_king(self, fx, fy, tx, ty, is_red):
         """
@@ -550,56 +689,28 @@ class XiangqiBoard:
             fy: From y-coordinate
             tx: To x-coordinate
             ty: To y-coordinate
-            is_red: True if moving piece is red
+            is_red: True if moving piece is red (the piece on the from square decides)
             
         Returns:
             True if move would expose king, False otherwise
         """
-        captured = self.pieces.pop((tx, ty), None)
-        moved_piece = self.pieces.pop((fx, fy))
-        self.pieces[(tx, ty)] = moved_piece
-        king_pos_red = None
-        king_pos_black = None
-        for (kx, ky), p in self.pieces.items():
-            if p == 'K':
-                king_pos_red = (kx, ky)
-            elif p == 'k':
-                king_pos_black = (kx, ky)
-        illegal = False
-        if king_pos_red and king_pos_black:
-            rx, ry = king_pos_red
-            bx, by = king_pos_black
-            if rx == bx:
-                y_min, y_max = min(ry, by), max(ry, by)
-                block = False
-                for yy in range(y_min + 1, y_max):
-                    if (rx, yy) in self.pieces:
-                        block = True
-                        break
-                if not block:
-                    illegal = True
-        if not illegal:
-            if is_red:
-                if king_pos_red and self.is_square_attacked(king_pos_red[0], king_pos_red[1], 'b'):
-                    illegal = True
-            else:
-                if king_pos_black and self.is_square_attacked(king_pos_black[0], king_pos_black[1], 'w'):
-                    illegal = True
-        del self.pieces[(tx, ty)]
-        self.pieces[(fx, fy)] = moved_piece
-        if captured:
-            self.pieces[(tx, ty)] = captured
-        return illegal
+        return self.position.would_expose_king(square(fx, fy), square(tx, ty))
 
     def generate_legal_moves(self, x, y):
         """
-        Generate and highlight legal moves for a piece.
+        Highlight the legal moves of a piece. They are looked up in the
+        moves the rules worker found for the position; only if it is not
+        done yet are the piece's moves generated here.
         
         Args:
             x: Board x-coordinate
             y: Board y-coordinate
         """
-        self.legal_moves = self.generate_pseudo_legal_moves_for_piece(x, y, check_open_king=True)
+        rules = self.rules
+        if rules and rules[0] == self.position.key:
+            self.legal_moves = [(to % WIDTH, to // WIDTH) for to in rules[1].get(square(x, y), ())]
+        else:
+            self.legal_moves = self.generate_pseudo_legal_moves_for_piece(x, y, check_open_king=True)
         self.canvas.delete("legal")
         for mx, my in self.legal_moves:
             self.highlight_square(mx, my, self.colors['legal'], is_move=True)
@@ -614,15 +725,7 @@ class XiangqiBoard:
         Returns:
             True if king is in check, False otherwise
         """
-        king_pos = None
-        for (x, y), piece in self.pieces.items():
-            if (color == 'w' and piece == 'K') or (color == 'b' and piece == 'k'):
-                king_pos = (x, y)
-                break
-        if not king_pos:
-            return False
-        attacking_color = 'b' if color == 'w' else 'w'
-        return self.is_square_attacked(king_pos[0], king_pos[1], attacking_color)
+        return self.position.is_in_check(color)
 
     def is_in_checkmate(self, color):
         """
@@ -634,31 +737,77 @@ class XiangqiBoard:
         Returns:
             True if king is in checkmate, False otherwise
         """
-        if not self.is_in_check(color):
-            return False
-        
-        # Collect all pieces of the given color first to avoid dictionary changes during iteration
-        pieces_of_color = []
-        for (x, y), piece in list(self.pieces.items()):
-            if (color == 'w' and piece.isupper()) or (color == 'b' and not piece.isupper()):
-                pieces_of_color.append((x, y, piece))
+        return self.position.is_in_checkmate(color)
+
+    def refresh_rules(self):
+        """
+        Work out the legal moves and the game status of the position on the
+        board on the rules worker thread, which hands them to rules_ready.
+        Until then checks are highlighted, but not mate. The worker only
+        ever takes the latest position, so positions passed while it is
+        busy, e.g. when scrubbing through a game, are skipped.
+        """
+        self.highlight_check_and_mate()
+        with self.rules_condition:
+            self.rules_pending = self.position.copy()
+            self.rules_condition.notify()
+        if self.rules_thread is None:
+            self.rules_thread = threading.Thread(target=self.rules_worker, daemon=True)
+            self.rules_thread.start()
+
+    def rules_worker(self):
+        """Rules worker thread: handle the latest pending position, one at a time."""
+        while True:
+            with self.rules_condition:
+                while self.rules_pending is None:
+                    self.rules_condition.wait()
+                position = self.rules_pending
+                self.rules_pending = None
+            targets, status = position_rules(position)
+            try:
+                self.canvas.after(0, self.rules_ready, position.key, targets, status)
+            except RuntimeError:
+                # The main loop is gone
+                return
+
+    def rules_ready(self, key, targets, status):
+        """
+        Take the rules worker's result, unless the board has moved on.
         
-        # Check each piece
-        for x, y, piece in pieces_of_color:
-            moves = self.generate_pseudo_legal_moves_for_piece(x, y, check_open_king=True)
-            if moves:
-                return False
-        return True
+        Args:
+            key: Key of the position the worker was given
+            targets: From square -> legal target squares
+            status: Game status of the position
+        """
+        if key != self.position.key:
+            return
+        self.rules = (key, targets, status)
+        self.position.remember_status(key, status)
+        self.highlight_check_and_mate()
+        if self.on_rules_ready:
+            self.on_rules_ready(status)
+
+    def known_status(self):
+        """Game status of the position on the board, or None while the rules worker is busy."""
+        rules = self.rules
+        return rules[2] if rules and rules[0] == self.position.key else None
 
     def highlight_check_and_mate(self):
-        """Highlight kings that are in check or checkmate."""
+        """
+        Highlight a king in check, and the king of the side to move when it
+        has lost (checkmate or no legal move) once the rules worker says so.
+        """
         self.canvas.delete("check_mate")
-        if self.is_in_check('w'):
-            color = self.colors['checkmate'] if self.is_in_checkmate('w') else self.colors['check']
-            self.highlight_king('w', color)
-        if self.is_in_check('b'):
-            color = self.colors['checkmate'] if self.is_in_checkmate('b') else self.colors['check']
-            self.highlight_king('b', color)
+        side = self.current_turn
+        other = 'b' if side == 'w' else 'w'
+        status = self.known_status()
+        if status == CHECKMATE or status == STALEMATE:
+            self.highlight_king(side, self.colors['checkmate'])
+        elif self.position.is_in_check(side):
+            self.highlight_king(side, self.colors['check'])
+        # Only possible in a set-up position
+        if self.position.is_in_check(other):
+            self.highlight_king(other, self.colors['check'])
 
     def highlight_king(self, color, outline_color):
         """
@@ -668,23 +817,24 @@ class XiangqiBoard:
             color: 'w' for red, 'b' for black
             outline_color: Color to use for highlighting
         """
-        king_char = 'K' if color == 'w' else 'k'
-        for (x, y), piece in self.pieces.items():
-            if piece == king_char:
-                if self.flipped:
-                    draw_x = 8 - x
-                    draw_y = 9 - y
-                else:
-                    draw_x = x
-                    draw_y = y
-                cx = self.x + draw_x * self.cell
-                cy = self.y + draw_y * self.cell
-                self.canvas.create_oval(
-                    cx - 30, cy - 30, cx + 30, cy + 30,
-                    outline=outline_color, width=6,
-                    tags="check_mate"
-                )
-                break
+        king = self.position.kings[0 if color == 'w' else 1]
+        if king < 0:
+            return
+        y, x = divmod(king, WIDTH)
+        if self.flipped:
+            draw_x = 8 - x
+            draw_y = 9 - y
+        else:
+            draw_x = x
+            draw_y = y
+        cx = self.x + draw_x * self.cell
+        cy = self.y + draw_y * self.cell
+        r = self.px(30)
+        self.canvas.create_oval(
+            cx - r, cy - r, cx + r, cy + r,
+            outline=outline_color, width=self.px(6),
+            tags="check_mate"
+        )
 
     def try_move(self, to_x, to_y):
         """
@@ -696,18 +846,15 @@ class XiangqiBoard:
         """
         if (to_x, to_y) in self.legal_moves:
             from_x, from_y = self.selected_piece
-            captured = self.pieces.get((to_x, to_y))
-            self.move_from_to_history.append((from_x, from_y, to_x, to_y, captured))
-            self.position_history.append(self.fen())
             notation = self.generate_move_notation(from_x, from_y, to_x, to_y)
-            self.move_history.append(notation)
-            piece = self.pieces.pop((from_x, from_y))
-            if (to_x, to_y) in self.pieces:
-                self.pieces.pop((to_x, to_y))
-            self.pieces[(to_x, to_y)] = piece
-            self.current_turn = 'b' if self.current_turn == 'w' else 'w'
-            self.draw_pieces()
-            self.highlight_check_and_mate()
+            frm, to = square(from_x, from_y), square(to_x, to_y)
+            captured = self.position.make(frm, to)
+            check, chased = move_threats(self.position, frm, to)
+            # Notations repeat a lot, so the tree keeps interned copies
+            self.tree.add(frm, to, captured, sys.intern(notation), check, chased)
+            self.repetitions.push(self.position.key, (frm, to), check, chased)
+            self.render_move(frm, to)
+            self.refresh_rules()
             self.canvas.delete("arrow")
             if hasattr(self, 'on_move_made'):
                 self.on_move_made()
@@ -734,26 +881,27 @@ class XiangqiBoard:
         cx = self.x + draw_x * self.cell
         cy = self.y + draw_y * self.cell
         tag = "legal" if is_move else "highlight"
+        px = self.px
         if is_move:
             self.canvas.create_oval(
-                cx - 25, cy - 25, cx + 25, cy + 25,
-                outline=color, width=4,
+                cx - px(25), cy - px(25), cx + px(25), cy + px(25),
+                outline=color, width=px(4),
                 tags=tag
             )
             self.canvas.create_oval(
-                cx - 20, cy - 20, cx + 20, cy + 20,
-                outline='#FFFFFF', width=2, dash=(3, 2),
+                cx - px(20), cy - px(20), cx + px(20), cy + px(20),
+                outline='#FFFFFF', width=px(2), dash=(3, 2),
                 tags=tag
             )
         else:
             self.canvas.create_oval(
-                cx - 30, cy - 30, cx + 30, cy + 30,
-                outline=color, width=5,
+                cx - px(30), cy - px(30), cx + px(30), cy + px(30),
+                outline=color, width=px(5),
                 tags=tag
             )
             self.canvas.create_oval(
-                cx - 25, cy - 25, cx + 25, cy + 25,
-                outline='#FFA500', width=2,
+                cx - px(25), cy - px(25), cx + px(25), cy + px(25),
+                outline='#FFA500', width=px(2),
                 tags=tag
             )
 
@@ -767,35 +915,12 @@ class XiangqiBoard:
         Returns:
             Tuple (from_x, from_y, to_x, to_y) or None if invalid
         """
-        if not uci_move or len(uci_move) < 4:
+        squares = parse_uci_move(uci_move)
+        if squares is None:
             return None
-        try:
-            from_file = uci_move[0]
-            from_rank_str = ""
-            to_file = uci_move[2] if len(uci_move) > 2 else ''
-            to_rank_str = ""
-            i = 1
-            while i < len(uci_move) and uci_move[i].isdigit():
-                from_rank_str += uci_move[i]
-                i += 1
-            if i < len(uci_move):
-                to_file = uci_move[i]
-                i += 1
-            while i < len(uci_move) and uci_move[i].isdigit():
-                to_rank_str += uci_move[i]
-                i += 1
-            from_file_idx = ord(from_file) - ord('a')
-            from_rank = int(from_rank_str)
-            to_file_idx = ord(to_file) - ord('a')
-            to_rank = int(to_rank_str)
-            from_y = 10 - from_rank
-            to_y = 10 - to_rank
-            if 0 <= from_file_idx <= 8 and 0 <= from_y <= 9 and \
-               0 <= to_file_idx <= 8 and 0 <= to_y <= 9:
-                return (from_file_idx, from_y, to_file_idx, to_y)
-        except Exception as e:
-            pass
-        return None
+        from_y, from_x = divmod(squares[0], WIDTH)
+        to_y, to_x = divmod(squares[1], WIDTH)
+        return (from_x, from_y, to_x, to_y)
 
     def draw_arrow(self, move):
         """
@@ -805,6 +930,7 @@ class XiangqiBoard:
             move: UCI move string
         """
         self.canvas.delete("arrow")
+        self.arrow_move = move
         if not move or len(move) < 4:
             return
         coords = self.convert_uci_to_move(move)
@@ -822,45 +948,53 @@ class XiangqiBoard:
         y1 = self.y + from_rank * self.cell
         x2 = self.x + to_file * self.cell
         y2 = self.y + to_rank * self.cell
+        px = self.px
         self.canvas.create_line(
             x1, y1, x2, y2,
-            width=6, fill=self.colors['arrow'],
-            arrow='last', arrowshape=(18, 22, 10),
+            width=px(6), fill=self.colors['arrow'],
+            arrow='last', arrowshape=(px(18), px(22), px(10)),
             capstyle=tk.ROUND, joinstyle=tk.ROUND,
             tags="arrow"
         )
         self.canvas.create_line(
             x1, y1, x2, y2,
-            width=8, fill=self.colors['arrow_outline'],
-            arrow='last', arrowshape=(20, 24, 12),
+            width=px(8), fill=self.colors['arrow_outline'],
+            arrow='last', arrowshape=(px(20), px(24), px(12)),
             capstyle=tk.ROUND, joinstyle=tk.ROUND,
             tags="arrow"
         )
         self.canvas.create_oval(
-            x1 - 15, y1 - 15, x1 + 15, y1 + 15,
-            outline=self.colors['arrow_outline'], width=4, tags="arrow"
+            x1 - px(15), y1 - px(15), x1 + px(15), y1 + px(15),
+            outline=self.colors['arrow_outline'], width=px(4), tags="arrow"
         )
         self.canvas.create_oval(
-            x1 - 12, y1 - 12, x1 + 12, y1 + 12,
-            outline=self.colors['arrow'], width=3, tags="arrow"
+            x1 - px(12), y1 - px(12), x1 + px(12), y1 + px(12),
+            outline=self.colors['arrow'], width=px(3), tags="arrow"
         )
         self.canvas.create_oval(
-            x2 - 18, y2 - 18, x2 + 18, y2 + 18,
-            outline=self.colors['arrow_outline'], width=5, tags="arrow"
+            x2 - px(18), y2 - px(18), x2 + px(18), y2 + px(18),
+            outline=self.colors['arrow_outline'], width=px(5), tags="arrow"
         )
         self.canvas.create_oval(
-            x2 - 15, y2 - 15, x2 + 15, y2 + 15,
-            outline=self.colors['arrow'], width=4, tags="arrow"
+            x2 - px(15), y2 - px(15), x2 + px(15), y2 + px(15),
+            outline=self.colors['arrow'], width=px(4), tags="arrow"
         )
 
     def flip(self):
-        """Flip the board orientation."""
+        """Flip the board orientation; the existing items are moved in place."""
+        start = time.perf_counter()
         self.flipped = not self.flipped
         self.selected_piece = None
         self.legal_moves.clear()
         self.canvas.delete("highlight", "legal", "arrow")
-        self.draw_pieces()
+        for sq, items in self.piece_items.items():
+            self._place(sq, items)
+        r = self.px(4)
+        for sq, dot in self.dot_items.items():
+            cx, cy = self._center(sq)
+            self.canvas.coords(dot, cx - r, cy - r, cx + r, cy + r)
         self.highlight_check_and_mate()
+        self._rendered("flip", start, len(self.piece_items) + len(self.dot_items))
 
     def fen(self):
         """
@@ -869,28 +1003,15 @@ class XiangqiBoard:
         Returns:
             FEN string
         """
-        board = []
-        for y in range(10):
-            row = ""
-            empty = 0
-            for x in range(9):
-                if (x, y) in self.pieces:
-                    if empty > 0:
-                        row += str(empty)
-                        empty = 0
-                    row += self.pieces[(x, y)]
-                else:
-                    empty += 1
-            if empty > 0:
-                row += str(empty)
-            board.append(row)
-        return f"{'/'.join(board)} {self.current_turn} - - 0 1"
+        return self.position.fen()
 
     def reset_history(self):
-        """Reset move history."""
-        self.move_history = []
-        self.position_history = [self.fen()]
-        self.move_from_to_history = []
+        """Reset move history. The game restarts from the position on the board."""
+        self.tree.reset(self.position)
+        self.repetitions.reset(self.position.key, self.current_turn)
+        # UCI moves from the root to history_node, see uci_history
+        self.history_moves = []
+        self.history_node = 0
 
     def debug_palace(self):
         """Debug method for palace validation."""
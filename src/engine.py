@@ -3,26 +3,65 @@ import time
 import os
 import threading
 import queue
-import re
 import sys
+from uci_parser import parse_info, InfoLine
 
 class StockfishEngine:
     """
     Wrapper class for Fairy-Stockfish chess engine.
     Handles engine communication and analysis with MultiPV support.
+
+    The UCI conversation is driven by the engine's own replies: every stage
+    waits for its token (uciok, readyok, bestmove) with its own timeout
+    instead of sleeping for a fixed time.
     """
-    def __init__(self, engine_path="fairy-stockfish.exe"):
+    # Protocol states
+    STATE_STOPPED = "stopped"
+    STATE_HANDSHAKE = "handshake"
+    STATE_IDLE = "idle"
+    STATE_SEARCHING = "searching"
+
+    # Per-stage timeouts in seconds
+    UCI_TIMEOUT = 5.0
+    READY_TIMEOUT = 8.0
+    SEARCH_TIMEOUT = 30.0
+    QUIT_TIMEOUT = 2.0
+
+    # UCI options sent after the handshake unless overridden
+    DEFAULT_OPTIONS = {"Threads": 2, "Hash": 128}
+
+    def __init__(self, engine_path="fairy-stockfish.exe", engine_args=None, options=None):
         """
         Initialize the engine wrapper.
         
         Args:
             engine_path: Path to the Fairy-Stockfish executable
+            engine_args: Extra command line arguments for the executable
+            options: UCI options overriding DEFAULT_OPTIONS (e.g. {"Threads": 1})
         """
         self.process = None
         self.ready = False
+        self.state = self.STATE_STOPPED
         self.output_queue = queue.Queue()
         self.reader_thread = None
         self.debug = False
+        self.engine_args = list(engine_args) if engine_args else []
+        self.options = dict(self.DEFAULT_OPTIONS)
+        if options:
+            self.options.update(options)
+        self.multipv = 2
+        self.last_info = {}
+        self.last_from_cache = False
+        # True if the last search got a stop before it finished on its own
+        self.last_interrupted = False
+        self.engine_name = None
+        self.cache = None
+        self.send_lock = threading.Lock()
+        # Last 'position fen <root> moves ...' sent, kept so that a request
+        # for the same game with more moves only appends the new ones
+        self.position_root = None
+        self.position_moves = []
+        self.position_command = None
         
         self.engine_path = self.find_engine(engine_path)
 
@@ -49,6 +88,9 @@ class StockfishEngine:
         Returns:
             Path to engine executable or default path if not found
         """
+        if os.path.isabs(default_path) and os.path.exists(default_path):
+            return default_path
+
         base_path = self.get_base_path()
         project_root = os.path.dirname(base_path)
         
@@ -91,6 +133,111 @@ class StockfishEngine:
     def log(self, msg):
         pass
 
+    def is_alive(self):
+        """
+        Check whether the engine process is running.
+        
+        Returns:
+            True if the process exists and has not exited, False otherwise
+        """
+        return self.process is not None and self.process.poll() is None
+
+    def ensure_started(self):
+        """
+        Make sure a ready engine session exists, starting it if needed.
+        The process is only restarted if it has died since the last call.
+        
+        Returns:
+            True if the engine is running and ready, False otherwise
+        """
+        if self.ready and self.is_alive():
+            return True
+        self.close()
+        return self.start()
+
+    def new_game(self):
+        """
+        Tell the engine that a new game starts, clearing its search state.
+        
+        Returns:
+            True if the engine acknowledged the command, False otherwise
+        """
+        if not self.ready:
+            return False
+        self._send("ucinewgame")
+        return self.sync()
+
+    def sync(self, timeout=None):
+        """
+        Send isready and wait for readyok.
+        
+        Args:
+            timeout: Seconds to wait, READY_TIMEOUT by default
+            
+        Returns:
+            True if the engine answered in time, False otherwise
+        """
+        self._send("isready")
+        return self._wait_for("readyok", self.READY_TIMEOUT if timeout is None else timeout) is not None
+
+    def _read_line(self, deadline):
+        """
+        Read the next engine output line.
+        
+        Args:
+            deadline: time.monotonic() value after which to give up,
+                      or None to wait until a line arrives
+            
+        Returns:
+            Output line, or None on timeout or when the engine exited
+        """
+        try:
+            if deadline is None:
+                line = self.output_queue.get()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                line = self.output_queue.get(timeout=remaining)
+        except queue.Empty:
+            return None
+        if line is None:
+            # End of stream: the reader thread saw the process exit
+            self.output_queue.put(None)
+            self.ready = False
+            self.state = self.STATE_STOPPED
+        return line
+
+    def _wait_for(self, token, timeout):
+        """
+        Consume engine output until a line starting with token arrives.
+        
+        Args:
+            token: First word of the expected line (e.g. 'uciok')
+            timeout: Seconds to wait for it
+            
+        Returns:
+            The matching line, or None on timeout or engine exit
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self._read_line(deadline)
+            if line is None:
+                return None
+            if line == token or line.startswith(token + " "):
+                return line
+
+    def _drain(self):
+        """Discard any output that is already queued."""
+        while True:
+            try:
+                line = self.output_queue.get_nowait()
+            except queue.Empty:
+                return
+            if line is None:
+                self.output_queue.put(None)
+                return
+
     def start(self):
         """
         Start the engine process and initialize UCI with MultiPV=2.
@@ -108,64 +255,81 @@ class StockfishEngine:
                 else:
                     return False
             
+            self.output_queue = queue.Queue()
             self.process = subprocess.Popen(
-                self.engine_path,
+                [self.engine_path] + self.engine_args,
                 universal_newlines=True,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 bufsize=1,
                 creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
             )
+            self.state = self.STATE_HANDSHAKE
             
-            self.reader_thread = threading.Thread(target=self._reader, daemon=True)
+            # Each process gets its own queue, so a reader still draining a
+            # killed engine cannot feed lines or its end sentinel to this one
+            self.reader_thread = threading.Thread(target=self._reader, args=(self.process, self.output_queue),
+                                                  daemon=True)
             self.reader_thread.start()
             
             self._send("uci")
-            time.sleep(0.5)
-            
-            while not self.output_queue.empty():
-                self.output_queue.get()
+            deadline = time.monotonic() + self.UCI_TIMEOUT
+            while True:
+                line = self._read_line(deadline)
+                if line is None:
+                    return False
+                if line.startswith("id name "):
+                    self.engine_name = line[len("id name "):]
+                elif line == "uciok":
+                    break
             
             self._send("setoption name UCI_Variant value xiangqi")
-            time.sleep(0.2)
             self._send("setoption name FairyBoard value xiangqi")
-            time.sleep(0.1)
             self._send("setoption name MultiPV value 2")
-            time.sleep(0.1)
-            self._send("setoption name Threads value 2")
-            self._send("setoption name Hash value 128")
+            self.multipv = 2
+            for name, value in self.options.items():
+                self._send(f"setoption name {name} value {value}")
             self._send("ucinewgame")
-            self._send("isready")
-            
-            timeout = time.time() + 8
-            while time.time() < timeout:
-                try:
-                    output = self.output_queue.get(timeout=0.2)
-                    if "readyok" in output:
-                        self.ready = True
-                        return True
-                except queue.Empty:
-                    continue
+            if not self.sync():
+                return False
             
-            return False
+            self.ready = True
+            self.state = self.STATE_IDLE
+            return True
             
         except Exception as e:
             return False
 
-    def _reader(self):
+    def _reader(self, process, output_queue):
         """
         Reader thread function that reads engine output and puts it in the queue.
+        A None sentinel is queued once the engine's output stream closes.
+        
+        Args:
+            process: Engine process to read from
+            output_queue: Queue of that process (not self.output_queue,
+                which a restart replaces)
         """
-        while self.process and self.process.poll() is None:
-            try:
-                line = self.process.stdout.readline()
+        try:
+            for line in process.stdout:
+                line = line.strip()
                 if line:
-                    line = line.strip()
-                    if line:
-                        self.output_queue.put(line)
-            except:
-                break
+                    output_queue.put(line)
+        except Exception:
+            pass
+        output_queue.put(None)
+
+    def _abort_search(self):
+        """
+        Stop a search that did not finish in time and consume its bestmove,
+        so that its output cannot leak into the next request.
+        """
+        if self.state != self.STATE_SEARCHING:
+            return
+        self._send("stop")
+        if self._wait_for("bestmove", self.READY_TIMEOUT) is not None:
+            self.state = self.STATE_IDLE
 
     def _send(self, command):
         """
@@ -176,104 +340,245 @@ class StockfishEngine:
         """
         if self.process and self.process.stdin:
             try:
-                self.process.stdin.write(command + "\n")
-                self.process.stdin.flush()
+                with self.send_lock:
+                    self.process.stdin.write(command + "\n")
+                    self.process.stdin.flush()
             except Exception as e:
                 pass
 
-    def analyze_multi(self, fen, depth=18, multipv=2):
+    def _set_multipv(self, multipv):
+        """
+        Change the MultiPV option between searches if it differs.
+        
+        Args:
+            multipv: Number of lines the engine should report
+        """
+        if multipv != self.multipv:
+            self._send(f"setoption name MultiPV value {multipv}")
+            self.multipv = multipv
+
+    def _go(self, command, cancel=None):
+        """
+        Start a search. If the request was cancelled while it was being
+        set up, the search is stopped right after the go command.
+        
+        Args:
+            command: Full go command (e.g. 'go depth 15')
+            cancel: Optional threading.Event that cancels this request
+        """
+        self.last_interrupted = False
+        self._send(command)
+        self.state = self.STATE_SEARCHING
+        if cancel is not None and cancel.is_set():
+            self.last_interrupted = True
+            self._send("stop")
+
+    def stop(self):
+        """
+        Ask the running search to finish as soon as possible.
+        Safe to call from any thread; the thread that started the search
+        receives the bestmove and returns. Callers set the request's cancel
+        event first so that a search that is just starting stops too.
+        The search is then marked in last_interrupted.
+        """
+        if self.state == self.STATE_SEARCHING:
+            self.last_interrupted = True
+            self._send("stop")
+
+    def _parse_pv_info(self, output):
+        """
+        Parse an info line that carries a usable principal variation.
+        
+        Args:
+            output: Engine output line
+            
+        Returns:
+            InfoLine whose first PV move is a valid Xiangqi move, or None
+        """
+        info = parse_info(output)
+        if info is None or not info.pv_text or not self.is_valid_uci_move(info.move):
+            return None
+        return info
+
+    def engine_id(self):
+        """
+        Identify the engine and its settings for the analysis cache.
+        
+        Returns:
+            String made of the engine name and its UCI options
+        """
+        options = ",".join(f"{name}={value}" for name, value in sorted(self.options.items()))
+        return f"{self.engine_name}|xiangqi|{options}"
+
+    def peek_cache(self, fen, depth, multipv):
+        """
+        Look a position up in the analysis cache without touching the
+        engine or last_info, so any thread may call it during a search.
+        
+        Args:
+            fen: FEN string of the position
+            depth: Smallest acceptable depth
+            multipv: Requested number of lines
+            
+        Returns:
+            List of InfoLine records in MultiPV order, or None on a miss
+        """
+        if self.cache is None or self.engine_name is None:
+            return None
+        lines = self.cache.get(fen, self.engine_id(), depth, multipv)
+        if lines is None:
+            return None
+        return [InfoLine(raw, pv_text) for raw, pv_text in lines]
+
+    def _cached_analysis(self, fen, depth, multipv):
+        """
+        Answer a request from the analysis cache if possible.
+        
+        Args:
+            fen: FEN string of the position
+            depth: Requested depth
+            multipv: Requested number of lines
+            
+        Returns:
+            List of (move, score) tuples, or None on a miss
+        """
+        infos = self.peek_cache(fen, depth, multipv)
+        if infos is None:
+            return None
+        self.last_info = {}
+        results = []
+        for slot, info in enumerate(infos, 1):
+            self.last_info[slot] = info
+            results.append((info.move, info.score_text()))
+        while len(results) < multipv:
+            results.append((None, None))
+        self.last_from_cache = True
+        return results
+
+    def _store_analysis(self, fen, depth, multipv):
+        """
+        Save the finished search in last_info to the analysis cache.
+        Only searches that reached the requested depth in every line
+        are stored.
+        
+        Args:
+            fen: FEN string of the position
+            depth: Requested depth (None for a timed search: any depth)
+            multipv: Requested number of lines
+        """
+        if self.cache is None or not self.last_info:
+            return
+        slots = [self.last_info.get(i) for i in range(1, multipv + 1)]
+        if any(info is None or info.depth is None or (depth is not None and info.depth < depth) for info in slots):
+            return
+        self.cache.put(fen, self.engine_id(), min(info.depth for info in slots),
+                       [(info.raw, info.pv_text) for info in slots])
+
+    def _position_command(self, fen, history=None):
+        """
+        Build the 'position' command for a request. With a game history the
+        engine gets the game's root and its moves, so it sees repetitions;
+        when the history only extends the one sent last, just the new moves
+        are appended to the previous command.
+        
+        Args:
+            fen: FEN string of the position
+            history: Optional tuple (root_fen, uci_moves) leading to fen
+            
+        Returns:
+            Command string
+        """
+        if history is None:
+            return f"position fen {fen}"
+        root, moves = history
+        known = len(self.position_moves)
+        if root != self.position_root or len(moves) < known or moves[:known] != self.position_moves:
+            self.position_root = root
+            self.position_moves = []
+            self.position_command = f"position fen {root}"
+            known = 0
+        if len(moves) > known:
+            new = moves[known:]
+            self.position_command += (" moves " if known == 0 else " ") + " ".join(new)
+            self.position_moves.extend(new)
+        return self.position_command
+
+    def analyze_multi(self, fen, depth=18, multipv=2, cancel=None, history=None, movetime=None):
         """
         Analyze position and return multiple best moves with MultiPV.
         
         Args:
             fen: FEN string of the position
-            depth: Search depth
+            depth: Search depth, or None for a search limited by movetime only
             multipv: Number of best moves to return
+            cancel: Optional threading.Event; set it and call stop() to abort
+            history: Optional tuple (root_fen, uci_moves) of the game that
+                leads to fen, sent as 'position fen <root> moves ...'
+            movetime: Optional time budget of the search in milliseconds
             
         Returns:
-            List of tuples (move, score) for each MultiPV line
+            List of tuples (move, score) for each MultiPV line; the full
+            InfoLine records are kept in last_info, keyed by MultiPV slot.
+            With a cache attached, a stored analysis of at least this depth
+            is returned without searching (last_from_cache is then True).
+            A search cut short by stop() sets last_interrupted and is not
+            stored in the cache.
         """
+        self.last_from_cache = False
+        self.last_interrupted = False
         if not self.ready:
             return [(None, None)] * multipv
+        if not fen or fen == "":
+            fen = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+        if depth is not None:
+            cached = self._cached_analysis(fen, depth, multipv)
+            if cached is not None:
+                return cached
         
         results = []
         try:
-            if not fen or fen == "":
-                fen = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
-            
-            self._send(f"position fen {fen}")
-            time.sleep(0.2)
-            
-            while not self.output_queue.empty():
-                self.output_queue.get()
-            
-            self._send(f"go depth {depth}")
+            self._drain()
+            self._set_multipv(multipv)
+            self._send(self._position_command(fen, history))
+            go = "go"
+            if depth is not None:
+                go += f" depth {depth}"
+            if movetime is not None:
+                go += f" movetime {int(movetime)}"
+            self._go(go, cancel)
             
             mpv_results = {}
             bestmove = None
+            self.last_info = mpv_results
             
-            timeout = time.time() + 30
-            while time.time() < timeout:
-                try:
-                    output = self.output_queue.get(timeout=0.5)
-                    
-                    if "info" in output and "multipv" in output and "pv" in output:
-                        mpv_match = re.search(r'multipv\s+(\d+)', output)
-                        if mpv_match:
-                            mpv = int(mpv_match.group(1))
-                            
-                            # Try multiple regex patterns for UCI moves
-                            move = None
-                            
-                            # Pattern 1: Standard UCI (e.g., a2a4)
-                            pv_match = re.search(r'pv\s+([a-i][0-9][a-i][0-9])', output)
-                            if pv_match:
-                                move = pv_match.group(1)
-                            
-                            # Pattern 2: With double digits (e.g., a10a9 for Xiangqi)
-                            if not move:
-                                pv_match = re.search(r'pv\s+([a-i][0-9]{2}[a-i][0-9]{2})', output)
-                                if pv_match:
-                                    move = pv_match.group(1)
-                            
-                            # Pattern 3: Any 4-5 character alphanumeric
-                            if not move:
-                                pv_match = re.search(r'pv\s+([a-z0-9]{4,5})', output)
-                                if pv_match:
-                                    move = pv_match.group(1)
-                            
-                            if move:
-                                # Validate move format for Xiangqi
-                                if self.is_valid_uci_move(move):
-                                    score = "0.00"
-                                    cp_match = re.search(r'score cp\s+(-?\d+)', output)
-                                    if cp_match:
-                                        cp = int(cp_match.group(1))
-                                        score = f"{cp/100:.2f}"
-                                    else:
-                                        mate_match = re.search(r'score mate\s+(-?\d+)', output)
-                                        if mate_match:
-                                            mate = mate_match.group(1)
-                                            score = f"mate {mate}"
-                                    
-                                    mpv_results[mpv] = (move, score)
-                    
-                    if "bestmove" in output:
-                        parts = output.split()
-                        if len(parts) >= 2:
-                            bestmove = parts[1]
-                            if bestmove == "(none)":
-                                bestmove = None
-                            time.sleep(0.5)
-                            break
-                            
-                except queue.Empty:
-                    continue
+            timeout = self.SEARCH_TIMEOUT
+            if movetime is not None:
+                timeout = max(timeout, movetime / 1000 + self.READY_TIMEOUT)
+            deadline = time.monotonic() + timeout
+            while True:
+                output = self._read_line(deadline)
+                if output is None:
+                    break
+                info = self._parse_pv_info(output)
+                if info:
+                    mpv_results[info.multipv] = info
+                
+                if output.startswith("bestmove"):
+                    parts = output.split()
+                    if len(parts) >= 2:
+                        bestmove = parts[1]
+                        if bestmove == "(none)":
+                            bestmove = None
+                    self.state = self.STATE_IDLE
+                    break
+            self._abort_search()
+            if bestmove is not None and not self.last_interrupted and not (cancel is not None and cancel.is_set()):
+                self._store_analysis(fen, depth, multipv)
             
             # Compile results
             for i in range(1, multipv+1):
                 if i in mpv_results:
-                    results.append(mpv_results[i])
+                    results.append((mpv_results[i].move, mpv_results[i].score_text()))
                 elif i == 1 and bestmove and self.is_valid_uci_move(bestmove):
                     results.append((bestmove, "0.00"))
                 else:
@@ -287,6 +592,56 @@ class StockfishEngine:
         except Exception as e:
             return [(None, None)] * multipv
 
+    def analyze_infinite(self, fen, on_update, multipv=2, cancel=None, history=None):
+        """
+        Run 'go infinite' and report every MultiPV line as it arrives.
+        Blocks until stop() is called (or the engine dies), so it is meant
+        to run on a worker thread.
+        
+        Args:
+            fen: FEN string of the position
+            on_update: Callable taking an InfoLine, called from this thread
+            multipv: Number of lines to search
+            cancel: Optional threading.Event; set it and call stop() to end the search
+            history: Optional tuple (root_fen, uci_moves) of the game that
+                leads to fen (see analyze_multi)
+            
+        Returns:
+            Final best move, or None if the search produced none
+        """
+        if not self.ready:
+            return None
+        
+        bestmove = None
+        try:
+            if not fen or fen == "":
+                fen = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+            
+            self._drain()
+            self._set_multipv(multipv)
+            self._send(self._position_command(fen, history))
+            self._go("go infinite", cancel)
+            
+            while True:
+                output = self._read_line(None)
+                if output is None:
+                    break
+                info = self._parse_pv_info(output)
+                if info:
+                    on_update(info)
+                
+                if output.startswith("bestmove"):
+                    parts = output.split()
+                    if len(parts) >= 2 and parts[1] != "(none)":
+                        bestmove = parts[1]
+                    self.state = self.STATE_IDLE
+                    break
+            return bestmove
+            
+        except Exception as e:
+            self._abort_search()
+            return None
+
     def is_valid_uci_move(self, move):
         """
         Validate if a UCI move string is valid for Xiangqi.
@@ -352,39 +707,33 @@ class StockfishEngine:
             if not fen or fen == "":
                 fen = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
             
+            self._drain()
             self._send(f"position fen {fen}")
-            time.sleep(0.2)
-            
-            while not self.output_queue.empty():
-                self.output_queue.get()
-            
-            self._send(f"go depth {depth}")
+            self._go(f"go depth {depth}")
             
             best_move = None
             score = "0.00"
             
-            timeout = time.time() + 20
-            while time.time() < timeout:
-                try:
-                    output = self.output_queue.get(timeout=0.5)
-                    
-                    if "bestmove" in output:
-                        parts = output.split()
-                        if len(parts) >= 2:
-                            best_move = parts[1]
-                            if best_move == "(none)":
-                                best_move = None
-                            break
-                    
-                    if "score cp" in output:
-                        try:
-                            cp = output.split("score cp")[1].split()[0]
-                            score = str(int(cp) / 100)
-                        except:
-                            pass
-                            
-                except queue.Empty:
-                    continue
+            deadline = time.monotonic() + self.SEARCH_TIMEOUT
+            while True:
+                output = self._read_line(deadline)
+                if output is None:
+                    break
+                
+                if output.startswith("bestmove"):
+                    parts = output.split()
+                    if len(parts) >= 2:
+                        best_move = parts[1]
+                        if best_move == "(none)":
+                            best_move = None
+                    self.state = self.STATE_IDLE
+                    break
+                
+                info = parse_info(output)
+                if info and info.score_cp is not None:
+                    score = str(info.score_cp / 100)
+            
+            self._abort_search()
             
             return best_move, score
             
@@ -396,10 +745,9 @@ class StockfishEngine:
         if self.process:
             try:
                 self._send("quit")
-                time.sleep(0.5)
-                self.process.terminate()
-                self.process.wait(timeout=2)
+                self.process.wait(timeout=self.QUIT_TIMEOUT)
             except:
                 self.process.kill()
             self.process = None
-            self.ready = False
+        self.ready = False
+        self.state = self.STATE_STOPPED
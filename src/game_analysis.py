@@ -0,0 +1,225 @@
+# Whole-game analysis: every position along a line of moves is searched
+# once, the evaluations feed a graph and the drop in evaluation after each
+# move marks it as an inaccuracy, a mistake or a blunder. Headless; runs
+# on one engine session or splits the plies over a batch.EnginePool.
+
+import threading
+from contextlib import nullcontext
+from batch import EnginePool
+from position import Position, parse_uci_move, CHECKMATE, STALEMATE, INSUFFICIENT
+
+# Evaluation drop in centipawns, for the side that moved, from which a
+# move gets a mark (checked from the largest down)
+INACCURACY = 50
+MISTAKE = 100
+BLUNDER = 200
+MARKS = ((BLUNDER, "??"), (MISTAKE, "?"), (INACCURACY, "?!"))
+
+# Centipawn stand-in for a forced mate (less the moves to go). Drops are
+# measured on evaluations clamped to +-EVAL_CLAMP, so a mate that merely
+# gets longer, or a won position that stays won, is not marked
+MATE_SCORE = 10000
+EVAL_CLAMP = 1000
+
+
+def score_value(score_cp, score_mate):
+    """
+    Centipawn value of an engine score.
+
+    Args:
+        score_cp: Centipawn score or None
+        score_mate: Mate distance in moves or None ('mate 0': mated)
+
+    Returns:
+        Integer for the side to move, or None if there is no score
+    """
+    if score_mate is not None:
+        if score_mate > 0:
+            return MATE_SCORE - score_mate
+        return -MATE_SCORE - score_mate
+    return score_cp
+
+
+def classify(before, after):
+    """
+    Mark of a move from the evaluations around it.
+
+    Args:
+        before: Evaluation before the move, for the side making it
+        after: Evaluation after the move, for the same side
+
+    Returns:
+        '??', '?', '?!' or None
+    """
+    drop = max(-EVAL_CLAMP, min(EVAL_CLAMP, before)) - max(-EVAL_CLAMP, min(EVAL_CLAMP, after))
+    for threshold, mark in MARKS:
+        if drop >= threshold:
+            return mark
+    return None
+
+
+class GameAnalysis:
+    """
+    Analysis of the positions along a line of moves.
+
+    evals[ply] is the evaluation of the position after ply moves, in
+    centipawns from red's side (None until it is searched, or if the
+    engine gave no score), best[ply] the engine's move there and
+    marks[i] the mark of move i, the one leading from ply i to ply i + 1.
+    finished holds the plies done so far. on_update(ply) is called from
+    the analysing thread each time a position is done.
+
+    Positions are searched with multipv 1 and, on a single session, sent
+    as the root plus the moves so far, so the engine keeps its hash and
+    sees the game's repetitions.
+    """
+    def __init__(self, root_fen, moves, depth=None, movetime=None, on_update=None):
+        """
+        Prepare the analysis of a line.
+
+        Args:
+            root_fen: FEN of the position the line starts from
+            moves: UCI moves of the line
+            depth: Search depth per position (optional)
+            movetime: Milliseconds per position (optional)
+            on_update: Called as on_update(ply) when a position is done
+        """
+        self.root_fen = root_fen
+        self.moves = list(moves)
+        self.depth = depth
+        self.movetime = movetime
+        self.on_update = on_update
+        self.cancelled = threading.Event()
+        self.pool = None
+        self.engine = None
+        self.searching = False
+        position = Position(root_fen)
+        self.fens = [position.fen()]
+        self.turns = [position.turn]
+        for move in self.moves:
+            position.make(*parse_uci_move(move))
+            self.fens.append(position.fen())
+            self.turns.append(position.turn)
+        # Only the last position of a game can be over
+        self.final_status = position.game_status()
+        self.evals = [None] * len(self.fens)
+        self.best = [None] * len(self.fens)
+        self.marks = [None] * len(self.moves)
+        self.finished = set()
+
+    def __len__(self):
+        """Number of positions, the start included."""
+        return len(self.fens)
+
+    def done(self):
+        """True once every position has been searched."""
+        return len(self.finished) == len(self.fens)
+
+    def cancel(self):
+        """Stop the analysis; the running search is stopped too."""
+        self.cancelled.set()
+        if self.pool:
+            self.pool.cancel()
+        if self.searching:
+            self.engine.stop()
+
+    def _finish_without_search(self, ply):
+        """Fill in a game-over position, which needs no search. True if it was one."""
+        if ply != len(self.fens) - 1 or self.final_status not in (CHECKMATE, STALEMATE, INSUFFICIENT):
+            return False
+        # Mated or stalemated: lost for the side to move
+        score = 0 if self.final_status == INSUFFICIENT else -MATE_SCORE
+        self._record(ply, score, None)
+        return True
+
+    def run(self, engine, lock=None):
+        """
+        Search every position in order on one engine session. A search
+        stopped by someone else on a shared session is done again, so a
+        cut-short result is never taken for the position's evaluation.
+
+        Args:
+            engine: Started StockfishEngine
+            lock: Lock to hold around each search when the session is shared
+
+        Returns:
+            True if every position was searched, False if cancelled or the
+            engine failed
+        """
+        self.engine = engine
+        for ply in range(len(self.fens)):
+            if self.cancelled.is_set():
+                return False
+            if self._finish_without_search(ply):
+                continue
+            interrupted = True
+            while interrupted:
+                with lock or nullcontext():
+                    if self.cancelled.is_set() or not engine.ensure_started():
+                        return False
+                    self.searching = True
+                    try:
+                        results = engine.analyze_multi(self.fens[ply], depth=self.depth, multipv=1,
+                                                       cancel=self.cancelled,
+                                                       history=(self.root_fen, self.moves[:ply]),
+                                                       movetime=self.movetime)
+                    finally:
+                        self.searching = False
+                    info = engine.last_info.get(1)
+                    interrupted = engine.last_interrupted
+                if self.cancelled.is_set():
+                    return False
+            score = score_value(info.score_cp, info.score_mate) if info else None
+            self._record(ply, score, results[0][0])
+        return True
+
+    def run_pool(self, workers, engine_path, engine_args=None, threads=1, hash_mb=64, cache=None):
+        """
+        Split the positions over several engine processes. Each one gets
+        the plain FEN, so results arrive out of order and without the
+        engine seeing the game's history.
+
+        Args:
+            workers: Number of engine processes
+            engine_path: Engine executable
+            engine_args: Extra command line arguments for the engine
+            threads: Threads option for every engine
+            hash_mb: Hash option (MB) for every engine
+            cache: AnalysisCache shared by the engines (optional)
+
+        Returns:
+            True if every position was searched, False if cancelled
+        """
+        todo = [(ply, fen) for ply, fen in enumerate(self.fens) if not self._finish_without_search(ply)]
+        self.pool = EnginePool(workers, engine_path, engine_args, threads, hash_mb,
+                               self.depth, 1, None, cache, self.movetime)
+        if self.cancelled.is_set():
+            return False
+        for record in self.pool.run(todo):
+            if self.cancelled.is_set():
+                return False
+            score = score_value(record.get("score_cp"), record.get("score_mate"))
+            self._record(record["index"], score, record.get("bestmove"))
+        return not self.cancelled.is_set()
+
+    def _record(self, ply, score, best):
+        """
+        Store the result of one position and mark the moves around it.
+
+        Args:
+            ply: Position number
+            score: Evaluation for the side to move there, or None
+            best: Engine's move, or None
+        """
+        if score is not None and self.turns[ply] == 'b':
+            score = -score
+        self.evals[ply] = score
+        self.best[ply] = best
+        self.finished.add(ply)
+        evals = self.evals
+        for i in (ply - 1, ply):
+            if 0 <= i < len(self.marks) and evals[i] is not None and evals[i + 1] is not None:
+                sign = 1 if self.turns[i] == 'w' else -1
+                self.marks[i] = classify(sign * evals[i], sign * evals[i + 1])
+        if self.on_update:
+            self.on_update(ply)
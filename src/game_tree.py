@@ -0,0 +1,280 @@
+# Game tree with variations, stored as move deltas. Headless; drives a
+# position.Position through make/unmake and whole-position copies.
+
+from array import array
+from collections import OrderedDict
+
+# A move packs into 16 bits: from square << 7 | to square (squares < 128)
+MOVE_SHIFT = 7
+SQUARE_MASK = (1 << MOVE_SHIFT) - 1
+
+# Position snapshots kept for jumps, and how often one is kept
+# while moves are added (every CHECKPOINT_INTERVAL plies)
+POSITION_CACHE_SIZE = 256
+CHECKPOINT_INTERVAL = 16
+
+NO_CHASE = frozenset()
+
+
+class GameTree:
+    """
+    Moves of a game and its variations, with a current node.
+
+    Nodes are integers; node 0 is the starting position. Each node only
+    stores its move delta (from << 7 | to, two bytes), the captured code,
+    the key of the position it leads to and its links, all in flat
+    arrays. The first child of a node is its main continuation, later
+    children are variations. Check and chase information for repetition
+    adjudication (see repetition.move_threats) is kept per node too.
+
+    A bounded LRU holds snapshots (Position.snapshot, 91 bytes each) of
+    recently visited positions and of every CHECKPOINT_INTERVAL-th ply,
+    so a jump restores the nearest materialized ancestor and replays
+    only the moves below it.
+    """
+    def __init__(self, position, cache_size=POSITION_CACHE_SIZE):
+        """
+        Start a tree.
+
+        Args:
+            position: Position the tree drives, at the start of the game
+            cache_size: Maximum number of position snapshots
+        """
+        self.cache_size = cache_size
+        self.reset(position)
+
+    def reset(self, position):
+        """
+        Forget every move; the game now starts from the position as it is.
+
+        Args:
+            position: Position the tree drives
+        """
+        self.position = position
+        self.root = position.copy()
+        self.parents = array('i', [-1])
+        self.first_child = array('i', [-1])
+        self.next_sibling = array('i', [-1])
+        self.moves = array('H', [0])
+        self.captures = array('B', [0])
+        self.keys = array('Q', [position.key])
+        self.plies = array('I', [0])
+        self.checks = bytearray(1)
+        self.chases = [NO_CHASE]
+        self.notations = [None]
+        self.current = 0
+        self.cache = OrderedDict()
+
+    def __len__(self):
+        """Number of nodes, the root included."""
+        return len(self.parents)
+
+    @property
+    def ply(self):
+        """Ply of the current node."""
+        return self.plies[self.current]
+
+    def move(self, node):
+        """(from_square, to_square) of the move leading to a node."""
+        value = self.moves[node]
+        return value >> MOVE_SHIFT, value & SQUARE_MASK
+
+    def children(self, node):
+        """Children of a node, main continuation first."""
+        result = []
+        child = self.first_child[node]
+        while child >= 0:
+            result.append(child)
+            child = self.next_sibling[child]
+        return result
+
+    def find_child(self, node, frm, to):
+        """Child of a node reached by a move, or -1."""
+        value = frm << MOVE_SHIFT | to
+        child = self.first_child[node]
+        while child >= 0 and self.moves[child] != value:
+            child = self.next_sibling[child]
+        return child
+
+    def path(self, node):
+        """Nodes from the first move down to a node (the root excluded)."""
+        result = []
+        while node > 0:
+            result.append(node)
+            node = self.parents[node]
+        result.reverse()
+        return result
+
+    def line(self, node=None):
+        """
+        The line through a node: its path plus the main continuation below it.
+
+        Args:
+            node: Node; the current node if None
+
+        Returns:
+            List of nodes from the first move on
+        """
+        result = self.path(self.current if node is None else node)
+        node = result[-1] if result else 0
+        child = self.first_child[node]
+        while child >= 0:
+            result.append(child)
+            child = self.first_child[child]
+        return result
+
+    def add(self, frm, to, captured, notation=None, check=False, chased=NO_CHASE):
+        """
+        Record a move just made on the position from the current node and
+        make its node current. A move that already has a node is not
+        duplicated; a new move becomes the last variation.
+
+        Args:
+            frm: From square
+            to: To square
+            captured: Code returned by Position.make
+            notation: Move notation to keep with the node (optional)
+            check: True if the move gave check
+            chased: Squares of pieces the move chases
+
+        Returns:
+            The node
+        """
+        parent = self.current
+        node = self.find_child(parent, frm, to)
+        if node >= 0:
+            self.current = node
+            return node
+        node = len(self.parents)
+        self.parents.append(parent)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.moves.append(frm << MOVE_SHIFT | to)
+        self.captures.append(captured)
+        self.keys.append(self.position.key)
+        self.plies.append(self.plies[parent] + 1)
+        self.checks.append(check)
+        self.chases.append(chased)
+        self.notations.append(notation)
+        last = self.first_child[parent]
+        if last < 0:
+            self.first_child[parent] = node
+        else:
+            while self.next_sibling[last] >= 0:
+                last = self.next_sibling[last]
+            self.next_sibling[last] = node
+        self.current = node
+        if self.plies[node] % CHECKPOINT_INTERVAL == 0:
+            self._remember(node)
+        return node
+
+    def undo(self):
+        """
+        Go to the parent of the current node.
+
+        Returns:
+            The node left, or -1 at the root
+        """
+        node = self.current
+        if node == 0:
+            return -1
+        frm, to = self.move(node)
+        self.position.unmake(frm, to, self.captures[node])
+        self.current = self.parents[node]
+        return node
+
+    def redo(self):
+        """
+        Go to the main continuation of the current node.
+
+        Returns:
+            The node reached, or -1 at the end of the line
+        """
+        node = self.first_child[self.current]
+        if node < 0:
+            return -1
+        self.position.make(*self.move(node))
+        self.current = node
+        return node
+
+    def goto(self, node):
+        """
+        Make a node current and bring the position there.
+
+        A close ancestor is reached by unmaking moves. Otherwise the nearest
+        ancestor of the target that is the current node or materialized
+        (the root always is) is found, restored if needed, and the moves
+        below it replayed, so the cost depends on the distance to the
+        nearest checkpoint, not on the size of the tree.
+
+        Args:
+            node: Target node
+        """
+        current = self.current
+        if node == current:
+            return
+        steps = self.plies[current] - self.plies[node]
+        if 0 < steps <= CHECKPOINT_INTERVAL:
+            ancestor = current
+            for _ in range(steps):
+                ancestor = self.parents[ancestor]
+            if ancestor == node:
+                # Close ancestor: take the moves back
+                while self.current != node:
+                    self.undo()
+                return
+        replay = []
+        ancestor = node
+        while ancestor != current and ancestor > 0 and ancestor not in self.cache:
+            replay.append(ancestor)
+            ancestor = self.parents[ancestor]
+        if ancestor != current:
+            if ancestor == 0:
+                self.position.copy_from(self.root)
+            else:
+                self.position.restore(self.cache[ancestor])
+                self.cache.move_to_end(ancestor)
+        position = self.position
+        for step in reversed(replay):
+            position.make(*self.move(step))
+        self.current = node
+        if len(replay) > 1:
+            self._remember(node)
+
+    def goto_ply(self, ply):
+        """
+        Go to a ply of the current line (see line).
+
+        Args:
+            ply: Target ply, clamped to the line
+
+        Returns:
+            The node reached
+        """
+        line = self.line()
+        ply = max(0, min(ply, len(line)))
+        node = line[ply - 1] if ply else 0
+        self.goto(node)
+        return node
+
+    def fen_at(self, node):
+        """
+        FEN of the position at a node, leaving the current node alone.
+
+        Args:
+            node: Node to describe
+
+        Returns:
+            FEN string
+        """
+        position = self.root.copy()
+        for step in self.path(node):
+            position.make(*self.move(step))
+        return position.fen()
+
+    def _remember(self, node):
+        """Keep a snapshot of the current position, which is at node."""
+        self.cache[node] = self.position.snapshot()
+        self.cache.move_to_end(node)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
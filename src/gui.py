@@ -1,6 +1,11 @@
 import tkinter as tk
 from board import XiangqiBoard
+from move_list import MoveList
 from engine import StockfishEngine
+from analysis_cache import AnalysisCache
+from batch import default_workers
+from game_analysis import GameAnalysis, EVAL_CLAMP
+from position import ONGOING, INSUFFICIENT, parse_uci_move, uci_move
 from translator import tr
 import threading
 import sys
@@ -12,6 +17,26 @@ class MainGUI:
     Main GUI class for Xiangqi analysis application.
     Handles all UI elements, user interactions, and engine communication.
     """
+    # Refresh interval of the analysis panel in live mode
+    STREAM_FRAME_MS = 100
+    # Depth of an ANALYZE request, and of the speculative searches of the
+    # positions after its top PONDER_MOVES lines (pre-analysis mode)
+    ANALYSIS_DEPTH = 15
+    PONDER_DEPTH = 10
+    PONDER_MOVES = 2
+    # Whole-game analysis: default seconds per position, and from how
+    # many plies on (and over at most how many engines) the positions
+    # are split over an engine pool instead of the GUI's session
+    GAME_MOVETIME = 1.0
+    GAME_SPLIT_PLIES = 120
+    GAME_MAX_ENGINES = 4
+    # Colours of the move marks in the evaluation graph
+    MARK_COLORS = {"?!": '#FFD700', "?": '#FF8C00', "??": '#DC143C'}
+    # Smallest board cell in pixels, and how long the window must stay
+    # the same size before the board is laid out again
+    MIN_CELL = 30
+    RESIZE_DELAY_MS = 80
+
     def __init__(self, root):
         """
         Initialize the main GUI.
@@ -21,6 +46,23 @@ class MainGUI:
         """
         self.root = root
         self.engine = StockfishEngine()
+        self.engine_lock = threading.Lock()
+        self.engine_new_game = False
+        self.live_mode = False
+        self.ponder_mode = False
+        self.speculation_cancel = None
+        self.speculating = False
+        self.game_analysis = None
+        self.game_nodes = []
+        # Node -> ply of the analysed line, for the graph cursor
+        self.game_plies = {}
+        self.position_generation = 0
+        self.search_cancel = None
+        # Cancel event of the request whose search is running on the engine
+        self.search_owner = None
+        self.stream_lock = threading.Lock()
+        self.stream_lines = {}
+        self.stream_dirty = False
         self.setup_mode = False
         self.selected_piece_for_setup = None
         self.setup_window = None
@@ -28,8 +70,39 @@ class MainGUI:
         
         # Set window icon
         self.set_window_icon()
+        self.open_analysis_cache()
         
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.start_engine_session()
+
+    def start_engine_session(self):
+        """Start the long-lived engine session in the background."""
+        def run():
+            with self.engine_lock:
+                self.engine.ensure_started()
+        threading.Thread(target=run, daemon=True).start()
+
+    def open_analysis_cache(self):
+        """Attach the on-disk analysis cache to the engine, if it can be opened."""
+        path = os.path.join(self.get_base_path(), "cache", "analysis.sqlite")
+        try:
+            self.engine.cache = AnalysisCache(path)
+        except Exception as e:
+            # Read-only install folder or broken file: analyse without cache
+            if self.debug:
+                print(f"Analysis cache disabled: {e}")
+
+    def on_close(self):
+        """Shut down the engine session and close the main window."""
+        self.cancel_search()
+        self.cancel_speculation()
+        if self.game_analysis:
+            self.game_analysis.cancel()
+        self.engine.close()
+        if self.engine.cache:
+            self.engine.cache.close()
+        self.root.destroy()
 
     def get_base_path(self):
         """
@@ -82,7 +155,8 @@ class MainGUI:
         self.root.title("XiangqiMO")
         self.root.geometry("1200x800")
         self.root.configure(bg='#1E1E1E')
-        self.root.resizable(False, False)
+        self.root.resizable(True, True)
+        self.root.minsize(1000, 600)
         main_container = tk.Frame(self.root, bg='#1E1E1E')
         main_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
         top_frame = tk.Frame(main_container, bg='#1E1E1E')
@@ -157,7 +231,7 @@ class MainGUI:
         content_frame = tk.Frame(main_container, bg='#1E1E1E')
         content_frame.pack(fill=tk.BOTH, expand=True)
         board_frame = tk.Frame(content_frame, bg='#2D2D2D', relief=tk.FLAT, bd=0)
-        board_frame.pack(side=tk.LEFT, padx=(0, 20))
+        board_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 20))
         canvas_width = 8 * 60 + 100
         canvas_height = 9 * 60 + 120
         self.canvas = tk.Canvas(
@@ -167,15 +241,23 @@ class MainGUI:
             bg='#2D2D2D',
             highlightthickness=0
         )
-        self.canvas.pack(padx=15, pady=15)
+        self.canvas.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
         self.canvas.tag_raise("all")
         self.board = XiangqiBoard(self.canvas, x=50, y=60, cell=60)
-        self.board.on_move_made = self.update_move_list
-        self.board.reset_history()
+        self.board.on_move_made = self.on_move_made
+        self.board.on_rules_ready = self.on_rules_ready
+        if os.environ.get("XIANGQIMO_RENDER_TIMING"):
+            self.board.on_render = self.log_render_time
         self.canvas.unbind("<Button-1>")
         self.canvas.unbind("<ButtonRelease-1>")
         self.canvas.unbind("<ButtonPress-1>")
         self.canvas.bind("<Button-1>", self.on_board_click)
+        self.root.bind("<Left>", lambda e: self.undo_move())
+        self.root.bind("<Right>", lambda e: self.redo_move())
+        self.root.bind("<Home>", lambda e: self.go_to_ply(0))
+        self.root.bind("<End>", lambda e: self.go_to_ply(len(self.board.tree.line())))
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
+        self.resize_job = None
         self.canvas.focus_set()
         control_panel = tk.Frame(
             content_frame,
@@ -184,7 +266,7 @@ class MainGUI:
             bd=0,
             width=340
         )
-        control_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        control_panel.pack(side=tk.RIGHT, fill=tk.Y)
         control_panel.pack_propagate(False)
         self.panel_title = tk.Label(
             control_panel,
@@ -215,6 +297,24 @@ class MainGUI:
         self.reset_btn.pack(pady=3)
         self.undo_btn = tk.Button(btn_frame, text=tr.get("undo"), bg='#3A3A3A', activebackground='#4A4A4A', command=self.undo_move, **btn_style)
         self.undo_btn.pack(pady=3)
+        self.redo_btn = tk.Button(btn_frame, text=tr.get("redo"), bg='#3A3A3A', activebackground='#4A4A4A', command=self.redo_move, **btn_style)
+        self.redo_btn.pack(pady=3)
+        self.live_btn = tk.Button(btn_frame, text=tr.get("live"), bg='#3A3A3A', activebackground='#4A4A4A', command=self.toggle_live_analysis, **btn_style)
+        self.live_btn.pack(pady=3)
+        self.ponder_btn = tk.Button(btn_frame, text=tr.get("ponder"), bg='#3A3A3A', activebackground='#4A4A4A', command=self.toggle_ponder, **btn_style)
+        self.ponder_btn.pack(pady=3)
+        game_row = tk.Frame(btn_frame, bg='#2D2D2D')
+        game_row.pack(pady=3)
+        self.game_btn = tk.Button(game_row, text=tr.get("analyze_game"), bg='#3A3A3A', activebackground='#4A4A4A',
+                                  command=self.toggle_game_analysis, **dict(btn_style, width=14))
+        self.game_btn.pack(side=tk.LEFT)
+        self.game_movetime = tk.StringVar(value=str(self.GAME_MOVETIME))
+        tk.Spinbox(game_row, from_=0.1, to=60, increment=0.1, width=4, textvariable=self.game_movetime,
+                   font=('Inter', 10), bg='#1E1E1E', fg='#E0E0E0', buttonbackground='#3A3A3A',
+                   relief=tk.FLAT, justify=tk.RIGHT).pack(side=tk.LEFT, padx=(6, 2), ipady=4)
+        self.movetime_label = tk.Label(game_row, text=tr.get("sec_per_move"), font=('Inter', 9),
+                                       bg='#2D2D2D', fg='#B0B0B0')
+        self.movetime_label.pack(side=tk.LEFT)
         analysis_frame = tk.Frame(control_panel, bg='#252525', relief=tk.FLAT, bd=0, height=90)
         analysis_frame.pack(pady=(0, 10), padx=15, fill=tk.X)
         analysis_frame.pack_propagate(False)
@@ -246,8 +346,15 @@ class MainGUI:
         self.score_value = tk.Label(score_line, text="0.00", font=('Inter', 12, 'bold'),
                                    bg='#252525', fg='#90EE90')
         self.score_value.pack(side=tk.RIGHT)
+        self.stats_text = tk.Label(info_frame, text="", font=('Consolas', 9),
+                                   bg='#252525', fg='#808080', anchor='w')
+        self.stats_text.pack(fill=tk.X, padx=12)
         separator = tk.Frame(info_frame, height=1, bg='#404040')
         separator.pack(fill=tk.X, padx=12, pady=6)
+        self.eval_graph = tk.Canvas(info_frame, height=48, bg='#1E1E1E', highlightthickness=0, cursor='hand2')
+        self.eval_graph.pack(fill=tk.X, padx=12, pady=(0, 6))
+        self.eval_graph.bind("<Configure>", lambda e: self.draw_eval_graph())
+        self.eval_graph.bind("<Button-1>", self.on_eval_graph_click)
         moves_header = tk.Frame(info_frame, bg='#252525')
         moves_header.pack(fill=tk.X, padx=12, pady=(0, 4))
         self.moves_title = tk.Label(moves_header, text=tr.get("move_history"),
@@ -260,7 +367,6 @@ class MainGUI:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.move_listbox = tk.Listbox(
             moves_frame,
-            yscrollcommand=scrollbar.set,
             bg='#1E1E1E',
             fg='#E0E0E0',
             font=('Consolas', 9),
@@ -273,7 +379,7 @@ class MainGUI:
             activestyle='none'
         )
         self.move_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=self.move_listbox.yview)
+        self.move_list = MoveList(self.move_listbox, scrollbar, self.board.tree, self.go_to_node)
         self.update_language_label()
 
     def show_info_window(self, event=None):
@@ -593,6 +699,7 @@ class MainGUI:
         self.setup_mode = True
         self.setup_icon.config(fg='#FFD700')
         self.setup_label.config(fg='#FFD700', text=tr.get("setup_active"))
+        self.cancel_search()
         self.board.selected_piece = None
         self.board.legal_moves.clear()
         self.canvas.delete("highlight", "legal", "arrow")
@@ -724,12 +831,16 @@ class MainGUI:
                 )
             return
         self.board.current_turn = self.turn_var.get()
-        self.board.move_history.clear()
-        self.board.move_from_to_history.clear()
+        self.clear_game_analysis()
+        self.board.reset_history()
+        # Legal moves and status of the edited position
+        self.board.refresh_rules()
+        self.engine_new_game = True
         self.update_move_list()
         self.clear_analysis_lines()
         self.canvas.delete("arrow")
         self.close_setup_window()
+        self.on_position_changed()
 
     def create_language_menu(self):
         """Create the language selection menu."""
@@ -765,12 +876,204 @@ class MainGUI:
         }
         self.current_lang_label.config(text=lang_codes.get(tr.lang, 'EN'))
 
+    def on_canvas_resize(self, event):
+        """
+        Schedule a new board layout for the canvas size; a drag of the
+        window edge only lays the board out once it stops.
+        
+        Args:
+            event: Tkinter configure event
+        """
+        if self.resize_job is not None:
+            self.root.after_cancel(self.resize_job)
+        self.resize_job = self.root.after(self.RESIZE_DELAY_MS, self.fit_board, event.width, event.height)
+
+    def fit_board(self, width, height):
+        """
+        Scale the board to the largest cell that fits the canvas, centred.
+        
+        Args:
+            width: Canvas width in pixels
+            height: Canvas height in pixels
+        """
+        self.resize_job = None
+        # 100 and 120 px of margin hold the frame and the file numbers at a 60 px cell
+        cell = max(self.MIN_CELL, min(width * 60 // (8 * 60 + 100), height * 60 // (9 * 60 + 120)))
+        x = (width - 8 * cell) // 2
+        y = (height - 9 * cell) // 2
+        self.board.resize(x, y, cell)
+
+    def log_render_time(self, operation, seconds, changed):
+        """
+        Board timing hook: print how long a drawing operation took.
+        
+        Args:
+            operation: Name of the board drawing method
+            seconds: Time it took
+            changed: Number of squares it touched
+        """
+        print(f"render {operation}: {seconds * 1000:.3f} ms, {changed} squares")
+
     def undo_move(self):
         """Undo the last move."""
-        if self.board.undo_move():
+        tree = self.board.tree
+        self.go_to_node(tree.parents[tree.current])
+
+    def redo_move(self):
+        """Play the main continuation of the current move again."""
+        tree = self.board.tree
+        self.go_to_node(tree.first_child[tree.current])
+
+    def go_to_ply(self, ply):
+        """
+        Show the current line at a ply (0 is the starting position).
+        
+        Args:
+            ply: Number of moves to have played
+        """
+        line = self.board.tree.line()
+        ply = max(0, min(ply, len(line)))
+        self.go_to_node(line[ply - 1] if ply else 0)
+
+    def go_to_node(self, node):
+        """
+        Show the game at a node of the game tree.
+        
+        Args:
+            node: Game tree node (0 is the starting position, -1 is ignored)
+        """
+        if self.board.goto_node(node):
             self.update_move_list()
             self.canvas.delete("arrow")
             self.clear_analysis_lines()
+            self.on_position_changed()
+
+    def on_move_made(self):
+        """Handle a move played on the board."""
+        self.update_move_list()
+        self.on_position_changed()
+
+    def on_position_changed(self):
+        """
+        Invalidate every analysis request made for the old position and,
+        in live mode, restart the search for the position now on the board.
+        """
+        self.position_generation += 1
+        self.cancel_search()
+        self.draw_eval_cursor()
+        self.analyze_btn.config(state=tk.NORMAL, bg='#3A3A3A', text=tr.get("analyze"))
+        verdict = self.board.repetitions.adjudicate()
+        if verdict:
+            self.show_repetition(*verdict)
+        if self.live_mode:
+            self.start_live_analysis()
+        elif self.ponder_mode:
+            self.show_cached_analysis()
+        status = self.board.known_status()
+        if status is not None:
+            self.on_rules_ready(status)
+
+    def on_rules_ready(self, status):
+        """
+        Handle the game status of the position on the board, which the
+        board works out off the Tk thread after every change.
+        
+        Args:
+            status: Game status from position.py
+        """
+        if status == ONGOING:
+            return
+        if status != INSUFFICIENT:
+            # Mated or stalemated: nothing for the engine to search
+            self.cancel_search()
+        self.show_game_status(status)
+
+    def show_game_status(self, status):
+        """
+        Show in the analysis panel that the game is over.
+        
+        Args:
+            status: CHECKMATE, STALEMATE or INSUFFICIENT from position.py
+        """
+        self.analyze_btn.config(state=tk.NORMAL, bg='#3A3A3A', text=tr.get("analyze"))
+        self.best_move_text.config(text=tr.get(status))
+        self.best_score_text.config(text="")
+        self.second_move_text.config(text="---")
+        self.second_score_text.config(text="")
+        # Engine convention: the side to move is mated
+        self.score_value.config(text="0.00" if status == INSUFFICIENT else "mate 0")
+        self.stats_text.config(text="")
+
+    def show_repetition(self, verdict, loser):
+        """
+        Show the verdict on a repeated position in the analysis panel.
+        Analysis stays available, since players may still deviate.
+        
+        Args:
+            verdict: REPETITION_DRAW, PERPETUAL_CHECK or PERPETUAL_CHASE from repetition.py
+            loser: 'w' or 'b' for perpetual check or chase, None for a draw
+        """
+        self.best_move_text.config(text=tr.get(verdict))
+        self.best_score_text.config(text=tr.get("red" if loser == 'w' else "black") if loser else "")
+        self.second_move_text.config(text="---")
+        self.second_score_text.config(text="")
+        self.stats_text.config(text="")
+
+    def game_over(self):
+        """
+        True if the side to move is mated or stalemated. The status comes
+        from the board's rules worker and is never worked out on the Tk
+        thread: while the worker is busy the answer is False, and
+        on_rules_ready ends any search once the game turns out to be over.
+        """
+        status = self.board.known_status()
+        return status is not None and status != ONGOING and status != INSUFFICIENT
+
+    def new_search_request(self):
+        """
+        Preempt the in-flight analysis request and open a new one for the
+        current position.
+        
+        Returns:
+            Tuple (generation, cancel) identifying the new request
+        """
+        self.cancel_search()
+        self.cancel_speculation()
+        self.search_cancel = threading.Event()
+        return self.position_generation, self.search_cancel
+
+    def cancel_search(self):
+        """
+        Supersede the current analysis request: its results are discarded
+        and, if its search is the one running, the engine is told to stop
+        searching right away. A search of another job on the session, such
+        as a game analysis, is left alone.
+        """
+        cancel = self.search_cancel
+        if cancel is None:
+            return
+        cancel.set()
+        self.search_cancel = None
+        if self.search_owner is cancel:
+            self.engine.stop()
+
+    def deliver_result(self, generation, cancel, callback, *args):
+        """
+        Run a UI callback for an analysis result, unless the request it
+        belongs to has been superseded in the meantime.
+        
+        Args:
+            generation: Position generation the request was made for
+            cancel: Cancel event of the request
+            callback: UI method to call
+            *args: Arguments for the callback
+        """
+        if generation != self.position_generation or cancel.is_set():
+            return
+        if cancel is self.search_cancel:
+            # Answered: there is no search left to cancel
+            self.search_cancel = None
+        callback(*args)
 
     def clear_analysis_lines(self):
         """Clear all analysis display lines."""
@@ -779,46 +1082,396 @@ class MainGUI:
         self.second_move_text.config(text="---")
         self.second_score_text.config(text="")
         self.score_value.config(text="0.00")
+        self.stats_text.config(text="")
+
+    def format_search_stats(self, info, cached=False):
+        """
+        Format depth, node count and speed of an engine line for the panel.
+        
+        Args:
+            info: InfoLine of the best line, or None
+            cached: True if the line was read from the analysis cache
+            
+        Returns:
+            Short statistics string, empty if nothing is known
+        """
+        if info is None or info.depth is None:
+            return ""
+        parts = [f"d{info.depth}/{info.seldepth}" if info.seldepth else f"d{info.depth}"]
+        if info.nodes is not None:
+            parts.append(f"{info.nodes / 1000000:.2f}M n" if info.nodes >= 1000000 else f"{info.nodes // 1000}k n")
+        if info.nps:
+            parts.append(f"{info.nps // 1000}k nps")
+        if info.hashfull is not None:
+            parts.append(f"hash {info.hashfull / 10:.0f}%")
+        if cached:
+            parts.append(f"({tr.get('cached')})")
+        return "  ".join(parts)
 
     def update_move_list(self):
-        """Update the move history listbox."""
-        self.move_listbox.delete(0, tk.END)
-        moves = self.board.move_history
-        for i in range(0, len(moves), 2):
-            move_num = i//2 + 1
-            if i + 1 < len(moves):
-                display = f"{move_num:2d}. {moves[i]:<6} {moves[i+1]:<6}"
-            else:
-                display = f"{move_num:2d}. {moves[i]:<6}"
-            self.move_listbox.insert(tk.END, display)
-        self.move_listbox.see(tk.END)
+        """
+        Update the move history listbox with the current line of the game
+        tree. Playing on at the end of the line or moving along it only
+        touches the last row or the selection (see move_list.MoveList).
+        """
+        self.move_list.update()
+
+    def toggle_live_analysis(self):
+        """Switch the streaming (go infinite) analysis mode on or off."""
+        if self.live_mode:
+            self.live_mode = False
+            self.cancel_search()
+            self.live_btn.config(text=tr.get("live"), bg='#3A3A3A')
+        else:
+            self.live_mode = True
+            self.live_btn.config(text=tr.get("live_stop"), bg='#4A7A9C')
+            self.start_live_analysis()
+
+    def start_live_analysis(self):
+        """
+        Start an infinite search on the current position. Engine lines are
+        collected per MultiPV slot on the search thread and shown at most
+        once per STREAM_FRAME_MS by flush_live_analysis.
+        """
+        generation, cancel = self.new_search_request()
+        with self.stream_lock:
+            self.stream_lines = {}
+            self.stream_dirty = False
+        if self.game_over():
+            # Mated or stalemated: nothing for the engine to search
+            self.show_game_status(self.board.known_status())
+            return
+        self.best_move_text.config(text="⚙ ...")
+        self.second_move_text.config(text="⚙ ...")
+        current_fen = self.board.fen()
+        history = self.board.uci_history()
+        def on_update(info):
+            with self.stream_lock:
+                if cancel.is_set():
+                    return
+                self.stream_lines[info.multipv] = info
+                self.stream_dirty = True
+        def run():
+            try:
+                with self.engine_lock:
+                    if cancel.is_set():
+                        return
+                    if not self.engine.ensure_started():
+                        self.root.after(0, self.deliver_result, generation, cancel, self.analysis_error)
+                        return
+                    if self.engine_new_game:
+                        self.engine_new_game = False
+                        self.engine.new_game()
+                    self.search_owner = cancel
+                    try:
+                        self.engine.analyze_infinite(current_fen, on_update, multipv=2, cancel=cancel,
+                                                     history=history)
+                    finally:
+                        self.search_owner = None
+            except Exception as e:
+                self.root.after(0, self.deliver_result, generation, cancel, self.analysis_error)
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(self.STREAM_FRAME_MS, self.flush_live_analysis, cancel)
+
+    def flush_live_analysis(self, cancel):
+        """
+        Show the latest line of every MultiPV slot, then reschedule itself
+        until the live search is cancelled.
+        
+        Args:
+            cancel: Cancel event of the live search this refresh belongs to
+        """
+        if cancel is not self.search_cancel:
+            return
+        with self.stream_lock:
+            dirty = self.stream_dirty
+            lines = dict(self.stream_lines)
+            self.stream_dirty = False
+        if dirty and 1 in lines:
+            best, second = lines[1], lines.get(2)
+            self.update_analysis(best.move, best.score_text(),
+                                 second.move if second else None,
+                                 second.score_text() if second else None,
+                                 best)
+        self.root.after(self.STREAM_FRAME_MS, self.flush_live_analysis, cancel)
+
+    def toggle_ponder(self):
+        """Switch speculative pre-analysis of the likely next positions on or off."""
+        self.ponder_mode = not self.ponder_mode
+        if self.ponder_mode:
+            self.ponder_btn.config(text=tr.get("ponder_stop"), bg='#4A7A9C')
+        else:
+            self.cancel_speculation()
+            self.ponder_btn.config(text=tr.get("ponder"), bg='#3A3A3A')
+
+    def schedule_speculation(self, moves):
+        """
+        After an analysis, queue the pre-analysis of the positions after
+        its top moves for when Tk is idle.
+        
+        Args:
+            moves: UCI moves of the analysis, best first (None entries are skipped)
+        """
+        if self.ponder_mode:
+            self.root.after_idle(self.start_speculation, self.position_generation, moves)
+
+    def start_speculation(self, generation, moves):
+        """
+        Search the positions after the given moves at PONDER_DEPTH on the
+        engine session. Results only go to the analysis cache, where
+        show_cached_analysis finds them once one of the moves is played.
+        Any real analysis request cancels the speculation.
+        
+        Args:
+            generation: Position generation the moves belong to
+            moves: UCI moves from the position on the board
+        """
+        if not self.ponder_mode or generation != self.position_generation:
+            return
+        position = self.board.position
+        root_fen, history = self.board.uci_history()
+        children = []
+        for move in moves[:self.PONDER_MOVES]:
+            squares = parse_uci_move(move)
+            if squares is None or not position.is_legal(*squares):
+                continue
+            child = position.copy()
+            child.make(*squares)
+            children.append((child.fen(), (root_fen, history + [move])))
+        self.cancel_speculation()
+        cancel = threading.Event()
+        self.speculation_cancel = cancel
+        def run():
+            try:
+                for fen, child_history in children:
+                    with self.engine_lock:
+                        if cancel.is_set() or not self.engine.ensure_started():
+                            return
+                        self.speculating = True
+                        try:
+                            self.engine.analyze_multi(fen, depth=self.PONDER_DEPTH, multipv=2, cancel=cancel,
+                                                      history=child_history)
+                        finally:
+                            self.speculating = False
+            except Exception as e:
+                if self.debug:
+                    print(f"Pre-analysis failed: {e}")
+        threading.Thread(target=run, daemon=True).start()
+
+    def cancel_speculation(self):
+        """Cancel the pre-analysis in progress, stopping its search if it is running."""
+        if self.speculation_cancel is None:
+            return
+        self.speculation_cancel.set()
+        self.speculation_cancel = None
+        if self.speculating:
+            self.engine.stop()
+
+    def show_cached_analysis(self):
+        """
+        Show a cached analysis of the position on the board right away,
+        such as one made by pre-analysis, at any depth from PONDER_DEPTH up.
+        """
+        infos = self.engine.peek_cache(self.board.fen(), self.PONDER_DEPTH, 2)
+        if not infos or not infos[0].move:
+            return
+        best = infos[0]
+        second = infos[1] if len(infos) > 1 else None
+        self.update_analysis(best.move, best.score_text(),
+                             second.move if second else None,
+                             second.score_text() if second else None,
+                             best, cached=True)
+
+    def toggle_game_analysis(self):
+        """
+        Analyse every position of the current line, or stop the analysis
+        in progress. The positions are searched in order on the engine
+        session (the lock is taken per position, so ANALYZE requests can
+        still get in between); long games are split over an engine pool.
+        """
+        analysis = self.game_analysis
+        if analysis and not analysis.cancelled.is_set() and not analysis.done():
+            analysis.cancel()
+            self.game_btn.config(text=tr.get("analyze_game"), bg='#3A3A3A')
+            return
+        tree = self.board.tree
+        nodes = tree.line()
+        if not nodes:
+            return
+        if self.live_mode:
+            # Live analysis would hold the engine session all along
+            self.toggle_live_analysis()
+        self.cancel_speculation()
+        try:
+            movetime = min(60.0, max(0.1, float(self.game_movetime.get())))
+        except ValueError:
+            movetime = self.GAME_MOVETIME
+        moves = [uci_move(*tree.move(node)) for node in nodes]
+        analysis = GameAnalysis(tree.root.fen(), moves, movetime=int(movetime * 1000),
+                                on_update=lambda ply: self.root.after(0, self.on_game_ply, analysis, ply))
+        self.game_analysis = analysis
+        self.game_nodes = [0] + nodes
+        self.game_plies = {node: ply for ply, node in enumerate(self.game_nodes)}
+        self.move_list.clear_marks()
+        self.draw_eval_graph()
+        self.game_btn.config(text=tr.get("analyze_game_stop"), bg='#4A7A9C')
+        workers = min(self.GAME_MAX_ENGINES, default_workers(self.engine.options.get("Threads", 1)))
+        def run():
+            try:
+                if len(moves) >= self.GAME_SPLIT_PLIES and workers > 1:
+                    analysis.run_pool(workers, self.engine.engine_path, self.engine.engine_args,
+                                      cache=self.engine.cache)
+                else:
+                    with self.engine_lock:
+                        if self.engine.ensure_started() and self.engine_new_game:
+                            self.engine_new_game = False
+                            self.engine.new_game()
+                    analysis.run(self.engine, self.engine_lock)
+            except Exception as e:
+                if self.debug:
+                    print(f"Game analysis failed: {e}")
+            self.root.after(0, self.on_game_analysis_done, analysis)
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_game_ply(self, analysis, ply):
+        """
+        Show one more analysed position: mark the moves around it and
+        extend the evaluation graph.
+        
+        Args:
+            analysis: GameAnalysis the result belongs to
+            ply: Position number in the analysed line
+        """
+        if analysis is not self.game_analysis:
+            return
+        for i in (ply - 1, ply):
+            if 0 <= i < len(analysis.marks):
+                self.move_list.set_mark(self.game_nodes[i + 1], analysis.marks[i])
+        self.draw_eval_graph()
+
+    def on_game_analysis_done(self, analysis):
+        """Reset the game analysis button once its analysis has ended."""
+        if analysis is self.game_analysis:
+            self.game_btn.config(text=tr.get("analyze_game"), bg='#3A3A3A')
+
+    def clear_game_analysis(self):
+        """Stop and forget the game analysis, e.g. when a new game starts."""
+        if self.game_analysis:
+            self.game_analysis.cancel()
+        self.game_analysis = None
+        self.game_nodes = []
+        self.game_plies = {}
+        self.game_btn.config(text=tr.get("analyze_game"), bg='#3A3A3A')
+        self.move_list.clear_marks()
+        self.draw_eval_graph()
+
+    def eval_graph_x(self, ply):
+        """X coordinate of a ply in the evaluation graph."""
+        width = max(self.eval_graph.winfo_width(), 2)
+        return 1 + ply * (width - 2) / max(1, len(self.game_nodes) - 1)
+
+    def draw_eval_graph(self):
+        """
+        Draw the evaluations of the analysed line, red's advantage upwards,
+        with the marked moves as dots. Positions not analysed yet leave gaps.
+        """
+        graph = self.eval_graph
+        graph.delete("all")
+        height = max(graph.winfo_height(), 2)
+        middle = height / 2
+        graph.create_line(0, middle, graph.winfo_width(), middle, fill='#404040')
+        analysis = self.game_analysis
+        if analysis is None:
+            return
+        scale = (middle - 3) / EVAL_CLAMP
+        segments = []
+        points = []
+        for ply, value in enumerate(analysis.evals):
+            if value is None:
+                if len(points) > 2:
+                    segments.append(points)
+                points = []
+                continue
+            points += [self.eval_graph_x(ply), middle - max(-EVAL_CLAMP, min(EVAL_CLAMP, value)) * scale]
+        if len(points) > 2:
+            segments.append(points)
+        for points in segments:
+            graph.create_line(*points, fill='#90EE90', width=1.5)
+        for i, mark in enumerate(analysis.marks):
+            if mark:
+                x = self.eval_graph_x(i + 1)
+                y = middle - max(-EVAL_CLAMP, min(EVAL_CLAMP, analysis.evals[i + 1])) * scale
+                graph.create_oval(x - 2.5, y - 2.5, x + 2.5, y + 2.5, fill=self.MARK_COLORS[mark], outline='')
+        self.draw_eval_cursor()
+
+    def draw_eval_cursor(self):
+        """Mark the position on the board in the evaluation graph, if it is on the analysed line."""
+        graph = self.eval_graph
+        graph.delete("cursor")
+        ply = self.game_plies.get(self.board.tree.current)
+        if self.game_analysis is None or ply is None:
+            return
+        x = self.eval_graph_x(ply)
+        graph.create_line(x, 0, x, graph.winfo_height(), fill='#4A7A9C', tags="cursor")
+
+    def on_eval_graph_click(self, event):
+        """Go to the position clicked in the evaluation graph."""
+        if len(self.game_nodes) < 2:
+            return
+        width = max(self.eval_graph.winfo_width(), 2)
+        ply = round((event.x - 1) * (len(self.game_nodes) - 1) / (width - 2))
+        ply = max(0, min(ply, len(self.game_nodes) - 1))
+        self.go_to_node(self.game_nodes[ply])
 
     def analyze(self):
         """Start position analysis in a separate thread."""
+        if self.live_mode:
+            self.toggle_live_analysis()
+        if self.game_over():
+            self.cancel_search()
+            self.show_game_status(self.board.known_status())
+            return
         self.analyze_btn.config(state=tk.DISABLED, bg='#505050', text=tr.get("thinking"))
         self.best_move_text.config(text="⚙ ...")
         self.best_score_text.config(text="")
         self.second_move_text.config(text="⚙ ...")
         self.second_score_text.config(text="")
         self.score_value.config(text="...")
-        self.root.update()
+        generation, cancel = self.new_search_request()
+        current_fen = self.board.fen()
+        history = self.board.uci_history()
         def run():
             try:
-                current_fen = self.board.fen()
-                if self.engine.start():
-                    results = self.engine.analyze_multi(current_fen, depth=15, multipv=2)
-                    self.engine.close()
+                with self.engine_lock:
+                    if cancel.is_set():
+                        return
+                    started = self.engine.ensure_started()
+                    if started:
+                        if self.engine_new_game:
+                            self.engine_new_game = False
+                            self.engine.new_game()
+                        self.search_owner = cancel
+                        try:
+                            results = self.engine.analyze_multi(current_fen, depth=self.ANALYSIS_DEPTH, multipv=2,
+                                                                cancel=cancel, history=history)
+                        finally:
+                            self.search_owner = None
+                        stats = self.engine.last_info.get(1)
+                        cached = self.engine.last_from_cache
+                if started:
                     if results and len(results) >= 2:
                         best_move, best_score = results[0]
                         second_move, second_score = results[1]
-                        self.root.after(0, self.update_analysis,
-                                      best_move, best_score, second_move, second_score)
+                        self.root.after(0, self.deliver_result, generation, cancel, self.update_analysis,
+                                      best_move, best_score, second_move, second_score, stats, cached)
+                        self.root.after(0, self.deliver_result, generation, cancel, self.schedule_speculation,
+                                      [best_move, second_move])
                     else:
-                        self.root.after(0, self.no_move_found)
+                        self.root.after(0, self.deliver_result, generation, cancel, self.no_move_found)
                 else:
-                    self.root.after(0, self.analysis_error)
+                    self.root.after(0, self.deliver_result, generation, cancel, self.analysis_error)
             except Exception as e:
-                self.root.after(0, self.analysis_error)
+                self.root.after(0, self.deliver_result, generation, cancel, self.analysis_error)
         threading.Thread(target=run, daemon=True).start()
 
     def no_move_found(self):
@@ -829,8 +1482,9 @@ class MainGUI:
         self.second_move_text.config(text="---")
         self.second_score_text.config(text="")
         self.score_value.config(text="0.00")
+        self.stats_text.config(text="")
 
-    def update_analysis(self, best_move, best_score, second_move, second_score):
+    def update_analysis(self, best_move, best_score, second_move, second_score, stats=None, cached=False):
         """
         Update UI with analysis results.
         
@@ -839,8 +1493,11 @@ class MainGUI:
             best_score: Best move score
             second_move: Second best move UCI string
             second_score: Second best move score
+            stats: InfoLine of the best line with search statistics (optional)
+            cached: True if the result came from the analysis cache
         """
         self.analyze_btn.config(state=tk.NORMAL, bg='#3A3A3A', text=tr.get("analyze"))
+        self.stats_text.config(text=self.format_search_stats(stats, cached))
         if best_move and len(best_move) >= 4:
             coords = self.board.convert_uci_to_move(best_move)
             if coords:
@@ -906,22 +1563,27 @@ class MainGUI:
         self.second_move_text.config(text="---")
         self.second_score_text.config(text="")
         self.score_value.config(text="0.00")
+        self.stats_text.config(text="")
 
     def flip_board(self):
         """Flip the board orientation."""
         self.board.flip()
         self.canvas.delete("arrow")
         self.clear_analysis_lines()
+        self.on_position_changed()
 
     def reset_board(self):
         """Reset the board to starting position."""
+        self.clear_game_analysis()
         self.board.set_position(self.board.start_fen)
         self.board.reset_history()
+        self.engine_new_game = True
         self.update_move_list()
         self.canvas.delete("arrow")
         self.clear_analysis_lines()
         if self.setup_mode:
             self.close_setup_window()
+        self.on_position_changed()
 
     def change_lang(self, lang):
         """
@@ -937,6 +1599,13 @@ class MainGUI:
         self.flip_btn.config(text=tr.get("flip"))
         self.reset_btn.config(text=tr.get("reset"))
         self.undo_btn.config(text=tr.get("undo"))
+        self.redo_btn.config(text=tr.get("redo"))
+        self.live_btn.config(text=tr.get("live_stop") if self.live_mode else tr.get("live"))
+        self.ponder_btn.config(text=tr.get("ponder_stop") if self.ponder_mode else tr.get("ponder"))
+        running = self.game_analysis is not None and not self.game_analysis.cancelled.is_set() \
+            and not self.game_analysis.done()
+        self.game_btn.config(text=tr.get("analyze_game_stop") if running else tr.get("analyze_game"))
+        self.movetime_label.config(text=tr.get("sec_per_move"))
         self.analysis_title.config(text=tr.get("best_moves"))
         self.eval_title.config(text=tr.get("evaluation"))
         self.moves_title.config(text=tr.get("move_history"))
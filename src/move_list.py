@@ -0,0 +1,268 @@
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+# Kinds of move list rows
+MOVE_ROW = 0        # (MOVE_ROW, move number, first node, second node or -1)
+VARIATION_ROW = 1   # (VARIATION_ROW, first node of the variation)
+
+
+class MoveList:
+    """
+    Virtualized move list of the current line of a game tree.
+
+    The rows (two plies each, plus one indented row for every variation
+    that branches off the line) are kept as small tuples of node numbers.
+    The listbox only ever holds the rows in view, so formatting and Tk
+    calls per update are bounded by the height of the widget. Playing on
+    at the end of the line appends or patches the last row, in the model
+    and in the listbox, and moving along the line only moves the
+    selection; the rows are only rebuilt, and the listbox refilled, when
+    another line is shown or the view is scrolled.
+    """
+    # Plies of a variation shown on its row
+    VARIATION_PREVIEW = 4
+
+    def __init__(self, listbox, scrollbar, tree, on_select):
+        """
+        Attach to a listbox and its scrollbar.
+
+        Args:
+            listbox: tk.Listbox to show the rows in
+            scrollbar: tk.Scrollbar next to it
+            tree: GameTree whose current line is shown
+            on_select: Called with a node when a move is clicked
+        """
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.tree = tree
+        self.on_select = on_select
+        self.rows = []
+        self.row_of = {}
+        self.line = []
+        self.branch = -1
+        # Node -> annotation shown after its notation ('?!', '?', '??')
+        self.marks = {}
+        self.known_nodes = 0
+        self.top = 0
+        # Rows in the listbox: shown_count of them from row shown_top on
+        self.shown_top = 0
+        self.shown_count = 0
+        self.visible = int(listbox.cget("height"))
+        self.current_row = None
+        self.column_x = None
+        listbox.config(yscrollcommand="")
+        scrollbar.config(command=self.yview)
+        listbox.bind("<ButtonRelease-1>", self.on_click)
+        listbox.bind("<Configure>", self.on_configure)
+        listbox.bind("<MouseWheel>", self.on_wheel)
+        listbox.bind("<Button-4>", lambda e: self.scroll(-1))
+        listbox.bind("<Button-5>", lambda e: self.scroll(1))
+
+    def update(self):
+        """Bring the list in line with the tree's current node."""
+        tree = self.tree
+        current = tree.current
+        # Rows whose text changed, or None when every row may have
+        changed = ()
+        if len(tree) < self.known_nodes:
+            # The tree was reset
+            self.marks.clear()
+            self.rebuild()
+            changed = None
+        elif (current in self.row_of or current == 0) and tree.plies[current] > self.branch:
+            # On the shown line, which is the main continuation from here
+            pass
+        elif tree.parents[current] == (self.line[-1] if self.line else 0) \
+                and tree.first_child[tree.parents[current]] == current:
+            self.append(current)
+            changed = (self.row_of[current],)
+        else:
+            self.rebuild()
+            changed = None
+        self.known_nodes = len(tree)
+        self.current_row = self.row_of.get(current)
+        if self.current_row is not None:
+            if self.current_row < self.top:
+                self.top = self.current_row
+            elif self.current_row >= self.top + self.visible:
+                self.top = self.current_row - self.visible + 1
+        self.render(changed)
+
+    def rebuild(self):
+        """Recompute every row for the tree's current line."""
+        tree = self.tree
+        self.rows = []
+        self.row_of = {}
+        self.line = []
+        self.branch = -1
+        for node in tree.line():
+            self._add_line_node(node)
+            for variation in tree.children(tree.parents[node]):
+                if variation != node:
+                    self.rows.append((VARIATION_ROW, variation))
+
+    def append(self, node):
+        """Extend the line by a node played at its end."""
+        self._add_line_node(node)
+
+    def _add_line_node(self, node):
+        """Put a line node into a new row or into the free half of the last one."""
+        ply = len(self.line)
+        self.line.append(node)
+        if self.tree.first_child[self.tree.parents[node]] != node:
+            # Last ply at which the line leaves a main continuation
+            self.branch = ply
+        if ply % 2 and self.rows and self.rows[-1][0] == MOVE_ROW and self.rows[-1][3] < 0:
+            row = len(self.rows) - 1
+            self.rows[row] = self.rows[row][:3] + (node,)
+        else:
+            row = len(self.rows)
+            self.rows.append((MOVE_ROW, ply // 2 + 1, node, -1))
+        self.row_of[node] = row
+
+    def set_mark(self, node, mark):
+        """
+        Annotate a move; its row is redrawn if it is in view.
+
+        Args:
+            node: Node of the move
+            mark: Annotation string, or None to remove it
+        """
+        if mark:
+            self.marks[node] = mark
+        elif self.marks.pop(node, None) is None:
+            return
+        row = self.row_of.get(node)
+        if row is not None and self.top <= row < self.top + self.visible:
+            self.render((row,))
+
+    def clear_marks(self):
+        """Remove every annotation."""
+        if self.marks:
+            self.marks.clear()
+            self.render()
+
+    def format_row(self, row):
+        """
+        Display text of a row.
+
+        Args:
+            row: Row tuple
+
+        Returns:
+            String
+        """
+        notations = self.tree.notations
+        if row[0] == MOVE_ROW:
+            _, move_num, first, second = row
+            marks = self.marks
+            first_text = notations[first] + marks.get(first, "")
+            if second >= 0:
+                return f"{move_num:2d}. {first_text:<6} {notations[second] + marks.get(second, ''):<6}"
+            return f"{move_num:2d}. {first_text:<6}"
+        tree = self.tree
+        node = row[1]
+        ply = tree.plies[node]
+        number = f"{(ply + 1)//2}." if ply % 2 else f"{ply//2}..."
+        moves = []
+        while node >= 0 and len(moves) < self.VARIATION_PREVIEW:
+            moves.append(notations[node])
+            node = tree.first_child[node]
+        more = " ..." if node >= 0 else ""
+        return f"    ↳ {number} {' '.join(moves)}{more}"
+
+    def render(self, changed=None):
+        """
+        Bring the listbox to the rows in view and set the selection and the
+        scrollbar.
+
+        Args:
+            changed: Rows whose text changed since the last render. The
+                listbox is then patched: rows that left the view are
+                deleted, changed rows replaced and new rows appended. If
+                None, it is refilled.
+        """
+        count = len(self.rows)
+        self.top = max(0, min(self.top, count - self.visible))
+        top = self.top
+        end = min(count, top + self.visible)
+        listbox = self.listbox
+        if changed is None or top < self.shown_top or top >= self.shown_top + self.shown_count:
+            listbox.delete(0, tk.END)
+            if end > top:
+                listbox.insert(tk.END, *[self.format_row(row) for row in self.rows[top:end]])
+        else:
+            if top > self.shown_top:
+                # Scrolled down by a few rows to follow the end of the line
+                listbox.delete(0, top - self.shown_top - 1)
+                self.shown_count -= top - self.shown_top
+            if self.shown_count > end - top:
+                listbox.delete(end - top, tk.END)
+                self.shown_count = end - top
+            for row in changed:
+                index = row - top
+                if 0 <= index < self.shown_count:
+                    listbox.delete(index)
+                    listbox.insert(index, self.format_row(self.rows[row]))
+            if end > top + self.shown_count:
+                listbox.insert(tk.END, *[self.format_row(row) for row in self.rows[top + self.shown_count:end]])
+        self.shown_top = top
+        self.shown_count = end - top
+        listbox.selection_clear(0, tk.END)
+        if self.current_row is not None and top <= self.current_row < end:
+            listbox.selection_set(self.current_row - top)
+        if count:
+            self.scrollbar.set(self.top / count, min(1.0, (self.top + self.visible) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows):
+        """
+        Scroll the view.
+
+        Args:
+            rows: Rows to move down (negative: up)
+        """
+        self.top += rows
+        self.render()
+        return "break"
+
+    def yview(self, *args):
+        """Scrollbar command ('moveto FRACTION' or 'scroll N units|pages')."""
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.render()
+
+    def on_wheel(self, event):
+        """Scroll with the mouse wheel (Windows and macOS)."""
+        return self.scroll(-1 if event.delta > 0 else 1)
+
+    def on_configure(self, event):
+        """Recount the rows that fit when the listbox changes size."""
+        linespace = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+        visible = max(1, event.height // linespace)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def on_click(self, event):
+        """Jump to the clicked move, or to the first move of a clicked variation."""
+        index = self.listbox.nearest(event.y)
+        row_index = self.top + index
+        if index < 0 or row_index >= len(self.rows):
+            return
+        row = self.rows[row_index]
+        if row[0] == VARIATION_ROW:
+            self.on_select(row[1])
+            return
+        if self.column_x is None:
+            # Left edge of the second move column ("NN. " plus one move)
+            self.column_x = tkfont.Font(font=self.listbox.cget("font")).measure("00. " + " " * 7)
+        if row[3] >= 0 and event.x >= self.column_x:
+            self.on_select(row[3])
+        else:
+            self.on_select(row[2])
@@ -0,0 +1,122 @@
+# Piece images for the board canvas, rasterized once per (piece, size,
+# theme) and reused by every canvas image item. Pillow is optional:
+# without it, or without a font that has the piece glyphs, get() returns
+# None and the board draws pieces as vector items instead.
+
+import os
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageTk
+except ImportError:
+    Image = None
+
+# Image sizes are rounded to a multiple of this many pixels, so resizing
+# the window only rasterizes a new set of images every few pixels
+SIZE_BUCKET = 4
+
+# Pieces are drawn this many times larger and scaled down (antialiasing)
+SUPERSAMPLE = 4
+
+# Fonts with the Chinese piece glyphs, tried in order
+FONT_FILES = (
+    "simsun.ttc", "simsun.ttf", "msyh.ttc", "msyhbd.ttc", "simhei.ttf",
+    "NotoSansCJK-Bold.ttc", "NotoSansCJK-Regular.ttc", "NotoSerifCJK-Bold.ttc",
+    "wqy-zenhei.ttc", "wqy-microhei.ttc", "PingFang.ttc", "STHeiti Medium.ttc",
+)
+FONT_DIRS = (
+    os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+    "/usr/share/fonts/opentype/noto", "/usr/share/fonts/truetype/wqy",
+    "/usr/share/fonts/noto-cjk", "/System/Library/Fonts", "/Library/Fonts",
+)
+
+
+def size_bucket(size):
+    """Round an image size in pixels to its bucket."""
+    return max(SIZE_BUCKET, int(round(size / SIZE_BUCKET)) * SIZE_BUCKET)
+
+
+def find_font():
+    """
+    Locate a font file with the piece glyphs.
+
+    Returns:
+        Font path or name Pillow can open, or None
+    """
+    for name in FONT_FILES:
+        for folder in FONT_DIRS:
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                return path
+        try:
+            # Pillow also searches the system font folders by name
+            ImageFont.truetype(name, 10)
+            return name
+        except OSError:
+            continue
+    return None
+
+
+class PieceImageCache:
+    """
+    PhotoImages of the pieces keyed by (piece, size bucket, theme).
+
+    Images are only made when first asked for, so a resize costs one
+    rasterization per piece kind actually on the board, and going back to
+    an earlier size costs nothing.
+    """
+    def __init__(self, symbols, colors, theme="classic"):
+        """
+        Create an empty cache.
+
+        Args:
+            symbols: Piece character -> glyph
+            colors: Board colour dictionary ('red', 'black', 'lines')
+            theme: Name of the colour set, part of the cache key
+        """
+        self.symbols = symbols
+        self.colors = colors
+        self.theme = theme
+        self.images = {}
+        self.font_path = None
+        self.enabled = Image is not None
+
+    def get(self, piece, size):
+        """
+        Image of a piece.
+
+        Args:
+            piece: Piece character ('K', 'r', ...)
+            size: Wanted diameter in pixels
+
+        Returns:
+            PhotoImage, or None if pieces must be drawn as vector items
+        """
+        if not self.enabled:
+            return None
+        key = (piece, size_bucket(size), self.theme)
+        image = self.images.get(key)
+        if image is None:
+            image = self._render(piece, key[1])
+            if image is None:
+                self.enabled = False
+                return None
+            self.images[key] = image
+        return image
+
+    def _render(self, piece, size):
+        """Rasterize one piece, or None if no suitable font exists."""
+        if self.font_path is None:
+            self.font_path = find_font()
+            if self.font_path is None:
+                return None
+        big = size * SUPERSAMPLE
+        image = Image.new("RGBA", (big, big), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        border = 2 * SUPERSAMPLE
+        draw.ellipse((border // 2, border // 2, big - border // 2 - 1, big - border // 2 - 1),
+                     fill="#FDF5E6", outline=self.colors['lines'], width=border)
+        font = ImageFont.truetype(self.font_path, int(big * 0.6))
+        color = self.colors['red'] if piece.isupper() else self.colors['black']
+        draw.text((big / 2, big / 2), self.symbols.get(piece, piece), font=font, fill=color, anchor="mm")
+        image = image.resize((size, size), Image.LANCZOS)
+        return ImageTk.PhotoImage(image)
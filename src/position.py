@@ -0,0 +1,1019 @@
+# Xiangqi rules without any user interface. The module imports nothing,
+# so it loads quickly in engine workers and command line tools, and
+# Position objects pickle for process pools.
+
+# Piece codes: the low three bits are the piece kind, bit 3 is the colour
+EMPTY = 0
+KING, ADVISOR, ELEPHANT, HORSE, ROOK, CANNON, PAWN = range(1, 8)
+RED = 0
+BLACK = 8
+
+# Character for every code (index = code); '.' marks unused codes
+PIECE_CHARS = ".KABNRCP.kabnrcp"
+PIECE_CODES = {char: code for code, char in enumerate(PIECE_CHARS) if char != "."}
+
+WIDTH = 9
+HEIGHT = 10
+SQUARES = WIDTH * HEIGHT
+
+ORTHOGONAL = ((0, 1), (0, -1), (1, 0), (-1, 0))
+DIAGONAL = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+# Horse jump and the square next to the horse that blocks it
+HORSE_JUMPS = (
+    (1, 2, 0, 1), (1, -2, 0, -1), (-1, 2, 0, 1), (-1, -2, 0, -1),
+    (2, 1, 1, 0), (2, -1, 1, 0), (-2, 1, -1, 0), (-2, -1, -1, 0),
+)
+
+# Zobrist keys. They are persisted (caches, saved histories), so the key
+# set must never change: splitmix64 seeded with ZOBRIST_SEED yields, in
+# order, the keys of codes 1-7 and 9-15, each for squares 0-89, and last
+# the key XORed in when black is to move. ZOBRIST[code][sq] is 0 for the
+# unused codes 0 and 8.
+ZOBRIST_SEED = 0x5851F42D4C957F2D
+MASK64 = (1 << 64) - 1
+
+
+def splitmix64(state):
+    """
+    One step of the splitmix64 generator.
+
+    Args:
+        state: Current 64-bit state
+
+    Returns:
+        Tuple (new state, output)
+    """
+    state = (state + 0x9E3779B97F4A7C15) & MASK64
+    z = state
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return state, z ^ (z >> 31)
+
+
+def _zobrist_keys():
+    """Generate the piece-square table and the side key."""
+    state = ZOBRIST_SEED
+    table = []
+    for code in range(16):
+        keys = [0] * SQUARES
+        if code & 7:
+            for sq in range(SQUARES):
+                state, keys[sq] = splitmix64(state)
+        table.append(keys)
+    state, side = splitmix64(state)
+    return table, side
+
+
+ZOBRIST, ZOBRIST_BLACK = _zobrist_keys()
+
+# Game states reported by Position.game_status
+ONGOING = "ongoing"
+CHECKMATE = "checkmate"
+STALEMATE = "stalemate"
+INSUFFICIENT = "insufficient"
+# Entries kept in a position's status cache before it is emptied
+STATUS_CACHE_SIZE = 4096
+
+
+def square(x, y):
+    """
+    Square index of board coordinates.
+
+    Args:
+        x: File 0-8, left to right from red's side
+        y: Row 0-9, top (black's back rank) to bottom
+
+    Returns:
+        Index 0-89
+    """
+    return y * WIDTH + x
+
+
+def uci_move(frm, to):
+    """
+    UCI string of a move (files a-i, ranks 1-10 from red's side).
+
+    Args:
+        frm: From square
+        to: To square
+
+    Returns:
+        Move string such as 'h3e3'
+    """
+    fy, fx = divmod(frm, WIDTH)
+    ty, tx = divmod(to, WIDTH)
+    return f"{'abcdefghi'[fx]}{HEIGHT - fy}{'abcdefghi'[tx]}{HEIGHT - ty}"
+
+
+def parse_uci_move(move):
+    """
+    Squares of a UCI move string.
+
+    Args:
+        move: Move string such as 'h3e3' or 'a10a9'
+
+    Returns:
+        Tuple (from_square, to_square), or None if the string is not a move
+    """
+    if not move or len(move) < 4:
+        return None
+    i = 1
+    while i < len(move) and move[i].isdigit():
+        i += 1
+    from_file, from_rank, to_file, to_rank = move[0], move[1:i], move[i:i + 1], move[i + 1:]
+    if not (from_rank.isdigit() and to_rank.isdigit()) or from_file not in "abcdefghi" \
+            or not to_file or to_file not in "abcdefghi":
+        return None
+    fx, fy = ord(from_file) - ord('a'), HEIGHT - int(from_rank)
+    tx, ty = ord(to_file) - ord('a'), HEIGHT - int(to_rank)
+    if 0 <= fy < HEIGHT and 0 <= ty < HEIGHT:
+        return fy * WIDTH + fx, ty * WIDTH + tx
+    return None
+
+
+def colour_of(side):
+    """Colour bit (RED or BLACK) of a side to move 'w' or 'b'."""
+    return RED if side == 'w' else BLACK
+
+
+def in_palace(x, y, colour):
+    """True if (x, y) lies in the palace of the given colour."""
+    if not 3 <= x <= 5:
+        return False
+    if colour == RED:
+        return 7 <= y <= 9
+    return 0 <= y <= 2
+
+
+def _on_board(x, y):
+    """True if (x, y) is on the board."""
+    return 0 <= x < WIDTH and 0 <= y < HEIGHT
+
+
+def _build_tables():
+    """
+    Build the move tables, once at import.
+
+    Returns:
+        Tuple (rays, horse, elephant, advisor, king, pawn). rays[sq] holds
+        the squares along each direction of ORTHOGONAL (the first two are
+        the file). horse[sq] holds (target, leg) pairs. elephant[side][sq]
+        holds (target, eye) pairs on that side's half; advisor, king and
+        pawn are [side][sq] target tuples (palace and river rules applied).
+    """
+    rays = []
+    horse = []
+    elephant = ([], [])
+    advisor = ([], [])
+    king = ([], [])
+    pawn = ([], [])
+    for sq in range(SQUARES):
+        y, x = divmod(sq, WIDTH)
+        sq_rays = []
+        for dx, dy in ORTHOGONAL:
+            ray = []
+            nx, ny = x + dx, y + dy
+            while _on_board(nx, ny):
+                ray.append(square(nx, ny))
+                nx += dx
+                ny += dy
+            sq_rays.append(tuple(ray))
+        rays.append(tuple(sq_rays))
+        horse.append(tuple(
+            (square(x + dx, y + dy), square(x + lx, y + ly))
+            for dx, dy, lx, ly in HORSE_JUMPS if _on_board(x + dx, y + dy)
+        ))
+        for side, colour in enumerate((RED, BLACK)):
+            # Elephants never cross the river
+            elephant[side].append(tuple(
+                (square(x + 2 * dx, y + 2 * dy), square(x + dx, y + dy))
+                for dx, dy in DIAGONAL
+                if _on_board(x + 2 * dx, y + 2 * dy)
+                and ((y + 2 * dy >= 5) if colour == RED else (y + 2 * dy <= 4))
+            ))
+            advisor[side].append(tuple(
+                square(x + dx, y + dy) for dx, dy in DIAGONAL if in_palace(x + dx, y + dy, colour)
+            ))
+            king[side].append(tuple(
+                square(x + dx, y + dy) for dx, dy in ORTHOGONAL if in_palace(x + dx, y + dy, colour)
+            ))
+            if colour == RED:
+                steps = [(0, -1)] + ([(-1, 0), (1, 0)] if y <= 4 else [])
+            else:
+                steps = [(0, 1)] + ([(-1, 0), (1, 0)] if y >= 5 else [])
+            pawn[side].append(tuple(
+                square(x + dx, y + dy) for dx, dy in steps if _on_board(x + dx, y + dy)
+            ))
+    return tuple(rays), tuple(horse), elephant, advisor, king, pawn
+
+
+def _invert(table):
+    """
+    Turn a move table into an attacker table: for every target square the
+    origins (with their blocking square, if the entries carry one).
+    """
+    inverse = [[] for _ in range(SQUARES)]
+    for origin, entries in enumerate(table):
+        for entry in entries:
+            if isinstance(entry, tuple):
+                inverse[entry[0]].append((origin, entry[1]))
+            else:
+                inverse[entry].append(origin)
+    return tuple(tuple(entries) for entries in inverse)
+
+
+RAYS, HORSE_MOVES, ELEPHANT_MOVES, ADVISOR_MOVES, KING_MOVES, PAWN_MOVES = _build_tables()
+HORSE_ATTACKERS = _invert(HORSE_MOVES)
+ELEPHANT_ATTACKERS = tuple(_invert(table) for table in ELEPHANT_MOVES)
+ADVISOR_ATTACKERS = tuple(_invert(table) for table in ADVISOR_MOVES)
+KING_ATTACKERS = tuple(_invert(table) for table in KING_MOVES)
+PAWN_ATTACKERS = tuple(_invert(table) for table in PAWN_MOVES)
+
+
+class Position:
+    """
+    Xiangqi position on a 90-square mailbox.
+
+    squares is a bytearray indexed by y * 9 + x holding piece codes.
+    Alongside it the position keeps the set of occupied squares of each
+    side (index 0 red, 1 black) and both king squares (-1 if missing), so
+    rules code never scans the whole board to find pieces. key is the
+    64-bit Zobrist key of placement and side to move, kept up to date by
+    every change.
+    """
+    def __init__(self, fen=None):
+        """
+        Create a position.
+
+        Args:
+            fen: FEN to load; an empty board with red to move if None
+        """
+        self.squares = bytearray(SQUARES)
+        self.piece_squares = (set(), set())
+        self.kings = [-1, -1]
+        self.key = 0
+        self._turn = 'w'
+        self.status_cache = {}
+        if fen:
+            self.set_fen(fen)
+
+    @property
+    def turn(self):
+        """Side to move, 'w' or 'b'."""
+        return self._turn
+
+    @turn.setter
+    def turn(self, side):
+        if (side == 'b') != (self._turn == 'b'):
+            self.key ^= ZOBRIST_BLACK
+        self._turn = side
+
+    def compute_key(self):
+        """
+        Zobrist key computed from scratch (key holds the same value).
+
+        Returns:
+            64-bit key
+        """
+        key = ZOBRIST_BLACK if self._turn == 'b' else 0
+        for sq, code in enumerate(self.squares):
+            if code:
+                key ^= ZOBRIST[code][sq]
+        return key
+
+    def copy(self):
+        """Independent copy of the position."""
+        other = Position()
+        other.copy_from(self)
+        return other
+
+    def copy_from(self, other):
+        """
+        Overwrite this position in place with another one.
+
+        Args:
+            other: Position to copy
+        """
+        self.squares[:] = other.squares
+        for side in (0, 1):
+            self.piece_squares[side].clear()
+            self.piece_squares[side].update(other.piece_squares[side])
+        self.kings[:] = other.kings
+        self.key = other.key
+        self._turn = other._turn
+
+    def snapshot(self):
+        """
+        Compact copy of the position for storage: the squares followed by
+        the side to move, 91 bytes. restore brings it back.
+
+        Returns:
+            bytes
+        """
+        return bytes(self.squares) + self._turn.encode()
+
+    def restore(self, snapshot):
+        """
+        Overwrite this position in place with a snapshot, rebuilding the
+        piece sets, king squares and key from the squares.
+
+        Args:
+            snapshot: Value returned by snapshot
+        """
+        self._turn = chr(snapshot[SQUARES])
+        self.clear()
+        for sq in range(SQUARES):
+            code = snapshot[sq]
+            if code:
+                self.put(sq, code)
+
+    def clear(self):
+        """Remove every piece."""
+        self.squares[:] = bytes(SQUARES)
+        self.piece_squares[0].clear()
+        self.piece_squares[1].clear()
+        self.kings[0] = self.kings[1] = -1
+        self.key = ZOBRIST_BLACK if self._turn == 'b' else 0
+
+    def set_fen(self, fen):
+        """
+        Load the placement and side to move of a FEN string.
+
+        Args:
+            fen: FEN string; fields after the side to move are ignored
+        """
+        self.clear()
+        parts = fen.split()
+        for y, row in enumerate(parts[0].split('/')[:HEIGHT]):
+            x = 0
+            for char in row:
+                if char.isdigit():
+                    x += int(char)
+                else:
+                    code = PIECE_CODES.get(char)
+                    if code and x < WIDTH:
+                        self.put(y * WIDTH + x, code)
+                    x += 1
+        self.turn = parts[1] if len(parts) > 1 else 'w'
+
+    def fen(self):
+        """
+        Build the FEN string of the position.
+
+        Returns:
+            FEN string
+        """
+        squares = self.squares
+        rows = []
+        for start in range(0, SQUARES, WIDTH):
+            row = ""
+            empty = 0
+            for code in squares[start:start + WIDTH]:
+                if code:
+                    if empty:
+                        row += str(empty)
+                        empty = 0
+                    row += PIECE_CHARS[code]
+                else:
+                    empty += 1
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        return f"{'/'.join(rows)} {self.turn} - - 0 1"
+
+    def put(self, sq, code):
+        """
+        Place a piece, replacing whatever stood on the square.
+
+        Args:
+            sq: Square index
+            code: Piece code
+        """
+        if self.squares[sq]:
+            self.remove(sq)
+        self.squares[sq] = code
+        self.piece_squares[code >> 3].add(sq)
+        self.key ^= ZOBRIST[code][sq]
+        if code & 7 == KING:
+            self.kings[code >> 3] = sq
+
+    def remove(self, sq):
+        """
+        Take the piece off a square.
+
+        Args:
+            sq: Square index
+
+        Returns:
+            Code of the removed piece (EMPTY if the square was empty)
+        """
+        code = self.squares[sq]
+        if code:
+            self.squares[sq] = EMPTY
+            self.piece_squares[code >> 3].discard(sq)
+            self.key ^= ZOBRIST[code][sq]
+            if code & 7 == KING and self.kings[code >> 3] == sq:
+                self.kings[code >> 3] = -1
+        return code
+
+    def make(self, frm, to):
+        """
+        Play a move and pass the turn. No legality check is done.
+
+        Args:
+            frm: From square
+            to: To square
+
+        Returns:
+            Code of the captured piece (EMPTY if none), needed by unmake
+        """
+        captured = self._move(frm, to)
+        keys = ZOBRIST[self.squares[to]]
+        self.key ^= keys[frm] ^ keys[to] ^ ZOBRIST[captured][to] ^ ZOBRIST_BLACK
+        self._turn = 'b' if self._turn == 'w' else 'w'
+        return captured
+
+    def unmake(self, frm, to, captured):
+        """
+        Take back a move played with make.
+
+        Args:
+            frm: From square of the move
+            to: To square of the move
+            captured: Value returned by make
+        """
+        keys = ZOBRIST[self.squares[to]]
+        self.key ^= keys[frm] ^ keys[to] ^ ZOBRIST[captured][to] ^ ZOBRIST_BLACK
+        self._turn = 'b' if self._turn == 'w' else 'w'
+        self._unmove(frm, to, captured)
+
+    def _move(self, frm, to):
+        """
+        Move a piece without any checks; returns the captured code.
+        Used for legality probes, so it leaves key and turn alone.
+        """
+        squares = self.squares
+        code = squares[frm]
+        captured = squares[to]
+        side = code >> 3
+        if captured:
+            self.piece_squares[side ^ 1].discard(to)
+            if captured & 7 == KING:
+                self.kings[side ^ 1] = -1
+        squares[to] = code
+        squares[frm] = EMPTY
+        own = self.piece_squares[side]
+        own.discard(frm)
+        own.add(to)
+        if code & 7 == KING:
+            self.kings[side] = to
+        return captured
+
+    def _unmove(self, frm, to, captured):
+        """Take back a _move."""
+        squares = self.squares
+        code = squares[to]
+        side = code >> 3
+        squares[frm] = code
+        squares[to] = captured
+        own = self.piece_squares[side]
+        own.discard(to)
+        own.add(frm)
+        if code & 7 == KING:
+            self.kings[side] = frm
+        if captured:
+            self.piece_squares[side ^ 1].add(to)
+            if captured & 7 == KING:
+                self.kings[side ^ 1] = to
+
+    def pseudo_moves(self, sq):
+        """
+        Target squares of a piece, ignoring whether its own king is left in check.
+
+        Args:
+            sq: Square index of the piece
+
+        Returns:
+            List of target square indices
+        """
+        squares = self.squares
+        code = squares[sq]
+        if not code:
+            return []
+        colour = code & 8
+        kind = code & 7
+        moves = []
+        if kind == ROOK:
+            for ray in RAYS[sq]:
+                for target in ray:
+                    other = squares[target]
+                    if other:
+                        if other & 8 != colour:
+                            moves.append(target)
+                        break
+                    moves.append(target)
+        elif kind == CANNON:
+            for ray in RAYS[sq]:
+                screened = False
+                for target in ray:
+                    other = squares[target]
+                    if screened:
+                        if other:
+                            if other & 8 != colour:
+                                moves.append(target)
+                            break
+                    elif other:
+                        screened = True
+                    else:
+                        moves.append(target)
+        elif kind == HORSE:
+            for target, leg in HORSE_MOVES[sq]:
+                if not squares[leg]:
+                    other = squares[target]
+                    if not other or other & 8 != colour:
+                        moves.append(target)
+        elif kind == ELEPHANT:
+            for target, eye in ELEPHANT_MOVES[colour >> 3][sq]:
+                if not squares[eye]:
+                    other = squares[target]
+                    if not other or other & 8 != colour:
+                        moves.append(target)
+        else:
+            if kind == PAWN:
+                targets = PAWN_MOVES[colour >> 3][sq]
+            elif kind == ADVISOR:
+                targets = ADVISOR_MOVES[colour >> 3][sq]
+            else:
+                targets = KING_MOVES[colour >> 3][sq]
+            for target in targets:
+                other = squares[target]
+                if not other or other & 8 != colour:
+                    moves.append(target)
+        return moves
+
+    def is_square_attacked(self, sq, side):
+        """
+        Check whether a side could capture on a square.
+
+        Works outward from the target instead of generating the attackers'
+        moves: rook and cannon rays (counting the screen), then the
+        precomputed origins from which a horse, pawn, advisor, elephant or
+        king reaches the square. A king on the same file with nothing in
+        between attacks the other king (flying general). An empty square
+        counts as attacked if a piece placed there could be captured; a
+        square holding a piece of the attacking side is never attacked.
+
+        Args:
+            sq: Square index
+            side: Attacking side, 'w' or 'b'
+
+        Returns:
+            True if the square is attacked
+        """
+        squares = self.squares
+        colour = colour_of(side)
+        target = squares[sq]
+        if target and target & 8 == colour:
+            return False
+        rook = ROOK | colour
+        cannon = CANNON | colour
+        facing = KING | colour if target == KING | (colour ^ 8) else -1
+        for index, ray in enumerate(RAYS[sq]):
+            screened = False
+            for origin in ray:
+                other = squares[origin]
+                if other:
+                    if screened:
+                        if other == cannon:
+                            return True
+                        break
+                    # Rays 0 and 1 run along the file: flying general
+                    if other == rook or (other == facing and index < 2):
+                        return True
+                    screened = True
+
+        horse = HORSE | colour
+        for origin, leg in HORSE_ATTACKERS[sq]:
+            if squares[origin] == horse and not squares[leg]:
+                return True
+        side_index = colour >> 3
+        pawn = PAWN | colour
+        for origin in PAWN_ATTACKERS[side_index][sq]:
+            if squares[origin] == pawn:
+                return True
+        king = KING | colour
+        for origin in KING_ATTACKERS[side_index][sq]:
+            if squares[origin] == king:
+                return True
+        advisor = ADVISOR | colour
+        for origin in ADVISOR_ATTACKERS[side_index][sq]:
+            if squares[origin] == advisor:
+                return True
+        elephant = ELEPHANT | colour
+        for origin, eye in ELEPHANT_ATTACKERS[side_index][sq]:
+            if squares[origin] == elephant and not squares[eye]:
+                return True
+        return False
+
+    def kings_facing(self):
+        """True if both kings stand on one file with nothing between them."""
+        red, black = self.kings
+        if red < 0 or black < 0 or red % WIDTH != black % WIDTH:
+            return False
+        squares = self.squares
+        for between in range(black + WIDTH, red, WIDTH):
+            if squares[between]:
+                return False
+        return True
+
+    def would_expose_king(self, frm, to):
+        """
+        Check whether a move leaves the mover's king attacked or the kings facing.
+
+        Args:
+            frm: From square
+            to: To square
+
+        Returns:
+            True if the move is illegal for that reason
+        """
+        side = self.squares[frm] >> 3
+        captured = self._move(frm, to)
+        king = self.kings[side]
+        # The attack test includes the flying general
+        illegal = king >= 0 and self.is_square_attacked(king, 'w' if side else 'b')
+        self._unmove(frm, to, captured)
+        return illegal
+
+    def would_be_attacked(self, frm, to):
+        """
+        Check whether a piece moved from frm to to would stand attacked
+        there, i.e. whether the other side could take it back.
+
+        Args:
+            frm: From square
+            to: To square
+
+        Returns:
+            True if the moved piece would be attacked on to
+        """
+        side = self.squares[frm] >> 3
+        captured = self._move(frm, to)
+        attacked = self.is_square_attacked(to, 'w' if side else 'b')
+        self._unmove(frm, to, captured)
+        return attacked
+
+    def attackers(self, sq, side):
+        """
+        Squares of all pieces of a side that could capture on a square.
+        Same rules as is_square_attacked, but every attacker is listed.
+
+        Args:
+            sq: Square index
+            side: Attacking side, 'w' or 'b'
+
+        Returns:
+            List of square indices
+        """
+        squares = self.squares
+        colour = colour_of(side)
+        target = squares[sq]
+        if target and target & 8 == colour:
+            return []
+        found = []
+        rook = ROOK | colour
+        cannon = CANNON | colour
+        facing = KING | colour if target == KING | (colour ^ 8) else -1
+        for index, ray in enumerate(RAYS[sq]):
+            screened = False
+            for origin in ray:
+                other = squares[origin]
+                if other:
+                    if screened:
+                        if other == cannon:
+                            found.append(origin)
+                        break
+                    if other == rook or (other == facing and index < 2):
+                        found.append(origin)
+                    screened = True
+        horse = HORSE | colour
+        for origin, leg in HORSE_ATTACKERS[sq]:
+            if squares[origin] == horse and not squares[leg]:
+                found.append(origin)
+        side_index = colour >> 3
+        for table, code in ((PAWN_ATTACKERS, PAWN), (KING_ATTACKERS, KING), (ADVISOR_ATTACKERS, ADVISOR)):
+            for origin in table[side_index][sq]:
+                if squares[origin] == code | colour:
+                    found.append(origin)
+        elephant = ELEPHANT | colour
+        for origin, eye in ELEPHANT_ATTACKERS[side_index][sq]:
+            if squares[origin] == elephant and not squares[eye]:
+                found.append(origin)
+        return found
+
+    def _probe_sets(self, colour, king):
+        """
+        Work out which moves of a side need the make/unmake legality probe.
+
+        Not in check, a move is safe without a probe unless its piece is
+        pinned or it lands where it would become a cannon screen. Pinned
+        means: first piece on a king ray with an enemy rook (or, on the
+        file, the enemy king) behind it; one of the two pieces between the
+        king and an enemy cannon; or the leg of an enemy horse aimed at
+        the king. In check, only moves that capture a checker, block its
+        line or horse leg, or move a cannon's screen can help.
+
+        Args:
+            colour: RED or BLACK, the side to move
+            king: Square of that side's king
+
+        Returns:
+            Tuple (checkers, pinned, targets): checker squares; from
+            squares whose moves must be probed (in check: from squares
+            whose moves are candidates); to squares whose moves must be
+            probed (in check: candidate to squares)
+        """
+        squares = self.squares
+        enemy = colour ^ 8
+        checkers = self.attackers(king, 'b' if colour == RED else 'w')
+        pinned = set()
+        targets = set()
+        if checkers:
+            for origin in checkers:
+                targets.add(origin)
+                kind = squares[origin] & 7
+                if kind == HORSE:
+                    for horse, leg in HORSE_ATTACKERS[king]:
+                        if horse == origin:
+                            targets.add(leg)
+                elif kind == ROOK or kind == CANNON or kind == KING:
+                    for ray in RAYS[king]:
+                        if origin in ray:
+                            for between in ray[:ray.index(origin)]:
+                                targets.add(between)
+                                # Moving our cannon screen away also helps
+                                if squares[between] and squares[between] & 8 == colour:
+                                    pinned.add(between)
+                            break
+            return checkers, pinned, targets
+
+        for index, ray in enumerate(RAYS[king]):
+            first = second = -1
+            for sq in ray:
+                other = squares[sq]
+                if not other:
+                    continue
+                if first < 0:
+                    first = sq
+                    if other == CANNON | enemy:
+                        # Anything arriving in between becomes a screen
+                        targets.update(ray[:ray.index(sq)])
+                        break
+                elif second < 0:
+                    second = sq
+                    if other == ROOK | enemy or (index < 2 and other == KING | enemy):
+                        if squares[first] & 8 == colour:
+                            pinned.add(first)
+                        break
+                else:
+                    if other == CANNON | enemy:
+                        for screen in (first, second):
+                            if squares[screen] & 8 == colour:
+                                pinned.add(screen)
+                    break
+        for origin, leg in HORSE_ATTACKERS[king]:
+            if squares[origin] == HORSE | enemy and squares[leg] and squares[leg] & 8 == colour:
+                pinned.add(leg)
+        return checkers, pinned, targets
+
+    def _generate(self, side, origins, first_only=False):
+        """
+        Legal moves of some pieces of a side.
+
+        Args:
+            side: 'w' or 'b'
+            origins: Squares of that side's pieces to generate for
+            first_only: Stop after the first piece that has a legal move
+
+        Returns:
+            List of (from_square, to_square) tuples
+        """
+        colour = colour_of(side)
+        king = self.kings[colour >> 3]
+        moves = []
+        if king < 0:
+            # No king to protect (setup positions): nothing to prune with
+            for sq in origins:
+                for to in self.pseudo_moves(sq):
+                    if not self.would_expose_king(sq, to):
+                        moves.append((sq, to))
+                if first_only and moves:
+                    break
+            return moves
+        checkers, pinned, targets = self._probe_sets(colour, king)
+        probe = self.would_expose_king
+        for sq in origins:
+            if sq == king:
+                for to in self.pseudo_moves(sq):
+                    if not probe(sq, to):
+                        moves.append((sq, to))
+            elif checkers:
+                candidate = sq in pinned
+                for to in self.pseudo_moves(sq):
+                    if (candidate or to in targets) and not probe(sq, to):
+                        moves.append((sq, to))
+            elif sq in pinned:
+                for to in self.pseudo_moves(sq):
+                    if not probe(sq, to):
+                        moves.append((sq, to))
+            else:
+                for to in self.pseudo_moves(sq):
+                    if to not in targets or not probe(sq, to):
+                        moves.append((sq, to))
+            if first_only and moves:
+                break
+        return moves
+
+    def legal_moves_from(self, sq):
+        """
+        Legal target squares of a piece.
+
+        Args:
+            sq: Square index of the piece
+
+        Returns:
+            List of target square indices
+        """
+        code = self.squares[sq]
+        if not code:
+            return []
+        return [to for _, to in self._generate('w' if code & 8 == RED else 'b', (sq,))]
+
+    def legal_moves(self, side=None):
+        """
+        All legal moves of a side. Checkers and pins are worked out once;
+        in check only evasions are tried, and moves that cannot expose
+        the king skip the make/unmake probe.
+
+        Args:
+            side: 'w' or 'b'; the side to move if None
+
+        Returns:
+            List of (from_square, to_square) tuples
+        """
+        side = side or self.turn
+        # Copy: probing moves reorders the square set
+        return self._generate(side, tuple(self.piece_squares[colour_of(side) >> 3]))
+
+    def is_legal(self, frm, to):
+        """
+        Check whether a move is legal for the side to move.
+
+        Args:
+            frm: From square
+            to: To square
+
+        Returns:
+            True if legal
+        """
+        code = self.squares[frm]
+        if not code or code & 8 != colour_of(self.turn):
+            return False
+        return to in self.pseudo_moves(frm) and not self.would_expose_king(frm, to)
+
+    def move_notation(self, frm, to):
+        """
+        Describe a move in international Xiangqi notation (e.g. 'C2=5', 'H8+7').
+        Files are counted from each player's right; the move is not played.
+
+        Args:
+            frm: From square
+            to: To square
+
+        Returns:
+            Notation string, '???' if the from square is empty
+        """
+        code = self.squares[frm]
+        if not code:
+            return "???"
+        letter = PIECE_CHARS[code & 7]
+        fy, fx = divmod(frm, WIDTH)
+        ty, tx = divmod(to, WIDTH)
+        if code & 8 == RED:
+            from_file, to_file = 9 - fx, 9 - tx
+            forward = fy - ty
+        else:
+            from_file, to_file = fx + 1, tx + 1
+            forward = ty - fy
+        if forward == 0:
+            return f"{letter}{from_file}={to_file}"
+        return f"{letter}{from_file}{'+' if forward > 0 else '-'}{abs(forward)}"
+
+    def is_in_check(self, side):
+        """
+        Check whether a side's king is attacked (including by the other
+        king on an open file).
+
+        Args:
+            side: 'w' for red, 'b' for black
+
+        Returns:
+            True if in check (False when the king is missing)
+        """
+        king = self.kings[colour_of(side) >> 3]
+        if king < 0:
+            return False
+        return self.is_square_attacked(king, 'b' if side == 'w' else 'w')
+
+    def is_in_checkmate(self, side):
+        """
+        Check whether a side is in check and has no legal move.
+
+        Args:
+            side: 'w' for red, 'b' for black
+
+        Returns:
+            True if checkmated
+        """
+        return self.is_in_check(side) and not self.has_legal_move(side)
+
+    def is_stalemate(self, side):
+        """
+        Check whether a side is not in check but has no legal move
+        (a loss in Xiangqi).
+
+        Args:
+            side: 'w' for red, 'b' for black
+
+        Returns:
+            True if stalemated
+        """
+        return not self.is_in_check(side) and not self.has_legal_move(side)
+
+    def has_legal_move(self, side=None):
+        """
+        Check whether a side has at least one legal move, stopping at the
+        first piece that has one. The king, whose moves all need a probe,
+        is tried last.
+
+        Args:
+            side: 'w' or 'b'; the side to move if None
+
+        Returns:
+            True if a legal move exists
+        """
+        side = side or self.turn
+        index = colour_of(side) >> 3
+        king = self.kings[index]
+        origins = [sq for sq in self.piece_squares[index] if sq != king]
+        if king >= 0:
+            origins.append(king)
+        return bool(self._generate(side, origins, first_only=True))
+
+    def has_mating_material(self):
+        """
+        Check whether either side still has a piece that can cross the
+        river (rook, horse, cannon or pawn). Advisors, elephants and kings
+        alone can never give mate.
+
+        Returns:
+            True if a mate is still possible
+        """
+        squares = self.squares
+        for side in (0, 1):
+            for sq in self.piece_squares[side]:
+                if squares[sq] & 7 in (ROOK, HORSE, CANNON, PAWN):
+                    return True
+        return False
+
+    def game_status(self):
+        """
+        State of the game for the side to move, cached per position key.
+
+        Returns:
+            ONGOING, CHECKMATE, STALEMATE (no legal move out of check, a
+            loss) or INSUFFICIENT (no side can mate any more)
+        """
+        status = self.status_cache.get(self.key)
+        if status is None:
+            if self.has_legal_move():
+                status = ONGOING if self.has_mating_material() else INSUFFICIENT
+            elif self.is_in_check(self.turn):
+                status = CHECKMATE
+            else:
+                status = STALEMATE
+            self.remember_status(self.key, status)
+        return status
+
+    def remember_status(self, key, status):
+        """
+        Store a game status worked out elsewhere (e.g. on a copy).
+
+        Args:
+            key: Position key the status belongs to
+            status: ONGOING, CHECKMATE, STALEMATE or INSUFFICIENT
+        """
+        if len(self.status_cache) >= STATUS_CACHE_SIZE:
+            self.status_cache.clear()
+        self.status_cache[key] = status
+
@@ -0,0 +1,216 @@
+# Repetition table and perpetual check / chase adjudication (Asian rules,
+# simplified). Headless: it only imports position.py and the move packing
+# of game_tree.py.
+
+from array import array
+
+from game_tree import MOVE_SHIFT, SQUARE_MASK, NO_CHASE
+from position import KING, ADVISOR, ELEPHANT, HORSE, ROOK, CANNON, PAWN, BLACK, WIDTH
+
+# Verdicts of RepetitionTable.adjudicate
+REPETITION_DRAW = "repetition"
+PERPETUAL_CHECK = "perpetual_check"
+PERPETUAL_CHASE = "perpetual_chase"
+
+# Rough piece values for telling a chase of a protected piece (only a
+# chase when the victim is worth more than the chaser) from an exchange
+VALUES = {ADVISOR: 2, ELEPHANT: 2, HORSE: 4, CANNON: 5, ROOK: 9, PAWN: 1}
+
+def move_threats(position, frm, to):
+    """
+    Work out what a move threatens, right after it was made.
+
+    A chase is a legal capture by the moved piece of an enemy piece that
+    is unprotected, or worth more than the chaser. Kings and pawns may
+    chase freely, kings are never chased (that is a check) and pawns only
+    once they have crossed the river. Discovered attacks are not counted.
+
+    Args:
+        position: Position after make(frm, to)
+        frm: From square of the move
+        to: To square of the move
+
+    Returns:
+        (gives_check, frozenset of chased squares)
+    """
+    squares = position.squares
+    mover = squares[to]
+    side = 'b' if mover & BLACK else 'w'
+    enemy = 'w' if side == 'b' else 'b'
+    check = position.is_in_check(enemy)
+    kind = mover & 7
+    if kind == KING or kind == PAWN:
+        return check, NO_CHASE
+    chased = []
+    for target in position.pseudo_moves(to):
+        victim = squares[target]
+        if not victim or (victim & BLACK) == (mover & BLACK):
+            continue
+        victim_kind = victim & 7
+        if victim_kind == KING:
+            continue
+        if victim_kind == PAWN and (target // WIDTH < 5) == bool(victim & BLACK):
+            # Pawn still on its own side of the river
+            continue
+        if position.would_expose_king(to, target):
+            continue
+        if VALUES[victim_kind] <= VALUES[kind] and position.would_be_attacked(to, target):
+            # Protected and not worth more than the chaser
+            continue
+        chased.append(target)
+    return check, frozenset(chased) if chased else NO_CHASE
+
+
+class RepetitionTable:
+    """
+    Positions of a game indexed by Zobrist key.
+
+    Every ply pushes the key of the position reached and what the move
+    threatened (see move_threats), so a repetition query is one dictionary
+    lookup and adjudicating a repeating cycle only reads the cached attack
+    information of the plies inside it. Ply 0 is the root position.
+    Keys, moves and check flags sit in flat arrays; chases share one empty
+    frozenset on the (usual) plies without any.
+    """
+    def __init__(self, key=0, turn='w'):
+        """
+        Start a table.
+
+        Args:
+            key: Key of the root position
+            turn: Side to move in the root position, 'w' or 'b'
+        """
+        self.reset(key, turn)
+
+    def reset(self, key, turn='w'):
+        """
+        Forget the game and start again from a root position.
+
+        Args:
+            key: Key of the root position
+            turn: Side to move in the root position, 'w' or 'b'
+        """
+        self.root_turn = turn
+        self.keys = array('Q', [key])
+        self.moves = array('H', [0])
+        self.checks = bytearray(1)
+        self.chases = [NO_CHASE]
+        self.plies = {key: [0]}
+
+    def __len__(self):
+        """Number of positions, root included."""
+        return len(self.keys)
+
+    def push(self, key, move, check=False, chased=NO_CHASE):
+        """
+        Record the position after a move.
+
+        Args:
+            key: Key of the new position
+            move: (from_square, to_square) of the move
+            check: True if the move gave check
+            chased: Squares of pieces the move chases
+        """
+        self.plies.setdefault(key, []).append(len(self.keys))
+        self.keys.append(key)
+        self.moves.append(move[0] << MOVE_SHIFT | move[1])
+        self.checks.append(check)
+        self.chases.append(chased)
+
+    def pop(self):
+        """Forget the last position (undo). The root is never removed."""
+        if len(self.keys) <= 1:
+            return
+        key = self.keys.pop()
+        self.moves.pop()
+        self.checks.pop()
+        self.chases.pop()
+        plies = self.plies[key]
+        plies.pop()
+        if not plies:
+            del self.plies[key]
+
+    def count(self, key=None):
+        """
+        How often a position occurred.
+
+        Args:
+            key: Position key; the current position if None
+
+        Returns:
+            Number of occurrences
+        """
+        plies = self.plies.get(self.keys[-1] if key is None else key)
+        return len(plies) if plies else 0
+
+    def occurrences(self, key=None):
+        """
+        Plies at which a position occurred.
+
+        Args:
+            key: Position key; the current position if None
+
+        Returns:
+            List of ply indices in game order
+        """
+        return list(self.plies.get(self.keys[-1] if key is None else key, ()))
+
+    def mover(self, ply):
+        """Side ('w' or 'b') that played the move leading to a ply."""
+        if (ply % 2 == 1) == (self.root_turn == 'w'):
+            return 'w'
+        return 'b'
+
+    def _perpetual_check(self, plies):
+        """True if every move in plies gave check."""
+        return all(self.checks[ply] for ply in plies)
+
+    def _perpetual_chase(self, first, last, side):
+        """
+        True if side chased one and the same piece with every move it made
+        in plies first..last. The chased piece is followed when it moves.
+        """
+        targets = None
+        for ply in range(first, last + 1):
+            if self.mover(ply) == side:
+                chased = self.chases[ply]
+                targets = set(chased) if targets is None else targets & chased
+                if not targets:
+                    return False
+            elif targets:
+                frm, to = self.moves[ply] >> MOVE_SHIFT, self.moves[ply] & SQUARE_MASK
+                if frm in targets:
+                    targets.discard(frm)
+                    targets.add(to)
+        return bool(targets)
+
+    def adjudicate(self, repetitions=3):
+        """
+        Judge the current position once it has occurred often enough.
+
+        The cycle is the plies since the previous occurrence. A side that
+        checked with every move of the cycle loses (perpetual check); if
+        both did, or neither checked throughout, a side that chased the
+        same piece throughout loses (perpetual chase). Anything else is a
+        draw by repetition.
+
+        Args:
+            repetitions: Occurrences needed before a verdict is given
+
+        Returns:
+            (verdict, losing side or None), or None while the game goes on
+        """
+        plies = self.plies[self.keys[-1]]
+        if len(plies) < repetitions:
+            return None
+        first, last = plies[-2] + 1, plies[-1]
+        sides = ('w', 'b')
+        checking = [side for side in sides
+                    if self._perpetual_check([ply for ply in range(first, last + 1)
+                                              if self.mover(ply) == side])]
+        if len(checking) == 1:
+            return PERPETUAL_CHECK, checking[0]
+        chasing = [side for side in sides if self._perpetual_chase(first, last, side)]
+        if len(chasing) == 1:
+            return PERPETUAL_CHASE, chasing[0]
+        return REPETITION_DRAW, None
@@ -15,6 +15,21 @@ class Translator:
                 "flip": "FLIP BOARD",
                 "reset": "RESET",
                 "undo": "UNDO",
+                "redo": "REDO",
+                "live": "LIVE ANALYSIS",
+                "live_stop": "■ STOP LIVE",
+                "ponder": "PRE-ANALYZE",
+                "ponder_stop": "■ STOP PRE-ANALYZE",
+                "analyze_game": "ANALYZE GAME",
+                "analyze_game_stop": "■ STOP GAME",
+                "sec_per_move": "s/move",
+                "cached": "cached",
+                "checkmate": "✗ CHECKMATE",
+                "stalemate": "✗ STALEMATE (LOSS)",
+                "insufficient": "½ DRAW: NO MATING MATERIAL",
+                "repetition": "½ DRAW BY REPETITION",
+                "perpetual_check": "✗ PERPETUAL CHECK, LOSS:",
+                "perpetual_chase": "✗ PERPETUAL CHASE, LOSS:",
                 "thinking": "Analyzing...",
                 "error": "Engine error",
                 "ready": "✓ READY",
@@ -66,6 +81,21 @@ class Translator:
                 "flip": "ПОВЕРНУТЬ",
                 "reset": "СБРОС",
                 "undo": "ОТМЕНА",
+                "redo": "ВЕРНУТЬ",
+                "live": "ЖИВОЙ АНАЛИЗ",
+                "live_stop": "■ СТОП АНАЛИЗ",
+                "ponder": "ПРЕДАНАЛИЗ",
+                "ponder_stop": "■ СТОП ПРЕДАНАЛИЗ",
+                "analyze_game": "АНАЛИЗ ПАРТИИ",
+                "analyze_game_stop": "■ СТОП ПАРТИЯ",
+                "sec_per_move": "с/ход",
+                "cached": "из кэша",
+                "checkmate": "✗ МАТ",
+                "stalemate": "✗ ПАТ (ПОРАЖЕНИЕ)",
+                "insufficient": "½ НИЧЬЯ: НЕТ МАТЕРИАЛА",
+                "repetition": "½ НИЧЬЯ: ПОВТОРЕНИЕ",
+                "perpetual_check": "✗ ВЕЧНЫЙ ШАХ, ПОРАЖЕНИЕ:",
+                "perpetual_chase": "✗ ВЕЧНОЕ ПРЕСЛЕДОВАНИЕ, ПОРАЖЕНИЕ:",
                 "thinking": "Анализ...",
                 "error": "Ошибка движка",
                 "ready": "✓ ГОТОВО",
@@ -117,6 +147,21 @@ class Translator:
                 "flip": "翻转棋盘",
                 "reset": "重置",
                 "undo": "撤销",
+                "redo": "重做",
+                "live": "实时分析",
+                "live_stop": "■ 停止实时",
+                "ponder": "预分析",
+                "ponder_stop": "■ 停止预分析",
+                "analyze_game": "分析整局",
+                "analyze_game_stop": "■ 停止整局",
+                "sec_per_move": "秒/步",
+                "cached": "缓存",
+                "checkmate": "✗ 将死",
+                "stalemate": "✗ 困毙 (负)",
+                "insufficient": "½ 和棋：子力不足",
+                "repetition": "½ 重复局面，和棋",
+                "perpetual_check": "✗ 长将判负：",
+                "perpetual_chase": "✗ 长捉判负：",
                 "thinking": "分析中...",
                 "error": "引擎错误",
                 "ready": "✓ 准备就绪",
@@ -168,6 +213,21 @@ class Translator:
                 "flip": "XOAY BÀN",
                 "reset": "ĐẶT LẠI",
                 "undo": "HOÀN TÁC",
+                "redo": "LÀM LẠI",
+                "live": "PHÂN TÍCH TRỰC TIẾP",
+                "live_stop": "■ DỪNG TRỰC TIẾP",
+                "ponder": "PHÂN TÍCH TRƯỚC",
+                "ponder_stop": "■ DỪNG PHÂN TÍCH TRƯỚC",
+                "analyze_game": "PHÂN TÍCH VÁN",
+                "analyze_game_stop": "■ DỪNG VÁN",
+                "sec_per_move": "giây/nước",
+                "cached": "bộ nhớ đệm",
+                "checkmate": "✗ CHIẾU BÍ",
+                "stalemate": "✗ HẾT NƯỚC ĐI (THUA)",
+                "insufficient": "½ HÒA: KHÔNG ĐỦ QUÂN",
+                "repetition": "½ HÒA DO LẶP LẠI",
+                "perpetual_check": "✗ CHIẾU DAI, THUA:",
+                "perpetual_chase": "✗ ĐUỔI DAI, THUA:",
                 "thinking": "Đang phân tích...",
                 "error": "Lỗi động cơ",
                 "ready": "✓ SẴN SÀNG",
@@ -219,6 +279,21 @@ class Translator:
                 "flip": "PAPAN TERBALIK",
                 "reset": "SET SEMULA",
                 "undo": "BATALKAN",
+                "redo": "BUAT SEMULA",
+                "live": "ANALISIS LANGSUNG",
+                "live_stop": "■ HENTI LANGSUNG",
+                "ponder": "PRA-ANALISIS",
+                "ponder_stop": "■ HENTI PRA-ANALISIS",
+                "analyze_game": "ANALISIS PERMAINAN",
+                "analyze_game_stop": "■ HENTI PERMAINAN",
+                "sec_per_move": "s/langkah",
+                "cached": "cache",
+                "checkmate": "✗ SKAKMAT",
+                "stalemate": "✗ BUNTU (KALAH)",
+                "insufficient": "½ SERI: BAHAN TIDAK CUKUP",
+                "repetition": "½ SERI: KEDUDUKAN BERULANG",
+                "perpetual_check": "✗ SKAK BERTERUSAN, KALAH:",
+                "perpetual_chase": "✗ KEJAR BERTERUSAN, KALAH:",
                 "thinking": "Menganalisis...",
                 "error": "Ralat enjin",
                 "ready": "✓ SIAP",
@@ -0,0 +1,195 @@
+import re
+
+
+# Positions of the raw field strings inside InfoLine.raw
+_DEPTH, _SELDEPTH, _MULTIPV, _SCORE_KIND, _SCORE_VALUE, _BOUND, \
+    _NODES, _NPS, _HASHFULL, _TBHITS, _TIME = range(11)
+
+# Keys followed by exactly one integer value, with their raw position
+_INT_FIELDS = {
+    "depth": _DEPTH,
+    "seldepth": _SELDEPTH,
+    "multipv": _MULTIPV,
+    "nodes": _NODES,
+    "nps": _NPS,
+    "hashfull": _HASHFULL,
+    "tbhits": _TBHITS,
+    "time": _TIME,
+}
+
+# Keys whose values are skipped, with the number of tokens they take
+_SKIP_FIELDS = {
+    "currmove": 1,
+    "currmovenumber": 1,
+    "cpuload": 1,
+    "wdl": 3,
+}
+
+# Keys that consume the rest of the line
+_REST_FIELDS = ("string", "refutation", "currline")
+
+# Stockfish-family engines print their search lines with the fields in
+# this fixed order, so one compiled match decodes the whole line head
+_SEARCH_LINE = re.compile(
+    r"info depth (\d+)(?: seldepth (\d+))?(?: multipv (\d+))?"
+    r" score (cp|mate) (-?\d+)(?: (lowerbound|upperbound))?"
+    r"(?: nodes (\d+))?(?: nps (\d+))?(?: hashfull (\d+))?"
+    r"(?: tbhits (\d+))?(?: time (\d+))? pv "
+)
+
+
+def _int_field(index, default=None):
+    """Build a read-only property that decodes one raw integer field."""
+    def get(self):
+        value = self.raw[index]
+        return default if value is None else int(value)
+    return property(get)
+
+
+class InfoLine:
+    """
+    One parsed UCI 'info' line.
+
+    The line is split into its raw field strings once; the integer fields
+    are only converted when they are read, so the engine reader thread pays
+    for nothing but the match. Fields the engine did not send read as None
+    (multipv as 1). pv is the full principal variation as a list of UCI
+    move strings.
+    """
+    __slots__ = ("raw", "pv_text")
+
+    depth = _int_field(_DEPTH)
+    seldepth = _int_field(_SELDEPTH)
+    multipv = _int_field(_MULTIPV, 1)
+    nodes = _int_field(_NODES)
+    nps = _int_field(_NPS)
+    hashfull = _int_field(_HASHFULL)
+    tbhits = _int_field(_TBHITS)
+    time = _int_field(_TIME)
+
+    def __init__(self, raw, pv_text):
+        """
+        Create a record.
+
+        Args:
+            raw: Tuple of the 11 raw field strings (None when absent)
+            pv_text: Space separated PV moves, or None
+        """
+        self.raw = raw
+        self.pv_text = pv_text
+
+    @property
+    def score_cp(self):
+        """Score in centipawns, or None if the line has no cp score."""
+        if self.raw[_SCORE_KIND] == "cp":
+            return int(self.raw[_SCORE_VALUE])
+        return None
+
+    @property
+    def score_mate(self):
+        """Mate distance in moves, or None if the line has no mate score."""
+        if self.raw[_SCORE_KIND] == "mate":
+            return int(self.raw[_SCORE_VALUE])
+        return None
+
+    @property
+    def bound(self):
+        """'lowerbound', 'upperbound' or None for an exact score."""
+        return self.raw[_BOUND]
+
+    @property
+    def pv(self):
+        """Principal variation as a list of moves, or None."""
+        return self.pv_text.split() if self.pv_text else None
+
+    @property
+    def move(self):
+        """First move of the principal variation, or None."""
+        if not self.pv_text:
+            return None
+        return self.pv_text.split(" ", 1)[0]
+
+    def score_text(self):
+        """
+        Format the score the way the analysis panel shows it.
+
+        Returns:
+            Pawn units with two decimals (e.g. '0.35'), 'mate N', or '0.00'
+        """
+        kind = self.raw[_SCORE_KIND]
+        if kind == "cp":
+            return f"{int(self.raw[_SCORE_VALUE])/100:.2f}"
+        if kind == "mate":
+            return f"mate {self.raw[_SCORE_VALUE]}"
+        return "0.00"
+
+    def __repr__(self):
+        return (f"InfoLine(depth={self.depth}, multipv={self.multipv}, cp={self.score_cp}, "
+                f"mate={self.score_mate}, nodes={self.nodes}, pv={self.pv})")
+
+
+def parse_info(line):
+    """
+    Parse a UCI info line in a single pass.
+    Regular search lines are decoded by one compiled pattern; anything
+    else falls back to a single walk over the line's tokens.
+
+    Args:
+        line: Engine output line
+
+    Returns:
+        InfoLine, or None if the line is not an info line or is malformed
+    """
+    m = _SEARCH_LINE.match(line)
+    if m is not None:
+        return InfoLine(m.groups(), line[m.end():].strip())
+    return _parse_tokens(line)
+
+
+def _parse_tokens(line):
+    """
+    Parse an info line of any field order by walking its tokens once.
+
+    Args:
+        line: Engine output line
+
+    Returns:
+        InfoLine, or None if the line is not an info line or is malformed
+    """
+    tokens = line.split()
+    if not tokens or tokens[0] != "info":
+        return None
+    raw = [None] * 11
+    pv_text = None
+    n = len(tokens)
+    i = 1
+    try:
+        while i < n:
+            key = tokens[i]
+            index = _INT_FIELDS.get(key)
+            if index is not None:
+                int(tokens[i + 1])
+                raw[index] = tokens[i + 1]
+                i += 2
+            elif key == "pv":
+                pv_text = " ".join(tokens[i + 1:]) or None
+                break
+            elif key == "score":
+                kind = tokens[i + 1]
+                int(tokens[i + 2])
+                if kind == "cp" or kind == "mate":
+                    raw[_SCORE_KIND] = kind
+                    raw[_SCORE_VALUE] = tokens[i + 2]
+                i += 3
+                if i < n and (tokens[i] == "lowerbound" or tokens[i] == "upperbound"):
+                    raw[_BOUND] = tokens[i]
+                    i += 1
+            elif key in _SKIP_FIELDS:
+                i += 1 + _SKIP_FIELDS[key]
+            elif key in _REST_FIELDS:
+                break
+            else:
+                i += 1
+    except (IndexError, ValueError):
+        return None
+    return InfoLine(tuple(raw), pv_text)